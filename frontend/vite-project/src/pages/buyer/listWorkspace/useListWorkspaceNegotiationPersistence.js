@@ -1,5 +1,6 @@
 import { useRef, useEffect, useCallback } from "react";
 import useAppStore from "@/store/useAppStore";
+import { createJsonPatch, toJsonValue } from "@/utils/jsonPatch";
 import {
   buildNegotiationSessionDataSnapshot,
   listWorkspaceCartKeyFromState,
@@ -8,6 +9,10 @@ import {
 
 /**
  * DB draft session + debounced autosave for list workspace (repricing or upload).
+ *
+ * After the first save, autosaves send an RFC 6902 `session_data_patch` against the
+ * last acknowledged `session_data_version` instead of the whole blob; a 409 (another
+ * tab saved in between) falls back to one full `session_data` snapshot.
  */
 export function useListWorkspaceNegotiationPersistence({
   useUploadSessions,
@@ -36,6 +41,8 @@ export function useListWorkspaceNegotiationPersistence({
   const autoSaveTimer = useRef(null);
   const hasPendingSave = useRef(false);
   const uploadSessionDraftStartedRef = useRef(false);
+  /** Last session_data the server acknowledged: `{ sessionId, version, data }` (JSON-normalised), or null. */
+  const savedSessionDataRef = useRef(null);
 
   const buildLatestState = () => ({
     items,
@@ -60,31 +67,60 @@ export function useListWorkspaceNegotiationPersistence({
   const latestStateRef = useRef(buildLatestState());
   latestStateRef.current = buildLatestState();
 
+  const rememberSavedSessionData = useCallback((sessionId, resp, data) => {
+    const version = resp?.session_data_version;
+    savedSessionDataRef.current = Number.isInteger(version) ? { sessionId, version, data } : null;
+  }, []);
+
+  const sendAutosave = useCallback(
+    (state, opts = {}) => {
+      const sessionData = toJsonValue(buildNegotiationSessionDataSnapshot(state, useUploadSessions));
+      const fields = {
+        cart_key: listWorkspaceCartKeyFromState(state, useUploadSessions),
+        item_count: state.items.filter((i) => !i.isRemoved).length,
+        ...(useUploadSessions && state.uploadAuditMode ? { mode: 'AUDIT' } : {}),
+      };
+      const sendFull = () =>
+        updateWorkspaceSession(dbSessionId, { ...fields, session_data: sessionData }, opts).then((resp) => {
+          rememberSavedSessionData(dbSessionId, resp, sessionData);
+          return resp;
+        });
+
+      const saved = savedSessionDataRef.current;
+      if (!saved || saved.sessionId !== dbSessionId) return sendFull();
+      const ops = createJsonPatch(saved.data, sessionData);
+      const body = ops.length
+        ? { ...fields, session_data_patch: ops, session_data_version: saved.version }
+        : fields;
+      return updateWorkspaceSession(dbSessionId, body, opts)
+        .then((resp) => {
+          if (ops.length) rememberSavedSessionData(dbSessionId, resp, sessionData);
+          return resp;
+        })
+        .catch((err) => {
+          if (err?.status !== 409) throw err;
+          savedSessionDataRef.current = null;
+          return sendFull();
+        });
+    },
+    [dbSessionId, updateWorkspaceSession, useUploadSessions, rememberSavedSessionData]
+  );
+
   const flushNegotiationSave = useCallback(
     (opts = {}) => {
       if (!dbSessionId || isRepricingFinished) return Promise.resolve();
       const state = latestStateRef.current;
       if (useUploadSessions && !uploadWorkspaceHasRecordedBarcode(state)) return Promise.resolve();
-      const activeCount = state.items.filter((i) => !i.isRemoved).length;
       if (autoSaveTimer.current) {
         clearTimeout(autoSaveTimer.current);
         autoSaveTimer.current = null;
       }
       hasPendingSave.current = false;
-      return updateWorkspaceSession(
-        dbSessionId,
-        {
-          session_data: buildNegotiationSessionDataSnapshot(state, useUploadSessions),
-          cart_key: listWorkspaceCartKeyFromState(state, useUploadSessions),
-          item_count: activeCount,
-          ...(useUploadSessions && state.uploadAuditMode ? { mode: 'AUDIT' } : {}),
-        },
-        opts
-      ).catch((err) => {
+      return sendAutosave(state, opts).catch((err) => {
         console.warn(copy.saveFailLog, err);
       });
     },
-    [dbSessionId, isRepricingFinished, updateWorkspaceSession, copy.saveFailLog, useUploadSessions]
+    [dbSessionId, isRepricingFinished, sendAutosave, copy.saveFailLog, useUploadSessions]
   );
 
   useEffect(() => {
@@ -97,13 +133,7 @@ export function useListWorkspaceNegotiationPersistence({
       hasPendingSave.current = false;
       const latest = latestStateRef.current;
       if (useUploadSessions && !uploadWorkspaceHasRecordedBarcode(latest)) return;
-      const activeCount = latest.items.filter((i) => !i.isRemoved).length;
-      updateWorkspaceSession(dbSessionId, {
-        session_data: buildNegotiationSessionDataSnapshot(latest, useUploadSessions),
-        cart_key: listWorkspaceCartKeyFromState(latest, useUploadSessions),
-        item_count: activeCount,
-        ...(useUploadSessions && latest.uploadAuditMode ? { mode: 'AUDIT' } : {}),
-      }).catch((err) => console.warn("[CG Suite] Auto-save failed:", err));
+      sendAutosave(latest).catch((err) => console.warn("[CG Suite] Auto-save failed:", err));
     }, 1500);
     return () => {
       if (autoSaveTimer.current) clearTimeout(autoSaveTimer.current);
@@ -120,7 +150,7 @@ export function useListWorkspaceNegotiationPersistence({
     dbSessionId,
     isLoading,
     isRepricingFinished,
-    updateWorkspaceSession,
+    sendAutosave,
     useUploadSessions,
   ]);
 
@@ -146,15 +176,17 @@ export function useListWorkspaceNegotiationPersistence({
     if (!hasWork) return;
     uploadSessionDraftStartedRef.current = true;
     isCreatingSession.current = true;
+    const draftSessionData = toJsonValue(buildNegotiationSessionDataSnapshot(snap, useUploadSessions));
     saveWorkspaceSession({
       cart_key: listWorkspaceCartKeyFromState(snap, useUploadSessions),
       item_count: snap.items.length,
-      session_data: buildNegotiationSessionDataSnapshot(snap, useUploadSessions),
+      session_data: draftSessionData,
       ...(useUploadSessions && snap.uploadAuditMode ? { mode: 'AUDIT' } : {}),
     })
       .then((resp) => {
         const sid = readSessionIdFromResponse(resp);
         if (sid) {
+          rememberSavedSessionData(sid, resp, draftSessionData);
           setDbSessionId(sid);
           useAppStore.getState().setRepricingSessionId(sid);
         }
@@ -174,6 +206,7 @@ export function useListWorkspaceNegotiationPersistence({
     readSessionIdFromResponse,
     setDbSessionId,
     isCartInitiallyEmptyRef,
+    rememberSavedSessionData,
   ]);
 
   return { latestStateRef, flushNegotiationSave };
@@ -3,7 +3,7 @@
  * Uses {@link suggestNosposCategory} at each hierarchy level.
  */
 
-import { suggestNosposCategory } from './aiCategoryService';
+import { suggestNosposCategory, suggestNosposCategoryPath } from './aiCategoryService';
 import { fetchAllCategoriesFlat, fetchNosposCategories, fetchWebeposCategoriesFlat } from './api';
 import { flatCategoriesToNestedRoots } from '@/utils/categoryPickerTree';
 
@@ -643,9 +643,10 @@ function logNosposPathCategoryOnce({
 }
 
 /**
- * Same level-by-level AI as the eBay extension category picker: walk the NosposCategory tree
- * using {@link suggestNosposCategory} at each depth. Fire-and-forget from UI; results are for
- * persistence / mirror prefill only.
+ * Resolve a NosposCategory path for an item with {@link suggestNosposCategoryPath} (one request,
+ * server-side walk). If that fails, fall back to the level-by-level AI used by the eBay extension
+ * category picker ({@link suggestNosposCategory} at each depth). Fire-and-forget from UI; results
+ * are for persistence / mirror prefill only.
  *
  * @param {object} params
  * @param {number|null|undefined} params.internalCategoryId - ProductCategory id (leaf or any ancestor)
@@ -681,6 +682,24 @@ export async function runNosposStockCategoryAiMatchBackground({
   const productCategoryRoot =
     internalCategoryId != null ? getInternalProductCategoryRootMeta(flat, internalCategoryId) : null;
 
+  try {
+    const res = await suggestNosposCategoryPath({ item: itemSummary });
+    if (res?.nosposId != null && Array.isArray(res.path) && res.path.length > 0) {
+      const nospos = { nosposId: res.nosposId, fullName: res.fullName, pathSegments: res.path };
+      logNosposPathCategoryOnce({
+        logTag,
+        itemName,
+        internalCategoryId,
+        productCategoryRoot,
+        outcome: 'matched',
+        nospos: { ...nospos, mode: res.mode, llmCalls: res.llmCalls },
+      });
+      return nospos;
+    }
+  } catch (e) {
+    console.warn(`${logTag} full-path suggestion failed, walking levels`, e instanceof Error ? e.message : e);
+  }
+
   const cascade = await runAiCategoryCascadeArrayTreeWithRetries({
     itemSummary,
     async loadRootNodes() {
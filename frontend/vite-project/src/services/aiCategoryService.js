@@ -53,6 +53,47 @@ export async function suggestNosposCategory({ item, levelIndex, availableOptions
   return res.json();
 }
 
+const PATH_ENDPOINT = '/api/ai/suggest-category-path/';
+
+/**
+ * @typedef {Object} CategoryPathSuggestion
+ * @property {string[]} path        - Segments from the NosPos root down to a leaf
+ * @property {number|null} nosposId - Leaf NosposCategory id
+ * @property {string} fullName      - Leaf full name ("A > B > C")
+ * @property {'high'|'medium'|'low'} confidence
+ * @property {string} reasoning
+ * @property {'full_path'|'per_level'} mode
+ * @property {number} llmCalls
+ */
+
+/**
+ * Ask the backend for a complete NosPos category path in one request.
+ * The server walks the NosposCategory tree itself (usually one model call).
+ *
+ * @param {object} params
+ * @param {ItemSummary} params.item
+ * @param {string[]} [params.previousPath] - Segments already fixed above the walk
+ * @returns {Promise<CategoryPathSuggestion>}
+ */
+export async function suggestNosposCategoryPath({ item, previousPath = [] }) {
+  const res = await fetch(PATH_ENDPOINT, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'X-CSRFToken': getCSRFToken(),
+    },
+    body: JSON.stringify({ item, previousPath }),
+  });
+
+  if (!res.ok) {
+    let msg = `AI category path suggestion failed (${res.status})`;
+    try { const err = await res.json(); msg = err.error || msg; } catch { /* ignore */ }
+    throw new Error(msg);
+  }
+
+  return res.json();
+}
+
 // ---------------------------------------------------------------------------
 
 const MARKETPLACE_SEARCH_ENDPOINT = '/api/ai/suggest-marketplace-search-term/';
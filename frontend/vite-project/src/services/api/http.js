@@ -36,7 +36,9 @@ export async function apiFetch(path, options = {}) {
         /* swallow: response body already consumed or network error */
       }
     }
-    throw new Error(errorMessage);
+    const error = new Error(errorMessage);
+    error.status = res.status;
+    throw error;
   }
 
   if (res.status === 204 || method === 'DELETE') return null;
@@ -0,0 +1,51 @@
+/**
+ * Minimal RFC 6902 diff for session_data autosaves.
+ *
+ * Both documents are compared as their JSON form (undefined keys dropped), so
+ * the operations apply cleanly to what the server stored. Arrays are diffed
+ * index-by-index with appends / tail removals; that matches how workspace
+ * items are edited in place or pushed, and is always correct if not minimal.
+ */
+
+const escapeToken = (key) => String(key).replace(/~/g, '~0').replace(/\//g, '~1');
+
+const isPlainObject = (v) => v !== null && typeof v === 'object' && !Array.isArray(v);
+
+/** JSON-normalise a value (what JSON.stringify would send). */
+export const toJsonValue = (value) => (value === undefined ? null : JSON.parse(JSON.stringify(value)));
+
+function diffInto(prev, next, path, ops) {
+  if (prev === next) return;
+
+  if (isPlainObject(prev) && isPlainObject(next)) {
+    for (const key of Object.keys(prev)) {
+      if (!(key in next)) ops.push({ op: 'remove', path: `${path}/${escapeToken(key)}` });
+    }
+    for (const key of Object.keys(next)) {
+      const childPath = `${path}/${escapeToken(key)}`;
+      if (!(key in prev)) ops.push({ op: 'add', path: childPath, value: next[key] });
+      else diffInto(prev[key], next[key], childPath, ops);
+    }
+    return;
+  }
+
+  if (Array.isArray(prev) && Array.isArray(next)) {
+    const common = Math.min(prev.length, next.length);
+    for (let i = 0; i < common; i += 1) diffInto(prev[i], next[i], `${path}/${i}`, ops);
+    for (let i = prev.length - 1; i >= next.length; i -= 1) ops.push({ op: 'remove', path: `${path}/${i}` });
+    for (let i = prev.length; i < next.length; i += 1) ops.push({ op: 'add', path: `${path}/-`, value: next[i] });
+    return;
+  }
+
+  ops.push({ op: 'replace', path, value: next });
+}
+
+/**
+ * Operations turning `prev` into `next`. Both must already be JSON values
+ * (see {@link toJsonValue}). Returns [] when nothing changed.
+ */
+export function createJsonPatch(prev, next) {
+  const ops = [];
+  diffInto(prev, next, '', ops);
+  return ops;
+}
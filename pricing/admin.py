@@ -13,6 +13,7 @@ from .models_v2 import (
     Variant,
     VariantAttributeValue,
     VariantPriceHistory,
+    VariantPriceMovement,
     VariantStatus,
     PricingRule,
     InventoryUnit,
@@ -39,14 +40,31 @@ from .models_v2 import (
     CGCategory,
     WebEposCategory,
 )
+from .services.nospos_catalogue import schedule_catalogue_rebuild
 
 
 # --------------------------------
 # Category, Manufacturer & Product
 # --------------------------------
 
+class NosposCatalogueRebuildMixin:
+    """Admin edits to the NosPos mirror refresh the cached catalogue snapshot."""
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        schedule_catalogue_rebuild()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        schedule_catalogue_rebuild()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        schedule_catalogue_rebuild()
+
+
 @admin.register(NosposCategory)
-class NosposCategoryAdmin(admin.ModelAdmin):
+class NosposCategoryAdmin(NosposCatalogueRebuildMixin, admin.ModelAdmin):
     list_display = (
         "nospos_id",
         "level",
@@ -64,14 +82,14 @@ class NosposCategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(NosposField)
-class NosposFieldAdmin(admin.ModelAdmin):
+class NosposFieldAdmin(NosposCatalogueRebuildMixin, admin.ModelAdmin):
     list_display = ("nospos_field_id", "name", "updated_at")
     search_fields = ("name", "nospos_field_id")
     ordering = ("nospos_field_id",)
 
 
 @admin.register(NosposCategoryField)
-class NosposCategoryFieldAdmin(admin.ModelAdmin):
+class NosposCategoryFieldAdmin(NosposCatalogueRebuildMixin, admin.ModelAdmin):
     list_display = ("category", "field", "active", "editable", "sensitive", "required", "updated_at")
     list_filter = ("active", "editable", "sensitive", "required")
     search_fields = ("category__full_name", "category__nospos_id", "field__name", "field__nospos_field_id")
@@ -202,7 +220,7 @@ class VariantAdmin(admin.ModelAdmin):
     )
     ordering = ("product", "condition_grade")
     autocomplete_fields = ("product", "condition_grade")
-    readonly_fields = ("variant_signature",)
+    readonly_fields = ("variant_signature", "cex_price_checked_at", "price_lookup_count", "last_price_lookup_at")
     inlines = [
         VariantAttributeValueInline,
         VariantPriceHistoryInline,
@@ -236,6 +254,24 @@ class VariantPriceHistoryAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(VariantPriceMovement)
+class VariantPriceMovementAdmin(admin.ModelAdmin):
+    list_display = ("variant", "category", "previous_price_gbp", "new_price_gbp", "delta_pct", "import_run_at")
+    list_filter = ("import_run_at", "category")
+    search_fields = ("variant__cex_sku",)
+    ordering = ("-import_run_at", "delta_pct")
+    readonly_fields = (
+        "variant", "category", "previous_price_gbp", "new_price_gbp",
+        "delta_gbp", "delta_pct", "import_run_at",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(VariantStatus)
 class VariantStatusAdmin(admin.ModelAdmin):
     list_display = ("variant", "status", "effective_from")
@@ -261,6 +297,9 @@ class PricingRuleAdmin(admin.ModelAdmin):
         (None, {
             'fields': ('sell_price_multiplier', 'first_offer_pct_of_cex', 'second_offer_pct_of_cex', 'is_global_default')
         }),
+        ('CeX price freshness', {
+            'fields': ('cex_price_max_age_minutes',),
+        }),
         ('Scope', {
             'fields': ('product', 'category'),
             'description': "Choose either a product, a category, or mark as global default."
@@ -28,16 +28,43 @@ import json
 import logging
 
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 
 from pricing.services.ai_category import (
+    FieldBatchItem,
+    provider_stats,
     suggest_category,
     suggest_field_values,
+    suggest_field_values_batch,
     suggest_marketplace_research_search_term,
 )
+from pricing.services.ai_category_path import suggest_category_path
+from pricing.services.ai_response_cache import cache_stats
 
 logger = logging.getLogger(__name__)
 
+MAX_FIELD_BATCH_ITEMS = 100
+
+
+def _clean_fields(fields: list) -> list[dict]:
+    """Normalise each field entry of a suggest-fields request."""
+    clean_fields = []
+    for f in fields:
+        if not isinstance(f, dict):
+            continue
+        opts = f.get("options") or []
+        clean_fields.append({
+            "name": str(f.get("name") or ""),
+            "label": str(f.get("label") or ""),
+            "control": str(f.get("control") or "text"),
+            "options": [
+                {"value": str(o.get("value", "")), "text": str(o.get("text", ""))}
+                for o in opts
+                if isinstance(o, dict)
+            ],
+        })
+    return clean_fields
+
 
 @require_POST
 def suggest_nospos_category(request):
@@ -97,9 +124,73 @@ def suggest_nospos_category(request):
         "suggested": suggestion.suggested,
         "confidence": suggestion.confidence,
         "reasoning": suggestion.reasoning,
+        "source": suggestion.source,
     })
 
 
+@require_POST
+def suggest_nospos_category_path(request):
+    """
+    Return a complete AI-suggested NosPos category path in one call.
+
+    POST /api/ai/suggest-category-path/
+
+    Request body:
+        {
+            "item": { "name": "...", "dbCategory": "...", "attributes": {} },
+            "previousPath": []          // optional: segments already chosen
+        }
+
+    The tree comes from NosposCategory (catalogue snapshot); leaves are
+    pre-ranked by token overlap and the model picks a full path in a single
+    call, falling back to a server-side level walk when that pick is unusable.
+
+    Response body:
+        {
+            "path": ["Electronics", "Phones", "Apple"],
+            "nosposId": 123,
+            "fullName": "Electronics > Phones > Apple",
+            "confidence": "high",
+            "reasoning": "...",
+            "mode": "local" | "full_path" | "per_level",
+            "llmCalls": 1
+        }
+    """
+    try:
+        body = json.loads(request.body)
+    except (json.JSONDecodeError, ValueError):
+        return JsonResponse({"error": "Invalid JSON body."}, status=400)
+
+    item = body.get("item") or {}
+    item_name = str(item.get("name") or "Unknown item").strip() or "Unknown item"
+    db_category = item.get("dbCategory") or None
+    raw_attrs = item.get("attributes") or {}
+    if not isinstance(raw_attrs, dict):
+        return JsonResponse({"error": "'item.attributes' must be an object."}, status=400)
+    attributes = {str(k): str(v) for k, v in raw_attrs.items() if v is not None}
+
+    previous_path = body.get("previousPath") or []
+    if not isinstance(previous_path, list):
+        return JsonResponse({"error": "'previousPath' must be a list."}, status=400)
+    previous_path = [str(s) for s in previous_path]
+
+    try:
+        suggestion = suggest_category_path(
+            item_name=item_name,
+            db_category=db_category,
+            attributes=attributes,
+            previous_path=previous_path,
+        )
+    except ValueError as exc:
+        logger.warning("[AI Category path] Service error: %s", exc)
+        return JsonResponse({"error": str(exc)}, status=500)
+    except Exception:  # noqa: BLE001
+        logger.exception("[AI Category path] Unexpected error")
+        return JsonResponse({"error": "An unexpected error occurred."}, status=500)
+
+    return JsonResponse(suggestion.as_dict())
+
+
 @require_POST
 def suggest_nospos_fields(request):
     """
@@ -136,22 +227,7 @@ def suggest_nospos_fields(request):
     if not isinstance(fields, list):
         return JsonResponse({"error": "'fields' must be a list."}, status=400)
 
-    # Normalise each field entry
-    clean_fields = []
-    for f in fields:
-        if not isinstance(f, dict):
-            continue
-        opts = f.get("options") or []
-        clean_fields.append({
-            "name": str(f.get("name") or ""),
-            "label": str(f.get("label") or ""),
-            "control": str(f.get("control") or "text"),
-            "options": [
-                {"value": str(o.get("value", "")), "text": str(o.get("text", ""))}
-                for o in opts
-                if isinstance(o, dict)
-            ],
-        })
+    clean_fields = _clean_fields(fields)
 
     try:
         result = suggest_field_values(
@@ -170,6 +246,93 @@ def suggest_nospos_fields(request):
     return JsonResponse({"fields": result.fields})
 
 
+@require_POST
+def suggest_nospos_fields_batch(request):
+    """
+    Return AI-suggested NosPos field values for many agreement lines at once.
+
+    POST /api/ai/suggest-fields-batch/
+
+    Request body:
+        {
+            "items": [
+                {
+                    "id": "<client key, defaults to the list index>",
+                    "nosposCategoryId": 123,          // optional; groups lines per prompt
+                    "item": { "name": "...", "dbCategory": "...", "attributes": {} },
+                    "fields": [ ...same shape as suggest-fields... ]
+                }
+            ]
+        }
+
+    Lines sharing a NosPos category are filled by one prompt (chunked to a
+    token budget); each line's answer is normalised against its own fields.
+
+    Response body:
+        { "results": [ { "id": "...", "fields": { "<fieldName>": "<value>" }, "error"?: "..." } ] }
+    """
+    try:
+        body = json.loads(request.body)
+    except (json.JSONDecodeError, ValueError):
+        return JsonResponse({"error": "Invalid JSON body."}, status=400)
+
+    entries = body.get("items")
+    if not isinstance(entries, list) or not entries:
+        return JsonResponse({"error": "'items' must be a non-empty list."}, status=400)
+    if len(entries) > MAX_FIELD_BATCH_ITEMS:
+        return JsonResponse(
+            {"error": f"At most {MAX_FIELD_BATCH_ITEMS} items per batch."}, status=400
+        )
+
+    batch: list[FieldBatchItem] = []
+    seen_ids: set[str] = set()
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            return JsonResponse({"error": f"items[{index}] must be an object."}, status=400)
+        key = str(entry.get("id") if entry.get("id") is not None else index)
+        if key in seen_ids:
+            return JsonResponse({"error": f"Duplicate item id {key!r}."}, status=400)
+        seen_ids.add(key)
+
+        item = entry.get("item") or {}
+        raw_attrs = item.get("attributes") or {}
+        if not isinstance(raw_attrs, dict):
+            return JsonResponse(
+                {"error": f"items[{index}].item.attributes must be an object."}, status=400
+            )
+        fields = entry.get("fields") or []
+        if not isinstance(fields, list):
+            return JsonResponse({"error": f"items[{index}].fields must be a list."}, status=400)
+        category_id = entry.get("nosposCategoryId")
+        if category_id is not None and (isinstance(category_id, bool) or not isinstance(category_id, int)):
+            return JsonResponse(
+                {"error": f"items[{index}].nosposCategoryId must be an integer."}, status=400
+            )
+
+        batch.append(FieldBatchItem(
+            key=key,
+            item_name=str(item.get("name") or "Unknown item").strip() or "Unknown item",
+            db_category=item.get("dbCategory") or None,
+            attributes={str(k): str(v) for k, v in raw_attrs.items() if v is not None},
+            fields=_clean_fields(fields),
+            category_id=category_id,
+        ))
+
+    try:
+        results = suggest_field_values_batch(batch)
+    except Exception:  # noqa: BLE001
+        logger.exception("[AI Fields batch] Unexpected error")
+        return JsonResponse({"error": "An unexpected error occurred."}, status=500)
+
+    out = []
+    for result in results:
+        row = {"id": result.key, "fields": result.fields}
+        if result.error:
+            row["error"] = result.error
+        out.append(row)
+    return JsonResponse({"results": out})
+
+
 @require_POST
 def suggest_marketplace_research_search_term_view(request):
     """
@@ -224,3 +387,27 @@ def suggest_marketplace_research_search_term_view(request):
             },
         }
     )
+
+
+@require_GET
+def ai_response_cache_stats(request):
+    """
+    GET /api/ai/cache-stats/
+
+    Response cache hit/miss counters (this process) and table totals:
+        { "enabled", "ttlSeconds", "maxEntries", "entries", "storedHits",
+          "process": { "hits", "misses", "stores", "evictions", "errors", "hitRate" } }
+    """
+    return JsonResponse(cache_stats())
+
+
+@require_GET
+def ai_provider_stats(request):
+    """
+    GET /api/ai/provider-stats/
+
+    Hedged provider router state for this process:
+        { "order": ["groq", "gemini"],
+          "providers": { "<name>": { "calls", "errors", "wins", "errorRate", "p95Ms" } } }
+    """
+    return JsonResponse(provider_stats())
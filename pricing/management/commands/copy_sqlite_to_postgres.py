@@ -0,0 +1,198 @@
+"""
+Django management command to copy an existing SQLite database into the
+configured default database (PostgreSQL via DATABASE_URL) in bulk.
+
+Usage:
+    DATABASE_URL=postgres://... python manage.py migrate
+    DATABASE_URL=postgres://... python manage.py copy_sqlite_to_postgres path/to/db.sqlite3
+    DATABASE_URL=postgres://... python manage.py copy_sqlite_to_postgres db.sqlite3 --flush --batch-size 5000
+
+Features:
+- Copies every managed model (including M2M through tables), primary keys preserved
+- Streams source rows in chunks and bulk-inserts them in batches
+- One transaction: PostgreSQL FK constraints are deferred, so table order and
+  self-references (e.g. category parents) do not matter
+- auto_now / auto_now_add timestamps are copied as-is, not re-stamped
+- Resets PK sequences afterwards and verifies per-table row counts
+"""
+
+import contextlib
+import copy
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.core.serializers import sort_dependencies
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+SOURCE_ALIAS = 'sqlite_copy_source'
+
+
+class Command(BaseCommand):
+    help = 'Copy all rows from a SQLite database file into the default (PostgreSQL) database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sqlite_file',
+            type=str,
+            help='Path to the source SQLite database file'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows per bulk insert (default: 2000)'
+        )
+        parser.add_argument(
+            '--flush',
+            action='store_true',
+            help='Delete existing rows in the target tables first (e.g. contenttypes created by migrate)'
+        )
+        parser.add_argument(
+            '--allow-non-postgres',
+            action='store_true',
+            help='Allow a target that is not PostgreSQL (FK checks are then not deferred)'
+        )
+
+    def handle(self, *args, **options):
+        source_path = Path(options['sqlite_file'])
+        if not source_path.is_file():
+            raise CommandError(f'SQLite file not found: {source_path}')
+
+        target = connections[DEFAULT_DB_ALIAS]
+        if target.vendor != 'postgresql' and not options['allow_non_postgres']:
+            raise CommandError(
+                f'Target database is {target.vendor}; set DATABASE_URL to a PostgreSQL database '
+                f'(or pass --allow-non-postgres)'
+            )
+
+        source_settings = copy.deepcopy(target.settings_dict)
+        source_settings.update({
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(source_path),
+            'OPTIONS': {},
+            'CONN_MAX_AGE': 0,
+        })
+        connections.settings[SOURCE_ALIAS] = source_settings
+
+        try:
+            models = self._models_to_copy()
+            self._check_target(models, options['flush'])
+            started = time.monotonic()
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                if options['flush']:
+                    self._flush_target(models)
+                counts = {}
+                for model in models:
+                    counts[model] = self._copy_model(model, options['batch_size'])
+                self._reset_sequences(models)
+            self._verify(counts)
+        finally:
+            connections[SOURCE_ALIAS].close()
+            del connections[SOURCE_ALIAS]
+            del connections.settings[SOURCE_ALIAS]
+
+        self.stdout.write(self.style.SUCCESS('='*60))
+        self.stdout.write(self.style.SUCCESS('COPY COMPLETE'))
+        self.stdout.write(self.style.SUCCESS('='*60))
+        self.stdout.write(f'Tables copied: {len(counts)}')
+        self.stdout.write(f'Rows copied: {sum(counts.values())}')
+        self.stdout.write(f'Elapsed: {time.monotonic() - started:.1f}s')
+
+    def _models_to_copy(self):
+        """Managed, concrete models whose table exists in the source, in dependency order."""
+        source_tables = set(connections[SOURCE_ALIAS].introspection.table_names())
+        app_list = [(app_config, None) for app_config in apps.get_app_configs()]
+        ordered = sort_dependencies(app_list, allow_cycles=True)
+
+        models = []
+        seen = set()
+        for model in ordered:
+            candidates = [model] + [
+                f.remote_field.through for f in model._meta.local_many_to_many
+                if f.remote_field.through._meta.auto_created
+            ]
+            for m in candidates:
+                opts = m._meta
+                if m in seen or opts.proxy or not opts.managed:
+                    continue
+                seen.add(m)
+                if opts.db_table not in source_tables:
+                    self.stdout.write(self.style.WARNING(f'Skipping {opts.label}: no {opts.db_table} table in source'))
+                    continue
+                models.append(m)
+        return models
+
+    def _check_target(self, models, flush):
+        if flush:
+            return
+        non_empty = [m._meta.label for m in models if m._default_manager.using(DEFAULT_DB_ALIAS).exists()]
+        if non_empty:
+            raise CommandError(
+                'Target tables already contain rows: ' + ', '.join(non_empty[:10])
+                + ('...' if len(non_empty) > 10 else '') + ' (use --flush to replace them)'
+            )
+
+    def _flush_target(self, models):
+        target = connections[DEFAULT_DB_ALIAS]
+        statements = target.ops.sql_flush(
+            no_style(),
+            [m._meta.db_table for m in models],
+            allow_cascade=True,
+        )
+        with target.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def _copy_model(self, model, batch_size):
+        label = model._meta.label
+        manager = model._base_manager
+        total = 0
+        batch = []
+        with _preserve_auto_timestamps(model):
+            for obj in manager.using(SOURCE_ALIAS).order_by('pk').iterator(chunk_size=batch_size):
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    manager.using(DEFAULT_DB_ALIAS).bulk_create(batch, batch_size=batch_size)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                manager.using(DEFAULT_DB_ALIAS).bulk_create(batch, batch_size=batch_size)
+                total += len(batch)
+        self.stdout.write(f'  {label}: {total} row(s)')
+        return total
+
+    def _reset_sequences(self, models):
+        target = connections[DEFAULT_DB_ALIAS]
+        statements = target.ops.sequence_reset_sql(no_style(), models)
+        with target.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def _verify(self, counts):
+        mismatched = []
+        for model, copied in counts.items():
+            source_count = model._base_manager.using(SOURCE_ALIAS).count()
+            target_count = model._base_manager.using(DEFAULT_DB_ALIAS).count()
+            if not (source_count == copied == target_count):
+                mismatched.append(f'{model._meta.label} (source {source_count}, target {target_count})')
+        if mismatched:
+            raise CommandError('Row counts differ after copy: ' + ', '.join(mismatched))
+
+
+@contextlib.contextmanager
+def _preserve_auto_timestamps(model):
+    """Disable auto_now / auto_now_add while copying so source timestamps are kept."""
+    saved = []
+    for field in model._meta.concrete_fields:
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            saved.append((field, field.auto_now, field.auto_now_add))
+            field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
@@ -11,6 +11,7 @@ Features:
 - Pre-loads lookups to avoid N+1 queries
 - Transaction-safe with batch commits
 - Configurable model name attribute
+- Post-import price-movement ("movers") detection over the changed set
 """
 
 import json
@@ -23,6 +24,14 @@ from pricing.models_v2 import (
     ProductCategory, Product, Attribute, AttributeValue,
     ConditionGrade, Variant, VariantAttributeValue, VariantPriceHistory
 )
+from pricing.services.price_movers import (
+    DEFAULT_MIN_ABS_PCT,
+    DEFAULT_TOP_PER_CATEGORY,
+    PriceChange,
+    record_price_movements,
+)
+
+PENNY = Decimal('0.01')
 
 
 class Command(BaseCommand):
@@ -51,12 +60,31 @@ class Command(BaseCommand):
             default='model_name',
             help='Name of the attribute that contains the model/product name (default: model_name)'
         )
+        parser.add_argument(
+            '--movers-min-pct',
+            type=Decimal,
+            default=DEFAULT_MIN_ABS_PCT,
+            help=f'Minimum absolute %% sell-price change recorded as a mover (default: {DEFAULT_MIN_ABS_PCT})'
+        )
+        parser.add_argument(
+            '--movers-per-category',
+            type=int,
+            default=DEFAULT_TOP_PER_CATEGORY,
+            help=f'Largest drops/rises kept per category (default: {DEFAULT_TOP_PER_CATEGORY})'
+        )
+        parser.add_argument(
+            '--skip-movers',
+            action='store_true',
+            help='Do not run the post-import price-movement stage'
+        )
 
     def handle(self, *args, **options):
         jsonl_file = options['jsonl_file']
         batch_size = options['batch_size']
         skip_errors = options['skip_errors']
         self.model_name_attribute = options['model_name_attribute'].lower()
+        self.import_run_at = timezone.now()
+        self.price_changes = []
 
         self.stdout.write(self.style.SUCCESS(f'Starting import from {jsonl_file}'))
         self.stdout.write(f'Using "{options["model_name_attribute"]}" as model name attribute')
@@ -72,7 +100,9 @@ class Command(BaseCommand):
             'products_created': 0,
             'variants_created': 0,
             'variants_updated': 0,
+            'variants_confirmed': 0,
             'price_changes': 0,
+            'price_movers': 0,
         }
 
         batch = []
@@ -120,6 +150,15 @@ class Command(BaseCommand):
         
         except FileNotFoundError:
             raise CommandError(f'File not found: {jsonl_file}')
+
+        # Post-import stage: rank this run's price changes into the movers table
+        if not options['skip_movers'] and self.price_changes:
+            stats['price_movers'] = record_price_movements(
+                self.price_changes,
+                self.import_run_at,
+                min_abs_pct=options['movers_min_pct'],
+                top_per_category=options['movers_per_category'],
+            )
         
         # Print summary
         self.stdout.write(self.style.SUCCESS('\n' + '='*60))
@@ -132,7 +171,9 @@ class Command(BaseCommand):
         self.stdout.write(f"Products created: {stats['products_created']}")
         self.stdout.write(f"Variants created: {stats['variants_created']}")
         self.stdout.write(f"Variants updated: {stats['variants_updated']}")
+        self.stdout.write(f"Variants confirmed unchanged: {stats['variants_confirmed']}")
         self.stdout.write(f"Price changes recorded: {stats['price_changes']}")
+        self.stdout.write(f"Price movers recorded: {stats['price_movers']}")
         self.stdout.write(self.style.SUCCESS('='*60))
 
     def _ensure_defaults(self):
@@ -336,9 +377,10 @@ class Command(BaseCommand):
         box = box_details[0]
         
         box_name = box.get('boxName', '')
-        sell_price = Decimal(str(box.get('sellPrice', 0)))
-        cash_price = Decimal(str(box.get('cashPrice', 0)))
-        exchange_price = Decimal(str(box.get('exchangePrice', 0)))
+        # Round to the stored scale so unchanged prices compare equal to the DB values
+        sell_price = Decimal(str(box.get('sellPrice', 0))).quantize(PENNY)
+        cash_price = Decimal(str(box.get('cashPrice', 0))).quantize(PENNY)
+        exchange_price = Decimal(str(box.get('exchangePrice', 0))).quantize(PENNY)
         category_name = box.get('categoryFriendlyName', 'Mobile Phones')
         out_of_stock = bool(box.get('outOfStock', 0))
         last_price_updated = box.get('lastPriceUpdatedDate')
@@ -527,6 +569,7 @@ class Command(BaseCommand):
         
         variants_to_create = []
         variants_to_update = []
+        variants_confirmed = []
         variant_attr_values = []
         price_history_entries = []
         now = timezone.now()
@@ -557,6 +600,14 @@ class Command(BaseCommand):
                 needs_update = False
                 
                 if existing_variant.current_price_gbp != sell_price:
+                    self.price_changes.append(
+                        PriceChange(
+                            variant_id=existing_variant.variant_id,
+                            category_id=existing_variant.product.category_id,
+                            previous_price_gbp=existing_variant.current_price_gbp,
+                            new_price_gbp=sell_price,
+                        )
+                    )
                     existing_variant.current_price_gbp = sell_price
                     needs_update = True
                     
@@ -584,9 +635,17 @@ class Command(BaseCommand):
                 if existing_variant.cex_price_last_updated_date != price_updated_dt:
                     existing_variant.cex_price_last_updated_date = price_updated_dt
                     needs_update = True
-                
+
+                # The import confirms the stored prices, so pricing can serve them without a live call.
+                # The file carries no images, so variants still missing them are left unstamped
+                # and the first pricing lookup fetches them live.
+                has_images = bool(existing_variant.cex_image_urls)
                 if needs_update:
+                    if has_images:
+                        existing_variant.cex_price_checked_at = now
                     variants_to_update.append(existing_variant)
+                elif has_images:
+                    variants_confirmed.append(existing_variant.variant_id)
             else:
                 # Create new variant
                 variant = Variant(
@@ -651,10 +710,20 @@ class Command(BaseCommand):
         if variants_to_update:
             Variant.objects.bulk_update(
                 variants_to_update, 
-                ['current_price_gbp', 'tradein_cash', 'tradein_voucher', 'cex_out_of_stock', 'cex_price_last_updated_date'],
+                [
+                    'current_price_gbp', 'tradein_cash', 'tradein_voucher', 'cex_out_of_stock',
+                    'cex_price_last_updated_date', 'cex_price_checked_at',
+                ],
                 batch_size=1000
             )
             stats['variants_updated'] += len(variants_to_update)
+
+        # Unchanged variants only need their checked-at stamp, not a full-row bulk_update
+        for start in range(0, len(variants_confirmed), 1000):
+            Variant.objects.filter(
+                variant_id__in=variants_confirmed[start:start + 1000]
+            ).update(cex_price_checked_at=now)
+        stats['variants_confirmed'] += len(variants_confirmed)
         
         # Bulk create variant attribute values
         if variant_attr_values:
@@ -0,0 +1,32 @@
+"""
+Recompute CustomerStats (request counts, abandoned quotes, negotiated totals) from
+the request status history.
+
+The stats are kept up to date as status rows are saved. Run this after bulk
+imports or deletes that bypass the model save path.
+
+Usage:
+    python manage.py rebuild_customer_stats
+    python manage.py rebuild_customer_stats --customer 12 --customer 34
+"""
+
+from django.core.management.base import BaseCommand
+
+from pricing.services.customer_stats import rebuild_customer_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-customer request stats from status history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--customer',
+            type=int,
+            action='append',
+            dest='customer_ids',
+            help='Only rebuild this customer id (repeatable; default: all customers)'
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_customer_stats(options.get('customer_ids'))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {count} customers'))
@@ -0,0 +1,167 @@
+"""
+Long-running worker that keeps CeX prices fresh for "hot" SKUs.
+
+variant_prices / quick_reprice_lookup count every lookup into
+Variant.price_lookup_count and last_price_lookup_at. Each cycle this command
+picks the most looked-up variants whose stored price is close to its max age,
+re-fetches them from CeX at a capped request rate and writes the results to
+Variant + VariantPriceHistory. Run it alongside CEX_PRICE_REFRESH_WORKER=True
+so request handlers serve from the DB without calling CeX.
+
+SKUs whose fetch fails are backed off exponentially (up to
+--max-backoff-hours), and lookup counts are halved every --decay-hours so
+hotness follows recent demand.
+
+Usage:
+    python manage.py refresh_hot_cex_prices
+    python manage.py refresh_hot_cex_prices --interval 120 --max-per-cycle 100 --rate 0.5
+    python manage.py refresh_hot_cex_prices --once
+"""
+
+import signal
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from pricing.services.cex_prices import (
+    RefreshBackoff,
+    decay_price_lookup_counts,
+    refresh_cex_prices,
+    select_hot_variants,
+)
+
+
+class Command(BaseCommand):
+    help = 'Keep CeX prices fresh for recently / frequently priced variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60,
+            help='Seconds between refresh cycles (default: 60)'
+        )
+        parser.add_argument(
+            '--max-per-cycle',
+            type=int,
+            default=200,
+            help='Maximum variants refreshed per cycle (default: 200)'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=1.0,
+            help='Maximum CeX requests per second (default: 1.0)'
+        )
+        parser.add_argument(
+            '--window-hours',
+            type=float,
+            default=24,
+            help='Only variants looked up within this many hours are hot (default: 24)'
+        )
+        parser.add_argument(
+            '--min-lookups',
+            type=int,
+            default=1,
+            help='Minimum lookup count for a variant to be refreshed (default: 1)'
+        )
+        parser.add_argument(
+            '--refresh-ahead',
+            type=float,
+            default=0.8,
+            help='Refresh once a price reaches this fraction of its max age (default: 0.8)'
+        )
+        parser.add_argument(
+            '--max-backoff-hours',
+            type=float,
+            default=6,
+            help='Longest a repeatedly failing SKU is skipped (default: 6)'
+        )
+        parser.add_argument(
+            '--decay-hours',
+            type=float,
+            default=24,
+            help='Halve lookup counts every this many hours of running; 0 disables (default: 24)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single cycle and exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['rate'] <= 0:
+            raise CommandError('--rate must be greater than 0')
+        if options['max_per_cycle'] <= 0:
+            raise CommandError('--max-per-cycle must be greater than 0')
+
+        self._stopping = False
+        if not options['once']:
+            signal.signal(signal.SIGTERM, self._request_stop)
+            signal.signal(signal.SIGINT, self._request_stop)
+
+        window = timedelta(hours=options['window_hours'])
+        min_interval = 1.0 / options['rate']
+        backoff = RefreshBackoff(
+            base=max(options['interval'], 1.0),
+            cap=max(options['max_backoff_hours'], 0.0) * 3600,
+        )
+        decay_every = options['decay_hours'] * 3600
+        last_decay = time.monotonic()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"CeX refresh worker started (interval {options['interval']}s, "
+            f"max {options['max_per_cycle']}/cycle, {options['rate']} req/s)"
+        ))
+
+        while not self._stopping:
+            started = time.monotonic()
+            close_old_connections()
+
+            if decay_every > 0 and started - last_decay >= decay_every:
+                decayed = decay_price_lookup_counts()
+                last_decay = started
+                self.stdout.write(f"Halved lookup counts on {decayed} variant(s)")
+
+            variants = select_hot_variants(
+                window=window,
+                limit=options['max_per_cycle'],
+                min_lookups=options['min_lookups'],
+                refresh_ahead=options['refresh_ahead'],
+                skip_skus=backoff.blocked(),
+            )
+            if variants:
+                result = refresh_cex_prices(
+                    variants,
+                    min_interval=min_interval,
+                    should_stop=lambda: self._stopping,
+                )
+                backoff.record(result)
+                self.stdout.write(
+                    f"Refreshed {result.refreshed}/{len(variants)} hot variant(s), "
+                    f"{result.price_changed} price change(s), {result.failed} failed "
+                    f"in {time.monotonic() - started:.1f}s"
+                )
+                if result.skus_failed:
+                    self.stdout.write(self.style.WARNING(
+                        f"Failed SKUs: {', '.join(result.skus_failed[:20])}"
+                    ))
+            elif options['verbosity'] > 1:
+                self.stdout.write('No hot variants due for refresh')
+
+            if options['once']:
+                break
+            self._sleep(options['interval'] - (time.monotonic() - started))
+
+        self.stdout.write(self.style.SUCCESS('CeX refresh worker stopped'))
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _sleep(self, seconds):
+        """Sleep in short steps so a stop signal is honoured promptly."""
+        deadline = time.monotonic() + max(0.0, seconds)
+        while not self._stopping and time.monotonic() < deadline:
+            time.sleep(min(1.0, deadline - time.monotonic()))
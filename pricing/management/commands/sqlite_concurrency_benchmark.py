@@ -0,0 +1,224 @@
+"""
+Benchmark concurrent autosave-style writes against SQLite.
+
+Runs the same workload against a scratch database file with the driver's
+default settings and with the tuned profile from settings
+(SQLITE_TUNED_OPTIONS + DB_CONN_MAX_AGE), then reports committed
+transactions, "database is locked" errors, throughput and latency.
+
+Each writer thread mimics a till autosave: inside one transaction it reads the
+session's version, rewrites its JSON payload and appends a history row.
+Reader threads poll the same tables while the writers run. With the default
+profile the connection is closed after every transaction, like a request
+with CONN_MAX_AGE=0.
+
+Usage:
+    python manage.py sqlite_concurrency_benchmark
+    python manage.py sqlite_concurrency_benchmark --writers 16 --iterations 200 --profile tuned
+"""
+
+import copy
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+
+
+PROFILES = ('default', 'tuned')
+
+_SCHEMA = (
+    "CREATE TABLE bench_session (id INTEGER PRIMARY KEY, payload TEXT NOT NULL, version INTEGER NOT NULL)",
+    "CREATE TABLE bench_history (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id INTEGER NOT NULL, "
+    "version INTEGER NOT NULL, payload TEXT NOT NULL)",
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure SQLite lock errors / throughput under parallel writers for the default and tuned profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers',
+            type=int,
+            default=8,
+            help='Concurrent writer threads (default: 8)'
+        )
+        parser.add_argument(
+            '--readers',
+            type=int,
+            default=2,
+            help='Concurrent reader threads (default: 2)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=100,
+            help='Transactions per writer (default: 100)'
+        )
+        parser.add_argument(
+            '--sessions',
+            type=int,
+            default=4,
+            help='Distinct session rows the writers contend on (default: 4)'
+        )
+        parser.add_argument(
+            '--payload-kb',
+            type=int,
+            default=16,
+            help='Size of the JSON payload written per autosave in KiB (default: 16)'
+        )
+        parser.add_argument(
+            '--profile',
+            choices=PROFILES + ('both',),
+            default='both',
+            help='Which profile(s) to run (default: both)'
+        )
+
+    def handle(self, *args, **options):
+        if options['writers'] <= 0 or options['iterations'] <= 0 or options['sessions'] <= 0:
+            raise CommandError('--writers, --iterations and --sessions must be greater than 0')
+
+        profiles = PROFILES if options['profile'] == 'both' else (options['profile'],)
+        results = {name: self._run_profile(name, options) for name in profiles}
+
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'profile':<8} {'ok':>7} {'locked':>7} {'errors':>7} {'txn/s':>9} {'p50 ms':>8} {'p95 ms':>8}"
+        )
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<8} {r['ok']:>7} {r['locked']:>7} {r['errors']:>7} "
+                f"{r['throughput']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}"
+            )
+
+        tuned = results.get('tuned')
+        if tuned is not None and tuned['locked']:
+            raise CommandError(f"Tuned profile hit {tuned['locked']} 'database is locked' error(s)")
+
+    def _profile_settings(self, name):
+        """Return (OPTIONS, CONN_MAX_AGE) for a profile."""
+        if name == 'tuned':
+            return copy.deepcopy(settings.SQLITE_TUNED_OPTIONS), settings.DB_CONN_MAX_AGE
+        return {}, 0
+
+    def _run_profile(self, name, options):
+        db_options, conn_max_age = self._profile_settings(name)
+        alias = f'sqlite_benchmark_{name}'
+
+        with tempfile.TemporaryDirectory() as tmp:
+            settings_dict = copy.deepcopy(connections['default'].settings_dict)
+            settings_dict.update({
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(tmp, 'benchmark.sqlite3'),
+                'OPTIONS': db_options,
+                'CONN_MAX_AGE': conn_max_age,
+            })
+            connections.settings[alias] = settings_dict
+            try:
+                self._create_schema(alias, options)
+                return self._run_workload(name, alias, conn_max_age, options)
+            finally:
+                connections[alias].close()
+                del connections.settings[alias]
+
+    def _create_schema(self, alias, options):
+        payload = json.dumps({'items': []})
+        with connections[alias].cursor() as cursor:
+            for stmt in _SCHEMA:
+                cursor.execute(stmt)
+            for session_id in range(1, options['sessions'] + 1):
+                cursor.execute(
+                    "INSERT INTO bench_session (id, payload, version) VALUES (%s, %s, 0)",
+                    [session_id, payload],
+                )
+
+    def _run_workload(self, name, alias, conn_max_age, options):
+        lock = threading.Lock()
+        stats = {'ok': 0, 'locked': 0, 'errors': 0, 'latencies': []}
+        writers_done = threading.Event()
+        start_barrier = threading.Barrier(options['writers'] + options['readers'])
+        filler = 'x' * (options['payload_kb'] * 1024)
+
+        def writer(worker_id):
+            start_barrier.wait()
+            conn = connections[alias]
+            try:
+                for i in range(options['iterations']):
+                    session_id = (worker_id + i) % options['sessions'] + 1
+                    payload = json.dumps({'worker': worker_id, 'i': i, 'notes': filler})
+                    started = time.perf_counter()
+                    outcome = 'ok'
+                    try:
+                        with transaction.atomic(using=alias):
+                            with conn.cursor() as cursor:
+                                cursor.execute("SELECT version FROM bench_session WHERE id = %s", [session_id])
+                                version = cursor.fetchone()[0] + 1
+                                cursor.execute(
+                                    "UPDATE bench_session SET payload = %s, version = %s WHERE id = %s",
+                                    [payload, version, session_id],
+                                )
+                                cursor.execute(
+                                    "INSERT INTO bench_history (session_id, version, payload) VALUES (%s, %s, %s)",
+                                    [session_id, version, payload],
+                                )
+                    except OperationalError as exc:
+                        outcome = 'locked' if 'locked' in str(exc).lower() else 'errors'
+                    except Exception:
+                        outcome = 'errors'
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        stats[outcome] += 1
+                        if outcome == 'ok':
+                            stats['latencies'].append(elapsed)
+                    if not conn_max_age:
+                        conn.close()
+            finally:
+                conn.close()
+
+        def reader():
+            start_barrier.wait()
+            conn = connections[alias]
+            try:
+                while not writers_done.is_set():
+                    try:
+                        with conn.cursor() as cursor:
+                            cursor.execute("SELECT COUNT(*), MAX(version) FROM bench_history")
+                            cursor.fetchone()
+                    except OperationalError as exc:
+                        with lock:
+                            stats['locked' if 'locked' in str(exc).lower() else 'errors'] += 1
+                    time.sleep(0.005)
+            finally:
+                conn.close()
+
+        self.stdout.write(
+            f"Running '{name}' profile: {options['writers']} writer(s) x {options['iterations']} txn, "
+            f"{options['readers']} reader(s)"
+        )
+        writer_threads = [threading.Thread(target=writer, args=(n,)) for n in range(options['writers'])]
+        reader_threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        started = time.perf_counter()
+        for t in writer_threads + reader_threads:
+            t.start()
+        for t in writer_threads:
+            t.join()
+        wall = time.perf_counter() - started
+        writers_done.set()
+        for t in reader_threads:
+            t.join()
+
+        latencies = sorted(stats['latencies'])
+        return {
+            'ok': stats['ok'],
+            'locked': stats['locked'],
+            'errors': stats['errors'],
+            'throughput': stats['ok'] / wall if wall else 0.0,
+            'p50_ms': statistics.median(latencies) * 1000 if latencies else 0.0,
+            'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+        }
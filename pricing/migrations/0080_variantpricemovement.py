@@ -0,0 +1,92 @@
+# Post-import CeX price "movers" table, filled by import_cex_data.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0079_merge_20260426_1406'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VariantPriceMovement',
+            fields=[
+                ('movement_id', models.AutoField(primary_key=True, serialize=False)),
+                (
+                    'previous_price_gbp',
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text='CeX sell price before the import run',
+                        max_digits=10,
+                    ),
+                ),
+                (
+                    'new_price_gbp',
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text='CeX sell price after the import run',
+                        max_digits=10,
+                    ),
+                ),
+                (
+                    'delta_gbp',
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text='new_price_gbp - previous_price_gbp (negative = drop)',
+                        max_digits=10,
+                    ),
+                ),
+                (
+                    'delta_pct',
+                    models.DecimalField(
+                        db_index=True,
+                        decimal_places=2,
+                        help_text='Change as % of previous_price_gbp (negative = drop)',
+                        max_digits=8,
+                    ),
+                ),
+                (
+                    'import_run_at',
+                    models.DateTimeField(
+                        db_index=True,
+                        help_text='Start time of the import_cex_data run that detected this move',
+                    ),
+                ),
+                (
+                    'category',
+                    models.ForeignKey(
+                        db_column='category_id',
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='price_movements',
+                        to='pricing.productcategory',
+                    ),
+                ),
+                (
+                    'variant',
+                    models.ForeignKey(
+                        db_column='variant_id',
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='price_movements',
+                        to='pricing.variant',
+                    ),
+                ),
+            ],
+            options={
+                'db_table': 'pricing_variant_price_movement',
+                'ordering': ['delta_pct'],
+                'indexes': [
+                    models.Index(
+                        fields=['import_run_at', 'category', 'delta_pct'],
+                        name='pricing_var_import__40a637_idx',
+                    ),
+                    models.Index(
+                        fields=['variant', '-import_run_at'],
+                        name='pricing_var_variant_a1c34c_idx',
+                    ),
+                ],
+            },
+        ),
+    ]
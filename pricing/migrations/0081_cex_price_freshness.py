@@ -0,0 +1,45 @@
+# CeX price freshness: per-rule max age, last-confirmed timestamp and cached
+# image urls on Variant so fresh prices can be served without a live CeX call.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0080_variantpricemovement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricingrule',
+            name='cex_price_max_age_minutes',
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text=(
+                    'How old (minutes) a stored CeX price may be before pricing endpoints '
+                    're-fetch it live. Leave blank to use CEX_PRICE_MAX_AGE_MINUTES.'
+                ),
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name='variant',
+            name='cex_image_urls',
+            field=models.JSONField(
+                blank=True,
+                help_text='CeX imageUrls ({large, medium, small}) from the last live fetch',
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name='variant',
+            name='cex_price_checked_at',
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text='When we last confirmed the stored CeX prices (import or live fetch)',
+                null=True,
+            ),
+        ),
+    ]
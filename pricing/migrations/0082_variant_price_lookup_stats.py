@@ -0,0 +1,31 @@
+# Lookup counters on Variant so refresh_hot_cex_prices can pick the SKUs staff actually price.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0081_cex_price_freshness'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='variant',
+            name='last_price_lookup_at',
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text='When a pricing endpoint last looked this variant up',
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name='variant',
+            name='price_lookup_count',
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text='How many times pricing endpoints have looked this variant up (refresh worker hotness)',
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# GIN indexes on the JSON research / session payloads. PostgreSQL only: on
+# SQLite (JSON stored as text) these operations are no-ops.
+
+from django.db import migrations
+
+
+# (index name, table, column)
+GIN_INDEXES = [
+    ('pricing_repricing_session_data_gin', 'pricing_repricing_session', 'session_data'),
+    ('pricing_upload_session_data_gin', 'pricing_upload_session', 'session_data'),
+    ('buying_request_item_cex_ref_gin', 'buying_request_item', 'cex_reference_json'),
+    ('buying_request_item_line_meta_gin', 'buying_request_item', 'line_metadata_json'),
+    ('pricing_mr_session_filter_state_gin', 'pricing_market_research_session', 'filter_state_json'),
+    ('pricing_mr_listing_extra_gin', 'pricing_market_research_listing', 'extra'),
+]
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in GIN_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING gin ("{column}")'
+        )
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _column in GIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0082_variant_price_lookup_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
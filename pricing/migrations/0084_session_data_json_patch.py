@@ -0,0 +1,95 @@
+# JSON-patch autosave for repricing / upload session_data: version counters on
+# the sessions plus the SessionDataPatch log replayed on top of the snapshot.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+VERSION_HELP = 'Bumped on every session_data write; JSON-patch autosaves must name the version they edit'
+SNAPSHOT_HELP = 'Version stored in session_data; later versions are SessionDataPatch rows on top of it'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0083_postgres_json_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='repricingsession',
+            name='session_data_snapshot_version',
+            field=models.PositiveIntegerField(default=0, help_text=SNAPSHOT_HELP),
+        ),
+        migrations.AddField(
+            model_name='repricingsession',
+            name='session_data_version',
+            field=models.PositiveIntegerField(default=0, help_text=VERSION_HELP),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='session_data_snapshot_version',
+            field=models.PositiveIntegerField(default=0, help_text=SNAPSHOT_HELP),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='session_data_version',
+            field=models.PositiveIntegerField(default=0, help_text=VERSION_HELP),
+        ),
+        migrations.CreateModel(
+            name='SessionDataPatch',
+            fields=[
+                ('patch_id', models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    'version',
+                    models.PositiveIntegerField(help_text='session_data_version after applying this patch'),
+                ),
+                ('operations', models.JSONField(help_text='RFC 6902 operations, applied in order')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                (
+                    'repricing_session',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='session_data_patches',
+                        to='pricing.repricingsession',
+                    ),
+                ),
+                (
+                    'upload_session',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='session_data_patches',
+                        to='pricing.uploadsession',
+                    ),
+                ),
+            ],
+            options={
+                'db_table': 'pricing_session_data_patch',
+                'ordering': ['version'],
+                'constraints': [
+                    models.CheckConstraint(
+                        condition=models.Q(
+                            models.Q(('repricing_session__isnull', False), ('upload_session__isnull', True)),
+                            models.Q(('repricing_session__isnull', True), ('upload_session__isnull', False)),
+                            _connector='OR',
+                        ),
+                        name='session_data_patch_parent_xor',
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(('repricing_session__isnull', False)),
+                        fields=('repricing_session', 'version'),
+                        name='uniq_repricing_session_data_patch_version',
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(('upload_session__isnull', False)),
+                        fields=('upload_session', 'version'),
+                        name='uniq_upload_session_data_patch_version',
+                    ),
+                ],
+            },
+        ),
+    ]
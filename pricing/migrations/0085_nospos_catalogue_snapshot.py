@@ -0,0 +1,32 @@
+# Precomputed, versioned NosPos category/field catalogue served with ETags.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0084_session_data_json_patch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NosposCatalogueSnapshot',
+            fields=[
+                ('version', models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    'etag',
+                    models.CharField(db_index=True, help_text='Content hash of the uncompressed payload', max_length=64),
+                ),
+                ('category_count', models.PositiveIntegerField(default=0)),
+                ('payload_gzip', models.BinaryField(help_text='gzip-compressed JSON body')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'NosPos catalogue snapshot',
+                'verbose_name_plural': 'NosPos catalogue snapshots',
+                'db_table': 'nosposcatalogue_snapshot',
+                'ordering': ['-version'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Persistent cache of LLM responses for the AI suggestion endpoints.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0085_nospos_catalogue_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AiResponseCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='sha256 of model + prompts', max_length=64, unique=True)),
+                ('label', models.CharField(blank=True, help_text='Caller label, e.g. AI Category L1', max_length=64)),
+                ('model', models.CharField(max_length=128)),
+                ('provider', models.CharField(help_text='Provider that produced the response', max_length=32)),
+                ('response', models.TextField(help_text='Raw JSON text returned by the model')),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'AI response cache entry',
+                'verbose_name_plural': 'AI response cache entries',
+                'db_table': 'pricing_ai_response_cache',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Persistent cache of Ideal Postcodes lookups keyed by normalised postcode.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0086_ai_response_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostcodeLookupCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('postcode', models.CharField(help_text='Upper-case postcode without spaces', max_length=16, unique=True)),
+                ('found', models.BooleanField(default=True, help_text='False when Ideal Postcodes answered 404')),
+                ('addresses', models.JSONField(blank=True, default=list, help_text='Ideal Postcodes result list')),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('fetched_at', models.DateTimeField()),
+                ('last_used_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Postcode lookup cache entry',
+                'verbose_name_plural': 'Postcode lookup cache entries',
+                'db_table': 'pricing_postcode_lookup_cache',
+            },
+        ),
+    ]
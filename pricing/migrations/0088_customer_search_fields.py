@@ -0,0 +1,76 @@
+# Normalised phone / name / email columns on buying_customer for indexed
+# prefix search, backfilled from the existing rows.
+
+import re
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+# Frozen copies of pricing.utils.parsing.normalize_phone / normalize_search_text
+# as of this migration, so later changes to those helpers don't change the backfill.
+_NON_DIGIT_RE = re.compile(r"\D")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_phone(value):
+    digits = _NON_DIGIT_RE.sub("", str(value or ""))
+    if digits.startswith("0044"):
+        digits = "0" + digits[4:]
+    elif digits.startswith("44") and len(digits) > 10:
+        digits = "0" + digits[2:]
+    return digits
+
+
+def normalize_search_text(value):
+    return " ".join(_PUNCT_RE.sub("", str(value or "").casefold()).split())
+
+
+def backfill_search_fields(apps, schema_editor):
+    Customer = apps.get_model('pricing', 'Customer')
+    batch = []
+    for customer in Customer.objects.only('customer_id', 'name', 'phone_number', 'email').iterator(chunk_size=BATCH_SIZE):
+        customer.phone_digits = normalize_phone(customer.phone_number)[:50]
+        customer.name_search = normalize_search_text(customer.name)[:255]
+        customer.surname_search = (
+            customer.name_search.rsplit(' ', 1)[-1] if ' ' in customer.name_search else ''
+        )
+        customer.email_search = (customer.email or '').strip().lower()[:255]
+        batch.append(customer)
+        if len(batch) >= BATCH_SIZE:
+            Customer.objects.bulk_update(batch, ['phone_digits', 'name_search', 'surname_search', 'email_search'])
+            batch = []
+    if batch:
+        Customer.objects.bulk_update(batch, ['phone_digits', 'name_search', 'surname_search', 'email_search'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0087_postcode_lookup_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='phone_digits',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='name_search',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='surname_search',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='email_search',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_search_fields, migrations.RunPython.noop),
+    ]
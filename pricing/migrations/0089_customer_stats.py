@@ -0,0 +1,78 @@
+# Per-customer request counters (request counts, abandoned quotes, negotiated totals)
+# maintained on RequestStatusHistory writes, backfilled from existing history.
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BUCKETS = {
+    'QUOTE': 'open_quotes',
+    'BOOKED_FOR_TESTING': 'booked_for_testing',
+    'COMPLETE': 'completed',
+}
+
+
+def backfill_customer_stats(apps, schema_editor):
+    Customer = apps.get_model('pricing', 'Customer')
+    CustomerStats = apps.get_model('pricing', 'CustomerStats')
+    Request = apps.get_model('pricing', 'Request')
+    RequestStatusHistory = apps.get_model('pricing', 'RequestStatusHistory')
+
+    rows = {
+        customer_id: CustomerStats(customer_id=customer_id)
+        for customer_id in Customer.objects.values_list('customer_id', flat=True).iterator()
+    }
+    latest = {}
+    for request_id, status in (
+        RequestStatusHistory.objects.order_by('request_id', 'effective_at', 'pk')
+        .values_list('request_id', 'status').iterator()
+    ):
+        latest[request_id] = status
+    for request_id, customer_id, negotiated in (
+        Request.objects.order_by('request_id')
+        .values_list('request_id', 'customer_id', 'negotiated_grand_total_gbp').iterator()
+    ):
+        status = latest.get(request_id)
+        stats = rows.get(customer_id)
+        if status is None or stats is None:
+            continue
+        stats.total_requests += 1
+        if status in BUCKETS:
+            setattr(stats, BUCKETS[status], getattr(stats, BUCKETS[status]) + 1)
+        if status == 'COMPLETE':
+            stats.negotiated_total_gbp += negotiated or Decimal('0')
+        stats.last_request_id = request_id
+        stats.last_request_status = status
+    CustomerStats.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0088_customer_search_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='pricing.customer')),
+                ('total_requests', models.PositiveIntegerField(default=0)),
+                ('open_quotes', models.PositiveIntegerField(default=0)),
+                ('booked_for_testing', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('negotiated_total_gbp', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of negotiated_grand_total_gbp over completed requests', max_digits=14)),
+                ('last_request_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('last_request_status', models.CharField(blank=True, default='', max_length=30)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Customer stats',
+                'verbose_name_plural': 'Customer stats',
+                'db_table': 'buying_customer_stats',
+            },
+        ),
+        migrations.RunPython(backfill_customer_stats, migrations.RunPython.noop),
+    ]
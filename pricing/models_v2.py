@@ -2,7 +2,7 @@
 models_v2
 """
 
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q, F
 from django.core.validators import MinValueValidator
 from decimal import Decimal
@@ -366,6 +366,15 @@ class PricingRule(models.Model):
         )
     )
 
+    cex_price_max_age_minutes = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text=(
+            "How old (minutes) a stored CeX price may be before pricing endpoints "
+            "re-fetch it live. Leave blank to use CEX_PRICE_MAX_AGE_MINUTES."
+        )
+    )
+
     class Meta:
         db_table = 'pricing_rule'
         constraints = [
@@ -468,6 +477,31 @@ class Variant(models.Model):
         help_text="Indicates whether the variant is out of stock at CeX"
     )
 
+    cex_price_checked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="When we last confirmed the stored CeX prices (import or live fetch)"
+    )
+
+    cex_image_urls = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="CeX imageUrls ({large, medium, small}) from the last live fetch"
+    )
+
+    price_lookup_count = models.PositiveIntegerField(
+        default=0,
+        help_text="How many times pricing endpoints have looked this variant up (refresh worker hotness)"
+    )
+
+    last_price_lookup_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="When a pricing endpoint last looked this variant up"
+    )
+
 
     variant_signature = models.CharField(
         max_length=500,
@@ -595,6 +629,63 @@ class VariantPriceHistory(models.Model):
         return f"{self.variant.cex_sku} - £{self.price_gbp} @ {self.recorded_at}"
 
 
+class VariantPriceMovement(models.Model):
+    """
+    Significant CeX sell-price move detected by import_cex_data ("movers").
+    One row per moved variant per import run; rows from the same run share
+    import_run_at. Category is denormalised so movers can be ranked per category.
+    """
+    movement_id = models.AutoField(primary_key=True)
+    variant = models.ForeignKey(
+        Variant,
+        on_delete=models.CASCADE,
+        related_name='price_movements',
+        db_column='variant_id'
+    )
+    category = models.ForeignKey(
+        ProductCategory,
+        on_delete=models.CASCADE,
+        related_name='price_movements',
+        db_column='category_id'
+    )
+    previous_price_gbp = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        help_text="CeX sell price before the import run"
+    )
+    new_price_gbp = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        help_text="CeX sell price after the import run"
+    )
+    delta_gbp = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        help_text="new_price_gbp - previous_price_gbp (negative = drop)"
+    )
+    delta_pct = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        db_index=True,
+        help_text="Change as % of previous_price_gbp (negative = drop)"
+    )
+    import_run_at = models.DateTimeField(
+        db_index=True,
+        help_text="Start time of the import_cex_data run that detected this move"
+    )
+
+    class Meta:
+        db_table = 'pricing_variant_price_movement'
+        ordering = ['delta_pct']
+        indexes = [
+            models.Index(fields=['import_run_at', 'category', 'delta_pct']),
+            models.Index(fields=['variant', '-import_run_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.variant.cex_sku} {self.delta_pct:+}% @ {self.import_run_at}"
+
+
 class Location(models.Model):
     """
     A physical location that can hold inventory.
@@ -795,18 +886,44 @@ class Customer(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Normalised copies of phone / name / email for indexed prefix search
+    # (pricing.services.customer_search); kept in step by save().
+    phone_digits = models.CharField(max_length=50, blank=True, default="", db_index=True, editable=False)
+    name_search = models.CharField(max_length=255, blank=True, default="", db_index=True, editable=False)
+    surname_search = models.CharField(max_length=255, blank=True, default="", db_index=True, editable=False)
+    email_search = models.CharField(max_length=255, blank=True, default="", db_index=True, editable=False)
+
+    SEARCH_FIELDS = ("phone_digits", "name_search", "surname_search", "email_search")
+
+    def refresh_search_fields(self):
+        from pricing.utils.parsing import normalize_phone, normalize_search_text
+
+        self.phone_digits = normalize_phone(self.phone_number)[:50]
+        self.name_search = normalize_search_text(self.name)[:255]
+        self.surname_search = self.name_search.rsplit(" ", 1)[-1] if " " in self.name_search else ""
+        self.email_search = (self.email or "").strip().lower()[:255]
+
+    def save(self, *args, **kwargs):
+        self.refresh_search_fields()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | set(self.SEARCH_FIELDS)
+        super().save(*args, **kwargs)
+
     @property
     def cancel_rate(self):
-        from django.db.models import Q, Subquery, OuterRef
-        
-        total_requests = self.requests.count()
-        if total_requests == 0:
+        """
+        Cancelled requests as a %, from CustomerStats (no per-customer COUNT).
+        Select ``stats`` with the customer to keep this query-free. Request
+        save() / delete() keep the stats in step; queryset update() / delete()
+        bypass them, so run rebuild_customer_stats after those.
+        """
+        try:
+            stats = self.stats
+        except CustomerStats.DoesNotExist:
             return 0.0
-        
-        # Get the latest status for each request
-        # Note: CANCELLED status has been removed, so cancel_rate is always 0
-        return 0.0
-    
+        return stats.cancel_rate
+
 
     def __str__(self):  
         return self.name
@@ -883,6 +1000,39 @@ class Request(models.Model):
         help_text="Park agreement: NosPos items URL, excluded line ids, progress modal snapshot (in-store testing)",
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what CustomerStats counted this request under, so save()
+        # can tell when a reassignment or a new total makes them stale.
+        instance._stats_snapshot = (
+            instance.__dict__.get("customer_id"),
+            instance.__dict__.get("negotiated_grand_total_gbp"),
+        )
+        return instance
+
+    def save(self, *args, **kwargs):
+        snapshot = getattr(self, "_stats_snapshot", None)
+        current = (self.customer_id, self.negotiated_grand_total_gbp)
+        if self._state.adding or snapshot is None or snapshot == current:
+            super().save(*args, **kwargs)
+        else:
+            from pricing.services.customer_stats import request_stats_changed
+
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                request_stats_changed(self, *snapshot)
+        self._stats_snapshot = current
+
+    def delete(self, *args, **kwargs):
+        from pricing.services.customer_stats import rebuild_customer_stats
+
+        customer_id = self.customer_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            rebuild_customer_stats([customer_id])
+        return result
+
     def __str__(self):
         # This will show "Request #101 - John Doe (BUYBACK)"
         return f"Request #{self.request_id} - {self.customer.name} ({self.intent})"
@@ -1489,6 +1639,14 @@ class RepricingSession(models.Model):
         blank=True,
         help_text="Full frontend state for resuming in-progress sessions (items, barcodes, lookups, research)"
     )
+    session_data_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Bumped on every session_data write; JSON-patch autosaves must name the version they edit",
+    )
+    session_data_snapshot_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Version stored in session_data; later versions are SessionDataPatch rows on top of it",
+    )
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -1592,6 +1750,14 @@ class UploadSession(models.Model):
         blank=True,
         help_text="Full frontend state for resuming upload sessions (items, barcodes, lookups, research)",
     )
+    session_data_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Bumped on every session_data write; JSON-patch autosaves must name the version they edit",
+    )
+    session_data_snapshot_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Version stored in session_data; later versions are SessionDataPatch rows on top of it",
+    )
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -1614,6 +1780,56 @@ class UploadSessionItem(AbstractStockSessionLine):
         ordering = ["upload_session_item_id"]
 
 
+class SessionDataPatch(models.Model):
+    """
+    One RFC 6902 JSON-patch autosave on a repricing or upload session's session_data.
+    Rows above the session's snapshot version are replayed on read and folded into
+    session_data (then deleted) every SESSION_DATA_SNAPSHOT_EVERY versions.
+    """
+
+    patch_id = models.BigAutoField(primary_key=True)
+    repricing_session = models.ForeignKey(
+        RepricingSession,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="session_data_patches",
+    )
+    upload_session = models.ForeignKey(
+        UploadSession,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="session_data_patches",
+    )
+    version = models.PositiveIntegerField(help_text="session_data_version after applying this patch")
+    operations = models.JSONField(help_text="RFC 6902 operations, applied in order")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "pricing_session_data_patch"
+        ordering = ["version"]
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    (Q(repricing_session__isnull=False) & Q(upload_session__isnull=True))
+                    | (Q(repricing_session__isnull=True) & Q(upload_session__isnull=False))
+                ),
+                name="session_data_patch_parent_xor",
+            ),
+            models.UniqueConstraint(
+                fields=["repricing_session", "version"],
+                condition=Q(repricing_session__isnull=False),
+                name="uniq_repricing_session_data_patch_version",
+            ),
+            models.UniqueConstraint(
+                fields=["upload_session", "version"],
+                condition=Q(upload_session__isnull=False),
+                name="uniq_upload_session_data_patch_version",
+            ),
+        ]
+
+
 class MarketResearchPlatform(models.TextChoices):
     EBAY = "EBAY", "eBay"
     CASH_CONVERTERS = "CASH_CONVERTERS", "Cash Converters"
@@ -1799,6 +2015,79 @@ class RequestStatusHistory(models.Model):
         db_table = "buying_request_status"
         ordering = ["-effective_at"]
 
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # New status rows move the request between CustomerStats buckets.
+            from pricing.services.customer_stats import record_status_change
+
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                record_status_change(self)
+            return
+        super().save(*args, **kwargs)
+
+
+class CustomerStats(models.Model):
+    """
+    Per-customer request counters, updated as RequestStatusHistory rows are
+    written (pricing.services.customer_stats) so cancel rate and customer
+    summaries never count requests on read.
+
+    Each request sits in exactly one of open_quotes / booked_for_testing /
+    completed according to its latest status. last_request_* track the
+    customer's newest request: an open quote there is in progress, while
+    any other open quote counts as quote-abandoned.
+    """
+
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+    total_requests = models.PositiveIntegerField(default=0)
+    open_quotes = models.PositiveIntegerField(default=0)
+    booked_for_testing = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    negotiated_total_gbp = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        help_text="Sum of negotiated_grand_total_gbp over completed requests",
+    )
+    last_request_id = models.PositiveIntegerField(null=True, blank=True)
+    last_request_status = models.CharField(max_length=30, blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "buying_customer_stats"
+        verbose_name = "Customer stats"
+        verbose_name_plural = "Customer stats"
+
+    def __str__(self):
+        return f"Stats for customer {self.customer_id}"
+
+    @property
+    def quote_abandoned(self):
+        in_progress = 1 if self.last_request_status == RequestStatus.QUOTE else 0
+        return max(0, self.open_quotes - in_progress)
+
+    @property
+    def cancel_rate(self):
+        # The CANCELLED status was removed, so no request counts as cancelled.
+        # Abandoned quotes are reported separately (quote_abandoned) and must
+        # not feed the customer-type tiers that read cancel_rate.
+        return 0.0
+
+    def as_dict(self):
+        return {
+            "total_requests": self.total_requests,
+            "completed": self.completed,
+            "booked_for_testing": self.booked_for_testing,
+            "quote_abandoned": self.quote_abandoned,
+            "negotiated_total_gbp": str(self.negotiated_total_gbp),
+        }
+
 
 class TradeInOutcome(models.TextChoices):
     BUYBACK = "BUYBACK"
@@ -2172,3 +2461,80 @@ class NosposCategoryField(models.Model):
 
     def __str__(self):
         return f"{self.category_id}:{self.field_id} active={self.active}"
+
+
+class NosposCatalogueSnapshot(models.Model):
+    """
+    Precomputed GET /nospos-categories/ payload (categories with linked fields),
+    rebuilt after the NosPos sync endpoints write. Served with its etag so
+    clients can revalidate without re-downloading the tree.
+    """
+
+    version = models.BigAutoField(primary_key=True)
+    etag = models.CharField(
+        max_length=64,
+        db_index=True,
+        help_text="Content hash of the uncompressed payload",
+    )
+    category_count = models.PositiveIntegerField(default=0)
+    payload_gzip = models.BinaryField(help_text="gzip-compressed JSON body")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "nosposcatalogue_snapshot"
+        verbose_name = "NosPos catalogue snapshot"
+        verbose_name_plural = "NosPos catalogue snapshots"
+        ordering = ["-version"]
+
+    def __str__(self):
+        return f"v{self.version} ({self.category_count} categories)"
+
+
+class AiResponseCache(models.Model):
+    """
+    Stored LLM response keyed by a hash of (system prompt, user prompt, model).
+    Identical AI suggestion prompts are answered from here until expires_at;
+    least recently used rows are evicted past AI_RESPONSE_CACHE_MAX_ENTRIES.
+    """
+
+    key = models.CharField(max_length=64, unique=True, help_text="sha256 of model + prompts")
+    label = models.CharField(max_length=64, blank=True, help_text="Caller label, e.g. AI Category L1")
+    model = models.CharField(max_length=128)
+    provider = models.CharField(max_length=32, help_text="Provider that produced the response")
+    response = models.TextField(help_text="Raw JSON text returned by the model")
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "pricing_ai_response_cache"
+        verbose_name = "AI response cache entry"
+        verbose_name_plural = "AI response cache entries"
+
+    def __str__(self):
+        return f"{self.label or self.model} ({self.key[:12]})"
+
+
+class PostcodeLookupCache(models.Model):
+    """
+    Stored Ideal Postcodes answer for one normalised postcode (upper-case, no
+    spaces). ``found=False`` rows record a 404 so unknown postcodes are not
+    paid for again until they expire.
+    """
+
+    postcode = models.CharField(max_length=16, unique=True, help_text="Upper-case postcode without spaces")
+    found = models.BooleanField(default=True, help_text="False when Ideal Postcodes answered 404")
+    addresses = models.JSONField(default=list, blank=True, help_text="Ideal Postcodes result list")
+    hit_count = models.PositiveIntegerField(default=0)
+    fetched_at = models.DateTimeField()
+    last_used_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "pricing_postcode_lookup_cache"
+        verbose_name = "Postcode lookup cache entry"
+        verbose_name_plural = "Postcode lookup cache entries"
+
+    def __str__(self):
+        return f"{self.postcode} ({len(self.addresses or [])} addresses)"
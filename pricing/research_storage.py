@@ -12,6 +12,7 @@ from decimal import Decimal, InvalidOperation
 from typing import Any
 
 from django.db import transaction
+from django.db.models import Q
 
 from .models_v2 import (
     AttributeValue,
@@ -223,6 +224,106 @@ def _upsert_jewellery_from_reference_payload(item: RequestItem, ref: dict) -> No
             )
 
 
+def _market_research_session_fields(payload: dict, prev_adv: Any) -> dict:
+    """Column values for a MarketResearchSession built from a client research payload."""
+    stats = payload.get("stats") or {}
+    sel = payload.get("selectedFilters")
+    filt_opts = payload.get("filterOptions")
+    filter_state = None
+    if sel is not None or filt_opts is not None:
+        filter_state = {"selectedFilters": sel, "filterOptions": filt_opts}
+    return {
+        "search_term": str(payload.get("searchTerm") or "")[:500],
+        "listing_page_url": str(payload.get("listingPageUrl") or "")[:2000],
+        "show_histogram": bool(payload.get("showHistogram")),
+        "manual_offer_text": str(payload.get("manualOffer") or "")[:64],
+        "selected_offer_index": _parse_selected_offer_index(payload.get("selectedOfferIndex")),
+        "stat_average_gbp": _dec(stats.get("average")),
+        "stat_median_gbp": _dec(stats.get("median")),
+        "stat_suggested_sale_gbp": _dec(stats.get("suggestedPrice")),
+        "advanced_filter_state": _merge_advanced_filter_state(
+            prev_adv, payload.get("advancedFilterState")
+        ),
+        "filter_state_json": filter_state,
+        "buy_offers_json": payload.get("buyOffers"),
+    }
+
+
+def _build_drill_levels(session: MarketResearchSession, payload: dict) -> list[MarketResearchDrillLevel]:
+    """Unsaved drill-level rows for ``session`` from payload.drillHistory."""
+    levels: list[MarketResearchDrillLevel] = []
+    for idx, level in enumerate(payload.get("drillHistory") or []):
+        if not isinstance(level, dict):
+            continue
+        kind = str(level.get("kind") or "").lower()
+        segments_raw = level.get("segments")
+        if kind == "multi" and isinstance(segments_raw, list) and len(segments_raw) > 1:
+            clean: list[dict[str, float]] = []
+            env_min: Decimal | None = None
+            env_max: Decimal | None = None
+            for seg in segments_raw[:32]:
+                if not isinstance(seg, dict):
+                    continue
+                da, db = _dec(seg.get("min")), _dec(seg.get("max"))
+                if da is None or db is None or da > db:
+                    continue
+                clean.append({"min": float(da), "max": float(db)})
+                env_min = da if env_min is None else min(env_min, da)
+                env_max = db if env_max is None else max(env_max, db)
+            if len(clean) < 2 or env_min is None or env_max is None:
+                continue
+            levels.append(
+                MarketResearchDrillLevel(
+                    session=session,
+                    level_index=idx,
+                    min_gbp=env_min,
+                    max_gbp=env_max,
+                    segments_json=clean,
+                )
+            )
+            continue
+        da, db = _dec(level.get("min")), _dec(level.get("max"))
+        if da is None or db is None:
+            continue
+        levels.append(
+            MarketResearchDrillLevel(
+                session=session,
+                level_index=idx,
+                min_gbp=da,
+                max_gbp=db,
+                segments_json=None,
+            )
+        )
+    return levels
+
+
+def _build_listings(session: MarketResearchSession, payload: dict) -> list[MarketResearchListing]:
+    """Unsaved listing rows for ``session`` from payload.listings."""
+    listings: list[MarketResearchListing] = []
+    for order, row in enumerate(payload.get("listings") or []):
+        if not isinstance(row, dict):
+            continue
+        extra = _strip_known_keys(row, STANDARD_LISTING_KEYS)
+        listings.append(
+            MarketResearchListing(
+                session=session,
+                sort_order=order,
+                client_row_id=str(row.get("_id") or "")[:128],
+                external_item_id=str(row.get("itemId") or "")[:64],
+                title=str(row.get("title") or ""),
+                price_gbp=_dec(row.get("price")),
+                listing_url=str(row.get("url") or "")[:2000],
+                image_url=str(row.get("image") or "")[:2000] if row.get("image") else "",
+                excluded=bool(row.get("excluded")),
+                sold_text=str(row.get("sold") or "")[:256],
+                shop_name=str(row.get("shop") or "")[:256],
+                seller_info=str(row.get("sellerInfo") or "")[:2000],
+                extra=extra,
+            )
+        )
+    return listings
+
+
 def _replace_market_research(
     *,
     platform: str,
@@ -267,88 +368,19 @@ def _replace_market_research(
         .values_list("advanced_filter_state", flat=True)
         .first()
     )
-    stats = payload.get("stats") or {}
-    sel = payload.get("selectedFilters")
-    filt_opts = payload.get("filterOptions")
-    filter_state = None
-    if sel is not None or filt_opts is not None:
-        filter_state = {"selectedFilters": sel, "filterOptions": filt_opts}
     session, created = MarketResearchSession.objects.update_or_create(
         defaults={
             **owner_fields,
-            "search_term": str(payload.get("searchTerm") or "")[:500],
-            "listing_page_url": str(payload.get("listingPageUrl") or "")[:2000],
-            "show_histogram": bool(payload.get("showHistogram")),
-            "manual_offer_text": str(payload.get("manualOffer") or "")[:64],
-            "selected_offer_index": _parse_selected_offer_index(payload.get("selectedOfferIndex")),
-            "stat_average_gbp": _dec(stats.get("average")),
-            "stat_median_gbp": _dec(stats.get("median")),
-            "stat_suggested_sale_gbp": _dec(stats.get("suggestedPrice")),
-            "advanced_filter_state": _merge_advanced_filter_state(
-                prev_adv, payload.get("advancedFilterState")
-            ),
-            "filter_state_json": filter_state,
-            "buy_offers_json": payload.get("buyOffers"),
+            **_market_research_session_fields(payload, prev_adv),
         },
         **session_filter,
     )
-    for idx, level in enumerate(payload.get("drillHistory") or []):
-        if not isinstance(level, dict):
-            continue
-        kind = str(level.get("kind") or "").lower()
-        segments_raw = level.get("segments")
-        if kind == "multi" and isinstance(segments_raw, list) and len(segments_raw) > 1:
-            clean: list[dict[str, float]] = []
-            env_min: Decimal | None = None
-            env_max: Decimal | None = None
-            for seg in segments_raw[:32]:
-                if not isinstance(seg, dict):
-                    continue
-                da, db = _dec(seg.get("min")), _dec(seg.get("max"))
-                if da is None or db is None or da > db:
-                    continue
-                clean.append({"min": float(da), "max": float(db)})
-                env_min = da if env_min is None else min(env_min, da)
-                env_max = db if env_max is None else max(env_max, db)
-            if len(clean) < 2 or env_min is None or env_max is None:
-                continue
-            MarketResearchDrillLevel.objects.create(
-                session=session,
-                level_index=idx,
-                min_gbp=env_min,
-                max_gbp=env_max,
-                segments_json=clean,
-            )
-            continue
-        da, db = _dec(level.get("min")), _dec(level.get("max"))
-        if da is None or db is None:
-            continue
-        MarketResearchDrillLevel.objects.create(
-            session=session,
-            level_index=idx,
-            min_gbp=da,
-            max_gbp=db,
-            segments_json=None,
-        )
-    for order, row in enumerate(payload.get("listings") or []):
-        if not isinstance(row, dict):
-            continue
-        extra = _strip_known_keys(row, STANDARD_LISTING_KEYS)
-        MarketResearchListing.objects.create(
-            session=session,
-            sort_order=order,
-            client_row_id=str(row.get("_id") or "")[:128],
-            external_item_id=str(row.get("itemId") or "")[:64],
-            title=str(row.get("title") or ""),
-            price_gbp=_dec(row.get("price")),
-            listing_url=str(row.get("url") or "")[:2000],
-            image_url=str(row.get("image") or "")[:2000] if row.get("image") else "",
-            excluded=bool(row.get("excluded")),
-            sold_text=str(row.get("sold") or "")[:256],
-            shop_name=str(row.get("shop") or "")[:256],
-            seller_info=str(row.get("sellerInfo") or "")[:2000],
-            extra=extra,
-        )
+    if not created:
+        # Replacing: the payload carries the full drill history and listing set.
+        session.drill_levels.all().delete()
+        session.listings.all().delete()
+    MarketResearchDrillLevel.objects.bulk_create(_build_drill_levels(session, payload))
+    MarketResearchListing.objects.bulk_create(_build_listings(session, payload), batch_size=500)
 
 
 def replace_request_item_research(
@@ -389,7 +421,8 @@ def replace_upload_item_research(
 
 def session_to_client_payload(session: MarketResearchSession) -> dict:
     listings_out = []
-    for row in session.listings.all().order_by("sort_order", "listing_id"):
+    # Meta.ordering is (sort_order, listing_id) / level_index; plain .all() keeps prefetches usable.
+    for row in session.listings.all():
         d: dict[str, Any] = {
             "_id": row.client_row_id or f"row-{row.listing_id}",
             "title": row.title,
@@ -420,7 +453,7 @@ def session_to_client_payload(session: MarketResearchSession) -> dict:
         else 0,
     }
     drill: list[dict[str, Any]] = []
-    for l in session.drill_levels.all().order_by("level_index"):
+    for l in session.drill_levels.all():
         row: dict[str, Any] = {"min": float(l.min_gbp), "max": float(l.max_gbp)}
         sj = getattr(l, "segments_json", None)
         if isinstance(sj, list) and len(sj) > 1:
@@ -468,6 +501,10 @@ def session_to_client_payload(session: MarketResearchSession) -> dict:
 
 
 def _get_session(ri_or_rsi: RequestItem | RepricingSessionItem | UploadSessionItem, platform: str):
+    prefetched = getattr(ri_or_rsi, "_prefetched_objects_cache", {}).get("market_research_sessions")
+    if prefetched is not None:
+        matches = [s for s in prefetched if s.platform == platform]
+        return min(matches, key=lambda s: s.pk) if matches else None
     if isinstance(ri_or_rsi, RequestItem):
         return (
             MarketResearchSession.objects.filter(request_item=ri_or_rsi, platform=platform)
@@ -772,3 +809,82 @@ def ingest_stock_session_line_post_create(
         replace_repricing_item_research(
             line, MarketResearchPlatform.CASH_GENERATOR, cg_data
         )
+
+
+_STOCK_LINE_RESEARCH_PLATFORMS = (
+    MarketResearchPlatform.EBAY,
+    MarketResearchPlatform.CASH_CONVERTERS,
+    MarketResearchPlatform.CASH_GENERATOR,
+)
+
+
+def bulk_ingest_stock_session_research(
+    entries: list[tuple[RepricingSessionItem | UploadSessionItem, Any, Any, Any]],
+    *,
+    replace_existing: bool = False,
+) -> None:
+    """
+    Set-based ingest_stock_session_line_post_create for many saved lines.
+
+    ``entries`` are ``(line, raw_data, cc_data, cg_data)``; as with the
+    per-line path only non-empty dict payloads are stored. With
+    ``replace_existing`` the lines' current sessions for those platforms are
+    read once (to keep advanced_filter_state) and deleted in one query;
+    otherwise the lines are assumed new. Sessions, drill levels and listings
+    are each written with one bulk_create.
+    """
+    work: list[tuple[RepricingSessionItem | UploadSessionItem, str, dict]] = []
+    for line, raw_data, cc_data, cg_data in entries:
+        for platform, payload in zip(_STOCK_LINE_RESEARCH_PLATFORMS, (raw_data, cc_data, cg_data)):
+            if isinstance(payload, dict) and payload:
+                work.append((line, platform, payload))
+    if not work:
+        return
+
+    def owner_field(line) -> str:
+        return "upload_session_item" if isinstance(line, UploadSessionItem) else "repricing_session_item"
+
+    prev_adv: dict[tuple[str, int, str], Any] = {}
+    if replace_existing:
+        ids_by_key: dict[tuple[str, str], set[int]] = {}
+        for line, platform, _payload in work:
+            ids_by_key.setdefault((owner_field(line), platform), set()).add(line.pk)
+        replace_q = Q()
+        for (field, platform), line_ids in ids_by_key.items():
+            replace_q |= Q(platform=platform, **{f"{field}_id__in": line_ids})
+        existing = MarketResearchSession.objects.filter(replace_q)
+        for row in existing.values(
+            "upload_session_item_id", "repricing_session_item_id", "platform", "advanced_filter_state"
+        ):
+            if row["upload_session_item_id"] is not None:
+                key = ("upload_session_item", row["upload_session_item_id"], row["platform"])
+            else:
+                key = ("repricing_session_item", row["repricing_session_item_id"], row["platform"])
+            prev_adv[key] = row["advanced_filter_state"]
+        existing.delete()
+
+    sessions: list[MarketResearchSession] = []
+    payloads: list[dict] = []
+    for line, platform, payload in work:
+        if not _is_market_research_dict(payload):
+            continue
+        field = owner_field(line)
+        sessions.append(
+            MarketResearchSession(
+                platform=platform,
+                **{field: line},
+                **_market_research_session_fields(payload, prev_adv.get((field, line.pk, platform))),
+            )
+        )
+        payloads.append(payload)
+    if not sessions:
+        return
+
+    MarketResearchSession.objects.bulk_create(sessions, batch_size=500)
+    drill_levels: list[MarketResearchDrillLevel] = []
+    listings: list[MarketResearchListing] = []
+    for session, payload in zip(sessions, payloads):
+        drill_levels.extend(_build_drill_levels(session, payload))
+        listings.extend(_build_listings(session, payload))
+    MarketResearchDrillLevel.objects.bulk_create(drill_levels, batch_size=500)
+    MarketResearchListing.objects.bulk_create(listings, batch_size=500)
@@ -20,6 +20,7 @@ from .models_v2 import (
     RequestItemOfferType,
 )
 from . import research_storage
+from .services.session_patch import materialize_session_data
 from .offer_rows import (
     compose_offer_json_from_rows,
     get_selected_offer_code,
@@ -458,6 +459,7 @@ class RepricingSessionItemSerializer(serializers.ModelSerializer):
 
 class RepricingSessionSerializer(serializers.ModelSerializer):
     items = RepricingSessionItemSerializer(many=True, read_only=True)
+    session_data = serializers.SerializerMethodField()
 
     class Meta:
         model = RepricingSession
@@ -468,11 +470,15 @@ class RepricingSessionSerializer(serializers.ModelSerializer):
             'barcode_count',
             'status',
             'session_data',
+            'session_data_version',
             'created_at',
             'updated_at',
             'items',
         ]
-        read_only_fields = ['repricing_session_id', 'created_at', 'updated_at']
+        read_only_fields = ['repricing_session_id', 'session_data_version', 'created_at', 'updated_at']
+
+    def get_session_data(self, obj):
+        return materialize_session_data(obj)
 
 
 class UploadSessionItemSerializer(serializers.ModelSerializer):
@@ -519,6 +525,7 @@ class UploadSessionItemSerializer(serializers.ModelSerializer):
 
 class UploadSessionSerializer(serializers.ModelSerializer):
     items = UploadSessionItemSerializer(many=True, read_only=True)
+    session_data = serializers.SerializerMethodField()
 
     class Meta:
         model = UploadSession
@@ -530,8 +537,12 @@ class UploadSessionSerializer(serializers.ModelSerializer):
             'status',
             'mode',
             'session_data',
+            'session_data_version',
             'created_at',
             'updated_at',
             'items',
         ]
-        read_only_fields = ['upload_session_id', 'created_at', 'updated_at']
+        read_only_fields = ['upload_session_id', 'session_data_version', 'created_at', 'updated_at']
+
+    def get_session_data(self, obj):
+        return materialize_session_data(obj)
@@ -4,8 +4,12 @@ NosPos category suggestion + field-fill service.
 Primary  : Groq  (meta-llama/llama-4-scout-17b-16e-instruct)
 Fallback : Gemini free tier (gemini-2.5-flash)
 
-If the Groq call raises for any reason (rate-limit, API error, network, …),
-the request is automatically retried against Gemini and a WARNING is logged.
+Calls go through a hedged router (llm_router): if Groq raises, returns
+invalid JSON or has not answered within its p95 latency, Gemini is started
+too and the first valid reply wins.
+
+Replies are cached persistently by prompt (see ai_response_cache), and
+AI_PROVIDER=stub swaps both providers for an offline deterministic stub.
 """
 from __future__ import annotations
 
@@ -13,12 +17,30 @@ import json
 import logging
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 
+from django.conf import settings
+from django.db import connections
+
+from pricing.services.ai_response_cache import get_cached_response, store_response
+from pricing.services.category_matcher import confident_match
+from pricing.services.llm_router import LlmRouter, Provider, provider_timeout_s
+
 logger = logging.getLogger(__name__)
 
 GROQ_MODEL   = "meta-llama/llama-4-scout-17b-16e-instruct"
 GEMINI_MODEL = "gemini-2.5-flash"
+# Response cache key component: a change to either model invalidates cached answers.
+MODEL_CHAIN  = f"{GROQ_MODEL}|{GEMINI_MODEL}"
+# Cache key component for AI_PROVIDER=stub, so stub answers never mix with real ones.
+STUB_MODEL   = "stub"
+
+
+def _provider_setting() -> str:
+    return str(getattr(settings, "AI_PROVIDER", "") or "").strip().lower()
+
 
 # ---------------------------------------------------------------------------
 # Lazy clients
@@ -59,6 +81,7 @@ class CategorySuggestion:
     suggested: str
     confidence: str   # "high" | "medium" | "low"
     reasoning: str
+    source: str = "llm"  # "llm" | "local"
 
 
 @dataclass
@@ -66,6 +89,25 @@ class FieldSuggestions:
     fields: dict  # { fieldName: suggestedValue }
 
 
+@dataclass
+class FieldBatchItem:
+    """One agreement line in a batch field-fill request."""
+
+    key: str
+    item_name: str
+    db_category: str | None
+    attributes: dict[str, str]
+    fields: list[dict]
+    category_id: int | None = None  # NosPos category; items sharing it share one prompt
+
+
+@dataclass
+class FieldBatchResult:
+    key: str
+    fields: dict
+    error: str | None = None
+
+
 @dataclass
 class MarketplaceResearchSearchSuggestion:
     """Broad marketplace (eBay / CC) search string from item facts."""
@@ -101,19 +143,28 @@ Rules:
 - Never output anything outside the JSON object.
 """
 
-_FIELDS_SYSTEM = """\
-You are an assistant at a second-hand goods buying counter (CG Suite).
-Given details about a traded-in item, fill in as many NosPos agreement form
-fields as you can determine with confidence.
+_CATEGORY_PATH_SYSTEM = """\
+You are a specialist assistant at a second-hand goods buying counter (CG Suite).
+Your role is to select the single most appropriate NosPos product category for a
+traded-in item. Each option is a complete category path from the top level down
+to a leaf, with " > " between levels.
 
-Strict rules:
-- Respond with valid JSON only — no markdown, no preamble.
-- The JSON object must have a single key "fields" whose value is an object
-  mapping fieldName → suggestedValue.
-- CRITICAL: Each key in "fields" MUST be the exact "name" string shown for that
-  field in FIELDS TO FILL. Names may look like DraftAgreementItem[123][grade] or
-  synthetic ids such as cg_nf_45678 — copy the name= value verbatim. Do not use
-  only the human label as the JSON key (labels are still used to match if you slip).
+You MUST respond with valid JSON only — no markdown fences, no preamble, no trailing text.
+The JSON must conform exactly to this schema:
+{
+  "suggested": "<full path copied verbatim from CANDIDATE PATHS>",
+  "confidence": "<high|medium|low>",
+  "reasoning": "<one concise sentence explaining the match>"
+}
+
+Rules:
+- "suggested" MUST be one of the exact strings listed under CANDIDATE PATHS.
+- If no path is a perfect match, pick the closest one and set confidence to "low".
+- Never output anything outside the JSON object.
+"""
+
+# Value rules shared by the single-item and batch field-fill prompts.
+_FIELD_VALUE_RULES = """\
 - For SELECT fields, "suggestedValue" MUST be one of the exact strings
   listed in that field's options array (copy it verbatim).
 - For TEXT/NUMBER fields, provide the most accurate value you can derive
@@ -129,11 +180,46 @@ Strict rules:
 - NEVER fill: description, serial number, IMEI, barcode, EAN, location,
   address, postcode, notes, comments, condition notes, rate, or any field
   that requires physical inspection or store-specific knowledge.
+"""
+
+_FIELDS_SYSTEM = """\
+You are an assistant at a second-hand goods buying counter (CG Suite).
+Given details about a traded-in item, fill in as many NosPos agreement form
+fields as you can determine with confidence.
 
+Strict rules:
+- Respond with valid JSON only — no markdown, no preamble.
+- The JSON object must have a single key "fields" whose value is an object
+  mapping fieldName → suggestedValue.
+- CRITICAL: Each key in "fields" MUST be the exact "name" string shown for that
+  field in FIELDS TO FILL. Names may look like DraftAgreementItem[123][grade] or
+  synthetic ids such as cg_nf_45678 — copy the name= value verbatim. Do not use
+  only the human label as the JSON key (labels are still used to match if you slip).
+""" + _FIELD_VALUE_RULES + """
 Schema:
 { "fields": { "<fieldName>": "<value>", ... } }
 """
 
+_FIELDS_BATCH_SYSTEM = """\
+You are an assistant at a second-hand goods buying counter (CG Suite).
+Several traded-in items from one agreement share the same NosPos category and
+form fields. For EACH item, fill in as many fields as you can determine with
+confidence from that item's own details.
+
+Strict rules:
+- Respond with valid JSON only — no markdown, no preamble.
+- The JSON object must have a single key "items" whose value is an object
+  mapping itemKey → { fieldKey → suggestedValue }.
+- Use the exact item keys (item1, item2, …) from ITEMS and the exact key=
+  values from FIELDS TO FILL. Include every item key, with {} if nothing
+  can be filled.
+- Judge each item independently; never copy a value from one item to another
+  unless its own details support it.
+""" + _FIELD_VALUE_RULES + """
+Schema:
+{ "items": { "<itemKey>": { "<fieldKey>": "<value>", ... }, ... } }
+"""
+
 _RESEARCH_SEARCH_SYSTEM = """\
 You assist buyers at a second-hand goods counter (CG Suite) who need a SHORT, BROAD
 search query for eBay or Cash Converters to compare sold / asking prices.
@@ -220,6 +306,66 @@ def _build_category_user_msg(
     )
 
 
+def _build_category_path_user_msg(
+    item_name: str,
+    db_category: str | None,
+    attributes: dict[str, str],
+    candidate_paths: list[str],
+) -> str:
+    attr_block = (
+        "\n".join(f"    - {k}: {v}" for k, v in attributes.items()) if attributes else "    (none)"
+    )
+    paths_block = "\n".join(f"    - {p}" for p in candidate_paths)
+    return (
+        f"ITEM DETAILS\n"
+        f"  Name        : {item_name}\n"
+        f"  DB Category : {db_category or '(unknown)'}\n"
+        f"  Attributes  :\n{attr_block}\n\n"
+        f"TASK\n"
+        f"  Select the most appropriate complete NosPos category path for this item.\n\n"
+        f"CANDIDATE PATHS\n{paths_block}"
+    )
+
+
+def _field_spec_line(f: dict, key_attr: str, key_value: str) -> str:
+    opts = f.get("options") or []
+    if opts:
+        opts_str = ", ".join(
+            f'"{o["text"]}" (value={o["value"]!r})' for o in opts[:40]
+        )
+        return (
+            f'  - {key_attr}={key_value!r}  label={f.get("label", "")!r}  type=SELECT\n'
+            f'    options: [{opts_str}]'
+        )
+    return (
+        f'  - {key_attr}={key_value!r}  label={f.get("label", "")!r}'
+        f'  type={f.get("control", "text").upper()}'
+    )
+
+
+def _build_fields_batch_user_msg(
+    group_fields: list[tuple[str, dict]],
+    items: list[tuple[str, "FieldBatchItem"]],
+) -> str:
+    item_blocks = []
+    for item_key, item in items:
+        attrs = "; ".join(f"{k}: {v}" for k, v in item.attributes.items()) or "(none)"
+        item_blocks.append(
+            f"  [{item_key}] Name: {item.item_name}\n"
+            f"      DB Category: {item.db_category or '(unknown)'}\n"
+            f"      Attributes: {attrs}"
+        )
+    field_lines = [_field_spec_line(f, "key", key) for key, f in group_fields]
+    return (
+        "ITEMS\n"
+        + "\n".join(item_blocks)
+        + "\n\nFIELDS TO FILL (same for every item)\n"
+        + "\n".join(field_lines)
+        + "\n\nRespond with one object per item key, using each field's key=... value "
+        "EXACTLY as the JSON key."
+    )
+
+
 def _build_fields_user_msg(
     item_name: str,
     db_category: str | None,
@@ -229,22 +375,7 @@ def _build_fields_user_msg(
     attr_block = (
         "\n".join(f"    - {k}: {v}" for k, v in attributes.items()) if attributes else "    (none)"
     )
-    field_lines = []
-    for f in fields:
-        opts = f.get("options") or []
-        if opts:
-            opts_str = ", ".join(
-                f'"{o["text"]}" (value={o["value"]!r})' for o in opts[:40]
-            )
-            field_lines.append(
-                f'  - name={f["name"]!r}  label={f.get("label", "")!r}  type=SELECT\n'
-                f'    options: [{opts_str}]'
-            )
-        else:
-            field_lines.append(
-                f'  - name={f["name"]!r}  label={f.get("label", "")!r}'
-                f'  type={f.get("control", "text").upper()}'
-            )
+    field_lines = [_field_spec_line(f, "name", f["name"]) for f in fields]
     return (
         f"ITEM\n"
         f"  Name        : {item_name}\n"
@@ -337,6 +468,7 @@ def _groq_call(system: str, user: str, max_tokens: int) -> str:
         temperature=0.1,
         max_tokens=max_tokens,
         response_format={"type": "json_object"},
+        timeout=provider_timeout_s(),
     )
     return completion.choices[0].message.content.strip()
 
@@ -350,61 +482,108 @@ def _gemini_call(system: str, user: str) -> str:
         config=types.GenerateContentConfig(
             response_mime_type="application/json",
             temperature=0.1,
+            http_options=types.HttpOptions(timeout=int(provider_timeout_s() * 1000)),
         ),
     )
     return response.text.strip()
 
 
-def _call_with_fallback(system: str, user: str, max_tokens: int, label: str) -> str:
-    """Try Groq; on any failure fall back to Gemini."""
-    try:
-        raw = _groq_call(system, user, max_tokens)
-        logger.debug("[%s] Groq responded OK", label)
-        return raw
-    except Exception as groq_exc:
-        logger.warning(
-            "[%s] Groq failed (%s: %s) — falling back to Gemini",
-            label,
-            type(groq_exc).__name__,
-            groq_exc,
-        )
+def _stub_call(system: str, user: str) -> str:
+    """
+    Offline provider (AI_PROVIDER=stub): deterministic, schema-valid JSON with
+    no network access. Picks the first listed option / candidate path, fills
+    no fields and echoes the listing title as the search term.
+    """
+    def first_listed(header: str) -> str:
+        _, _, tail = user.partition(header)
+        for line in tail.splitlines():
+            line = line.strip()
+            if line.startswith("- "):
+                return line[2:].strip()
+        return ""
+
+    if system == _CATEGORY_SYSTEM:
+        return json.dumps({
+            "suggested": first_listed("AVAILABLE OPTIONS"),
+            "confidence": "low",
+            "reasoning": "Offline stub provider.",
+        })
+    if system == _CATEGORY_PATH_SYSTEM:
+        return json.dumps({
+            "suggested": first_listed("CANDIDATE PATHS"),
+            "confidence": "low",
+            "reasoning": "Offline stub provider.",
+        })
+    if system == _RESEARCH_SEARCH_SYSTEM:
+        _, _, tail = user.partition("\n")
+        return json.dumps({
+            "searchTerm": tail.splitlines()[0].strip() if tail else "",
+            "reasoning": "Offline stub provider.",
+        })
+    return json.dumps({"fields": {}})
+
+
+_router: LlmRouter | None = None
+
+
+def _get_router() -> LlmRouter:
+    """Groq then Gemini, hedged (see llm_router). Looks the call functions up at call time."""
+    global _router
+    if _router is None:
+        _router = LlmRouter([
+            Provider("groq", lambda system, user, max_tokens: _groq_call(system, user, max_tokens)),
+            Provider("gemini", lambda system, user, max_tokens: _gemini_call(system, user)),
+        ])
+    return _router
+
+
+def set_router(router: LlmRouter | None) -> None:
+    """Swap the provider router (e.g. fake providers in tests); None restores the default."""
+    global _router
+    _router = router
+
+
+def provider_stats() -> dict:
+    return _get_router().stats_dict()
+
+
+def _call_providers(system: str, user: str, max_tokens: int, label: str) -> tuple[str, str]:
+    """First valid JSON reply from the hedged provider router. Returns (raw, provider)."""
+    return _get_router().call(
+        system, user, max_tokens, label, validate=lambda raw: _parse_json(raw, label),
+    )
 
-    try:
-        raw = _gemini_call(system, user)
-        logger.debug("[%s] Gemini fallback responded OK", label)
-        return raw
-    except Exception as gemini_exc:
-        raise RuntimeError(
-            f"Both Groq and Gemini failed. "
-            f"Groq: {groq_exc}. Gemini: {gemini_exc}."
-        ) from gemini_exc
+
+def _call_with_fallback(system: str, user: str, max_tokens: int, label: str) -> str:
+    """Cached / hedged Groq + Gemini call; see _call_with_fallback_with_provider."""
+    raw, _provider = _call_with_fallback_with_provider(system, user, max_tokens, label)
+    return raw
 
 
 def _call_with_fallback_with_provider(
     system: str, user: str, max_tokens: int, label: str
 ) -> tuple[str, str]:
-    """Try Groq; on any failure fall back to Gemini. Returns (raw_json_string, \"groq\"|\"gemini\")."""
-    try:
-        raw = _groq_call(system, user, max_tokens)
-        logger.debug("[%s] Groq responded OK", label)
-        return raw, "groq"
-    except Exception as groq_exc:
-        logger.warning(
-            "[%s] Groq failed (%s: %s) — falling back to Gemini",
-            label,
-            type(groq_exc).__name__,
-            groq_exc,
-        )
+    """
+    Answer from the persistent response cache when this exact prompt was seen
+    before; otherwise race the providers (Groq first, Gemini hedged after a
+    p95-based delay or on failure) and cache the first valid JSON reply.
+    AI_PROVIDER=stub goes through the same cache under STUB_MODEL.
+    Returns (raw_json_string, \"groq\"|\"gemini\"|\"stub\").
+    """
+    stub = _provider_setting() == "stub"
+    model = STUB_MODEL if stub else MODEL_CHAIN
 
-    try:
-        raw = _gemini_call(system, user)
-        logger.debug("[%s] Gemini fallback responded OK", label)
-        return raw, "gemini"
-    except Exception as gemini_exc:
-        raise RuntimeError(
-            f"Both Groq and Gemini failed. "
-            f"Groq: {groq_exc}. Gemini: {gemini_exc}."
-        ) from gemini_exc
+    cached = get_cached_response(system, user, model)
+    if cached is not None:
+        logger.debug("[%s] Response cache hit", label)
+        return cached
+
+    if stub:
+        raw, provider = _stub_call(system, user), "stub"
+    else:
+        raw, provider = _call_providers(system, user, max_tokens, label)
+    store_response(system, user, model, raw, provider, label)
+    return raw, provider
 
 
 def _parse_json(raw: str, label: str) -> dict:
@@ -422,6 +601,32 @@ def _parse_json(raw: str, label: str) -> dict:
 # Public API
 # ---------------------------------------------------------------------------
 
+def _local_category_option(
+    item_name: str,
+    db_category: str | None,
+    level_index: int,
+    available_options: list[str],
+    previous_path: list[str],
+) -> CategorySuggestion | None:
+    match = confident_match(item_name, db_category, previous_path)
+    if match is None or len(match.path) <= level_index:
+        return None
+    if [s.lower() for s in match.path[:level_index]] != [s.strip().lower() for s in previous_path[:level_index]]:
+        return None
+    segment = match.path[level_index].lower()
+    option = next((o for o in available_options if o.strip().lower() == segment), None)
+    if option is None:
+        return None
+    result = CategorySuggestion(
+        suggested=option,
+        confidence="high",
+        reasoning=f"Local match on {match.full_name} (confidence {match.confidence:.2f}).",
+        source="local",
+    )
+    logger.info("[AI Category L%d] → local %r (%s)", level_index + 1, option, match.confidence)
+    return result
+
+
 def suggest_category(
     item_name: str,
     db_category: str | None,
@@ -432,8 +637,14 @@ def suggest_category(
 ) -> CategorySuggestion:
     """
     Suggest the best NosPos category option at the given hierarchy level.
-    Tries Groq first, falls back to Gemini on any failure.
+    Answers locally when the lexical matcher is confident and its leaf sits
+    under ``previous_path`` with its next segment among ``available_options``;
+    otherwise tries Groq first, falling back to Gemini on any failure.
     """
+    local = _local_category_option(item_name, db_category, level_index, available_options, previous_path)
+    if local is not None:
+        return local
+
     user_msg = _build_category_user_msg(
         item_name, db_category, attributes, level_index, available_options, previous_path
     )
@@ -458,6 +669,38 @@ def suggest_category(
     return result
 
 
+def suggest_category_full_path(
+    item_name: str,
+    db_category: str | None,
+    attributes: dict[str, str],
+    candidate_paths: list[str],
+) -> CategorySuggestion:
+    """
+    Pick one complete NosPos category path (root → leaf) from ``candidate_paths``
+    in a single model call. Tries Groq first, falls back to Gemini on any failure.
+    """
+    user_msg = _build_category_path_user_msg(item_name, db_category, attributes, candidate_paths)
+    label = "AI Category path"
+
+    logger.debug("[%s] Prompt:\n%s\n%s\n%s", label, "=" * 60, user_msg, "=" * 60)
+
+    raw = _call_with_fallback(_CATEGORY_PATH_SYSTEM, user_msg, max_tokens=256, label=label)
+    data = _parse_json(raw, label)
+
+    suggested  = str(data.get("suggested", "")).strip()
+    confidence = str(data.get("confidence", "low")).strip().lower()
+    reasoning  = str(data.get("reasoning", "")).strip()
+    if confidence not in ("high", "medium", "low"):
+        confidence = "low"
+
+    result = CategorySuggestion(suggested=suggested, confidence=confidence, reasoning=reasoning)
+    logger.info(
+        "[%s] → suggested=%r  confidence=%s  | %s",
+        label, result.suggested, result.confidence, result.reasoning,
+    )
+    return result
+
+
 def suggest_field_values(
     item_name: str,
     db_category: str | None,
@@ -488,6 +731,149 @@ def suggest_field_values(
     return FieldSuggestions(fields=result_fields)
 
 
+# Batch field fill: items sharing a NosPos category (or, without one, the same
+# field keys) go into one prompt, split so each prompt stays near the token
+# budget (estimated at ~4 characters per token). Chunks run concurrently.
+FIELD_BATCH_PROMPT_TOKEN_BUDGET = 6000
+FIELD_BATCH_MAX_ITEMS_PER_PROMPT = 12
+FIELD_BATCH_OUTPUT_TOKENS_PER_ITEM = 160
+FIELD_BATCH_WORKERS = 4
+
+
+def _field_key(f: dict) -> str:
+    name = str(f.get("name") or "").strip()
+    return _last_bracket_key(name) or name
+
+
+def _field_group_key(item: FieldBatchItem) -> tuple:
+    if item.category_id is not None:
+        return ("nospos", item.category_id)
+    return ("fields", tuple(sorted(_field_key(f) for f in item.fields)))
+
+
+def _group_fields(items: list[FieldBatchItem]) -> list[tuple[str, dict]]:
+    """Union of the items' fields keyed by their shared key (first spec wins)."""
+    seen: dict[str, dict] = {}
+    for item in items:
+        for f in item.fields:
+            key = _field_key(f)
+            if key and key not in seen:
+                seen[key] = f
+    return list(seen.items())
+
+
+def _chunk_field_group(group_fields: list[tuple[str, dict]], items: list[FieldBatchItem]) -> list[list[FieldBatchItem]]:
+    fixed = (len(_FIELDS_BATCH_SYSTEM) + len(_build_fields_batch_user_msg(group_fields, []))) // 4
+    chunks: list[list[FieldBatchItem]] = []
+    current: list[FieldBatchItem] = []
+    used = fixed
+    for item in items:
+        cost = len(_build_fields_batch_user_msg([], [("item00", item)])) // 4
+        if current and (
+            len(current) >= FIELD_BATCH_MAX_ITEMS_PER_PROMPT
+            or used + cost > FIELD_BATCH_PROMPT_TOKEN_BUDGET
+        ):
+            chunks.append(current)
+            current, used = [], fixed
+        current.append(item)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _fill_field_chunk(group_fields: list[tuple[str, dict]], chunk: list[FieldBatchItem]) -> list[FieldBatchResult]:
+    if len(chunk) == 1:
+        item = chunk[0]
+        single = suggest_field_values(item.item_name, item.db_category, item.attributes, item.fields)
+        return [FieldBatchResult(key=item.key, fields=single.fields)]
+
+    keyed = [(f"item{i + 1}", item) for i, item in enumerate(chunk)]
+    user_msg = _build_fields_batch_user_msg(group_fields, keyed)
+    label = f"AI Fields batch x{len(chunk)}"
+
+    logger.debug("[%s] Prompt:\n%s\n%s\n%s", label, "=" * 60, user_msg, "=" * 60)
+
+    max_tokens = min(4096, 64 + FIELD_BATCH_OUTPUT_TOKENS_PER_ITEM * len(chunk))
+    raw = _call_with_fallback(_FIELDS_BATCH_SYSTEM, user_msg, max_tokens=max_tokens, label=label)
+    data = _parse_json(raw, label)
+    by_item = data.get("items")
+    if not isinstance(by_item, dict):
+        by_item = {}
+
+    group_keys = {key for key, _ in group_fields}
+    results = []
+    for item_key, item in keyed:
+        raw_fields = by_item.get(item_key)
+        if not isinstance(raw_fields, dict):
+            raw_fields = {}
+        name_by_key = {_field_key(f): f["name"] for f in item.fields}
+        own = {
+            name_by_key.get(str(k).strip(), k): v
+            for k, v in raw_fields.items()
+            # Drop keys for group fields this line doesn't have; keep unknown keys
+            # (labels etc.) so the normaliser can still map them.
+            if str(k).strip() in name_by_key or str(k).strip() not in group_keys
+        }
+        results.append(FieldBatchResult(key=item.key, fields=_normalize_field_response_keys(own, item.fields)))
+    logger.info(
+        "[%s] Filled %d field(s) across %d item(s)",
+        label, sum(len(r.fields) for r in results), len(results),
+    )
+    return results
+
+
+def _fill_field_chunk_safely(group_fields, chunk) -> list[FieldBatchResult]:
+    try:
+        return _fill_field_chunk(group_fields, chunk)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning(
+            "[AI Fields batch] Chunk of %d item(s) failed (%s: %s)",
+            len(chunk), type(exc).__name__, exc,
+        )
+        return [FieldBatchResult(key=item.key, fields={}, error=str(exc)) for item in chunk]
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()
+
+
+def suggest_field_values_batch(items: list[FieldBatchItem]) -> list[FieldBatchResult]:
+    """
+    Fill NosPos form fields for many agreement lines with as few model calls
+    as possible. Lines are grouped by NosPos category, each group is sent as
+    one prompt per token-bounded chunk (chunks run concurrently), and each
+    line's answer is mapped back to its own field names with
+    _normalize_field_response_keys. A failed chunk marks only its own lines
+    with ``error``. Results follow the input order.
+    """
+    results: dict[str, FieldBatchResult] = {}
+    groups: dict[tuple, list[FieldBatchItem]] = {}
+    for item in items:
+        if not item.fields:
+            results[item.key] = FieldBatchResult(key=item.key, fields={})
+        else:
+            groups.setdefault(_field_group_key(item), []).append(item)
+
+    tasks = []
+    for group_items in groups.values():
+        group_fields = _group_fields(group_items)
+        tasks.extend((group_fields, chunk) for chunk in _chunk_field_group(group_fields, group_items))
+
+    logger.info(
+        "[AI Fields batch] %d item(s) → %d group(s), %d prompt(s)",
+        len(items), len(groups), len(tasks),
+    )
+    if len(tasks) == 1:
+        chunk_results = [_fill_field_chunk_safely(*tasks[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(FIELD_BATCH_WORKERS, len(tasks) or 1)) as pool:
+            chunk_results = list(pool.map(lambda task: _fill_field_chunk_safely(*task), tasks))
+    for chunk in chunk_results:
+        for result in chunk:
+            results[result.key] = result
+    return [results[item.key] for item in items]
+
+
 def suggest_marketplace_research_search_term(
     item_name: str,
     db_category: str | None,
@@ -0,0 +1,291 @@
+"""
+Server-side NosPos category path suggestion (one HTTP call per item).
+
+The level-by-level picker asks the model for one hierarchy level per request,
+so every item pays one sequential LLM round trip per level. Here the whole
+NosPos tree is read from the in-process catalogue snapshot. A confident
+local lexical match (category_matcher) answers with no model call at all;
+otherwise every leaf ``full_name`` is scored against the item by token
+overlap and the best leaves are offered to the model as complete paths in a
+single call. If that answer is
+unusable (not one of the candidates, or a low-confidence pick from a pruned
+list) the tree is walked level by level server-side instead, with each
+level's options cut to the children whose subtree scores best.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+
+from pricing.services.ai_category import suggest_category, suggest_category_full_path
+from pricing.services.category_matcher import confident_match, path_segments, tokenize
+from pricing.services.nospos_catalogue import get_catalogue_snapshot
+
+logger = logging.getLogger(__name__)
+
+FULL_PATH_CANDIDATES = 25
+LEVEL_OPTION_LIMIT = 30
+MAX_DEPTH = 12
+
+
+def _tokens(text: str) -> set[str]:
+    return set(tokenize(text))
+
+
+@dataclass
+class _Node:
+    nospos_id: int
+    name: str
+    full_name: str
+    tokens: set[str]
+    leaf_tokens: set[str]
+    children: list["_Node"] = field(default_factory=list)
+
+
+@dataclass
+class CategoryPathSuggestion:
+    path: list[str]
+    nospos_id: int | None
+    full_name: str
+    confidence: str
+    reasoning: str
+    mode: str  # "local" | "full_path" | "per_level"
+    llm_calls: int
+
+    def as_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "nosposId": self.nospos_id,
+            "fullName": self.full_name,
+            "confidence": self.confidence,
+            "reasoning": self.reasoning,
+            "mode": self.mode,
+            "llmCalls": self.llm_calls,
+        }
+
+
+def _build_tree(results: list[dict]) -> list[_Node]:
+    by_id: dict[int, _Node] = {}
+    for row in results:
+        nid = row.get("nosposId")
+        if not nid:
+            continue
+        segs = path_segments(row.get("fullName") or "")
+        if not segs:
+            continue
+        by_id[int(nid)] = _Node(
+            nospos_id=int(nid),
+            name=segs[-1],
+            full_name=" > ".join(segs),
+            tokens=_tokens(row.get("fullName") or ""),
+            leaf_tokens=_tokens(segs[-1]),
+        )
+    roots: list[_Node] = []
+    for row in results:
+        node = by_id.get(int(row.get("nosposId") or 0))
+        if node is None:
+            continue
+        parent = by_id.get(int(row.get("parentNosposId") or 0))
+        if parent is None or parent is node:
+            roots.append(node)
+        else:
+            parent.children.append(node)
+    for node in by_id.values():
+        node.children.sort(key=lambda n: n.name.lower())
+    roots.sort(key=lambda n: n.name.lower())
+    return roots
+
+
+def _score(item_tokens: set[str], node: _Node) -> float:
+    # Overlap with the whole path, with the leaf segment counted twice so
+    # "Phones > Apple > iPhone" beats "Phones > Apple > Cases" for an iPhone.
+    return len(item_tokens & node.tokens) + len(item_tokens & node.leaf_tokens)
+
+
+def _leaves(nodes: list[_Node]) -> list[_Node]:
+    out: list[_Node] = []
+    stack = list(reversed(nodes))
+    while stack:
+        node = stack.pop()
+        if node.children:
+            stack.extend(reversed(node.children))
+        else:
+            out.append(node)
+    return out
+
+
+def _subtree_scores(nodes: list[_Node], item_tokens: set[str]) -> dict[int, float]:
+    """Best leaf score below each node (inclusive), keyed by nospos id."""
+    scores: dict[int, float] = {}
+
+    def visit(node: _Node, depth: int) -> float:
+        best = _score(item_tokens, node)
+        if depth < MAX_DEPTH:
+            for child in node.children:
+                best = max(best, visit(child, depth + 1))
+        scores[node.nospos_id] = best
+        return best
+
+    for node in nodes:
+        visit(node, 0)
+    return scores
+
+
+def _find_at_path(roots: list[_Node], path: list[str]) -> _Node | None:
+    current = None
+    options = roots
+    for seg in path:
+        wanted = seg.strip().lower()
+        current = next((n for n in options if n.name.lower() == wanted), None)
+        if current is None:
+            return None
+        options = current.children
+    return current
+
+
+def _match_option(options: list[_Node], suggested: str) -> _Node | None:
+    s = (suggested or "").strip()
+    return (
+        next((n for n in options if n.name == s), None)
+        or next((n for n in options if n.name.lower() == s.lower()), None)
+    )
+
+
+def _item_tokens(item_name: str, db_category: str | None, attributes: dict[str, str]) -> set[str]:
+    parts = [item_name, db_category or ""]
+    parts.extend(attributes.values())
+    return _tokens(" ".join(parts))
+
+
+def _walk_levels(
+    roots: list[_Node],
+    start: _Node | None,
+    start_path: list[str],
+    item_name: str,
+    db_category: str | None,
+    attributes: dict[str, str],
+    scores: dict[int, float],
+) -> tuple[list[str], _Node | None, str, str, int]:
+    path = list(start_path)
+    current = start
+    options = start.children if start is not None else roots
+    confidence, reasoning, calls = "low", "", 0
+    while options and len(path) < MAX_DEPTH:
+        if len(options) > LEVEL_OPTION_LIMIT:
+            ranked = sorted(options, key=lambda n: (-scores.get(n.nospos_id, 0), n.name.lower()))
+            options = sorted(ranked[:LEVEL_OPTION_LIMIT], key=lambda n: n.name.lower())
+        if len(options) == 1:
+            choice = options[0]
+        else:
+            suggestion = suggest_category(
+                item_name=item_name,
+                db_category=db_category,
+                attributes=attributes,
+                level_index=len(path),
+                available_options=sorted({n.name for n in options}),
+                previous_path=path,
+            )
+            calls += suggestion.source == "llm"
+            confidence, reasoning = suggestion.confidence, suggestion.reasoning
+            choice = _match_option(options, suggestion.suggested)
+            if choice is None:
+                raise ValueError(
+                    f"[AI Category path] Suggestion not in tree at level {len(path) + 1}: "
+                    f"{suggestion.suggested!r}"
+                )
+        path.append(choice.name)
+        current = choice
+        options = choice.children
+    return path, current, confidence, reasoning, calls
+
+
+def suggest_category_path(
+    item_name: str,
+    db_category: str | None,
+    attributes: dict[str, str],
+    previous_path: list[str] | None = None,
+) -> CategoryPathSuggestion:
+    """
+    Suggest a complete NosPos category path (root → leaf) for one item.
+
+    ``previous_path`` optionally fixes the first segments (e.g. a root the
+    user already chose); only leaves below it are considered. Raises
+    ValueError when the tree is empty, the start path is unknown, or the
+    model's answer cannot be placed in the tree.
+    """
+    roots = _build_tree(get_catalogue_snapshot().results)
+    if not roots:
+        raise ValueError("[AI Category path] NosPos category tree is empty.")
+
+    start_path = [str(s).strip() for s in (previous_path or []) if str(s).strip()]
+    start = _find_at_path(roots, start_path) if start_path else None
+    if start_path and start is None:
+        raise ValueError(f"[AI Category path] Unknown start path: {' > '.join(start_path)!r}")
+    if start is not None:
+        start_path = path_segments(start.full_name)
+
+    local = confident_match(item_name, db_category, start_path)
+    if local is not None:
+        return CategoryPathSuggestion(
+            path=local.path, nospos_id=local.nospos_id, full_name=local.full_name,
+            confidence="high",
+            reasoning=f"Local match (confidence {local.confidence:.2f}).",
+            mode="local", llm_calls=0,
+        )
+
+    item_toks = _item_tokens(item_name, db_category, attributes)
+    leaves = _leaves(start.children if start is not None else roots)
+    if not leaves:
+        return CategoryPathSuggestion(
+            path=start_path, nospos_id=start.nospos_id, full_name=start.full_name,
+            confidence="high", reasoning="Start path is already a leaf.",
+            mode="full_path", llm_calls=0,
+        )
+
+    ranked = sorted(leaves, key=lambda n: (-_score(item_toks, n), n.full_name.lower()))
+    candidates = [n for n in ranked[:FULL_PATH_CANDIDATES] if _score(item_toks, n) > 0]
+    pruned = len(candidates) < len(leaves)
+    calls = 0
+
+    if len(candidates) == 1 and not pruned:
+        leaf = candidates[0]
+        return CategoryPathSuggestion(
+            path=path_segments(leaf.full_name), nospos_id=leaf.nospos_id, full_name=leaf.full_name,
+            confidence="high", reasoning="Only one category available.",
+            mode="full_path", llm_calls=0,
+        )
+
+    if candidates:
+        by_path = {n.full_name.lower(): n for n in candidates}
+        suggestion = suggest_category_full_path(
+            item_name=item_name,
+            db_category=db_category,
+            attributes=attributes,
+            candidate_paths=[n.full_name for n in candidates],
+        )
+        calls += 1
+        picked = by_path.get(" > ".join(path_segments(suggestion.suggested.replace("›", ">"))).lower())
+        if picked is not None and not (pruned and suggestion.confidence == "low"):
+            return CategoryPathSuggestion(
+                path=path_segments(picked.full_name), nospos_id=picked.nospos_id,
+                full_name=picked.full_name, confidence=suggestion.confidence,
+                reasoning=suggestion.reasoning, mode="full_path", llm_calls=calls,
+            )
+        logger.info(
+            "[AI Category path] Full-path pick %r (%s) not usable for %r — walking levels",
+            suggestion.suggested, suggestion.confidence, item_name,
+        )
+
+    scores = _subtree_scores(start.children if start is not None else roots, item_toks)
+    path, leaf, confidence, reasoning, walk_calls = _walk_levels(
+        roots, start, start_path, item_name, db_category, attributes, scores,
+    )
+    return CategoryPathSuggestion(
+        path=path,
+        nospos_id=leaf.nospos_id if leaf is not None else None,
+        full_name=leaf.full_name if leaf is not None else " > ".join(path),
+        confidence=confidence,
+        reasoning=reasoning,
+        mode="per_level",
+        llm_calls=calls + walk_calls,
+    )
@@ -0,0 +1,144 @@
+"""
+Persistent cache for LLM responses used by the AI suggestion endpoints.
+
+Category, field-fill and search-term prompts are fully determined by the item
+and the options shown, and the same items turn up across stores, so a
+byte-identical prompt is answered from the AiResponseCache table instead of
+calling Groq / Gemini again. Entries are keyed by sha256(model, system prompt,
+user prompt), expire after AI_RESPONSE_CACHE_TTL_SECONDS and the least
+recently used rows are evicted once the table holds more than
+AI_RESPONSE_CACHE_MAX_ENTRIES. Cache failures are logged and treated as a
+miss so they never break a suggestion.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from pricing.models_v2 import AiResponseCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+_counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+_counters_lock = threading.Lock()
+
+
+def _bump(name: str, n: int = 1) -> None:
+    with _counters_lock:
+        _counters[name] += n
+
+
+def _ttl_seconds() -> int:
+    return max(0, int(getattr(settings, "AI_RESPONSE_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)))
+
+
+def _max_entries() -> int:
+    return max(1, int(getattr(settings, "AI_RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)))
+
+
+def cache_enabled() -> bool:
+    return _ttl_seconds() > 0
+
+
+def cache_key(system: str, user: str, model: str) -> str:
+    payload = json.dumps([model, system, user], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_cached_response(system: str, user: str, model: str) -> tuple[str, str] | None:
+    """(raw response, provider) for an unexpired entry, or None on a miss."""
+    if not cache_enabled():
+        return None
+    key = cache_key(system, user, model)
+    now = timezone.now()
+    try:
+        row = (
+            AiResponseCache.objects.filter(key=key, expires_at__gt=now)
+            .values_list("pk", "response", "provider")
+            .first()
+        )
+        if row is None:
+            _bump("misses")
+            return None
+        AiResponseCache.objects.filter(pk=row[0]).update(hit_count=F("hit_count") + 1, last_used_at=now)
+    except Exception as exc:  # noqa: BLE001
+        _bump("errors")
+        logger.warning("[AI cache] Lookup failed (%s: %s)", type(exc).__name__, exc)
+        return None
+    _bump("hits")
+    return row[1], row[2]
+
+
+def store_response(system: str, user: str, model: str, response: str, provider: str, label: str = "") -> None:
+    """Save ``response`` for this prompt (replacing any expired entry) and evict past the size cap."""
+    if not cache_enabled():
+        return
+    now = timezone.now()
+    try:
+        AiResponseCache.objects.update_or_create(
+            key=cache_key(system, user, model),
+            defaults={
+                "label": (label or "")[:64],
+                "model": model[:128],
+                "provider": provider[:32],
+                "response": response,
+                "hit_count": 0,
+                "last_used_at": now,
+                "expires_at": now + timedelta(seconds=_ttl_seconds()),
+            },
+        )
+        _bump("stores")
+        evict_expired_and_excess(now=now)
+    except Exception as exc:  # noqa: BLE001
+        _bump("errors")
+        logger.warning("[AI cache] Store failed (%s: %s)", type(exc).__name__, exc)
+
+
+def evict_expired_and_excess(now=None) -> int:
+    """Delete expired rows, then the least recently used rows beyond the size cap."""
+    now = now or timezone.now()
+    removed, _ = AiResponseCache.objects.filter(expires_at__lte=now).delete()
+    excess = AiResponseCache.objects.count() - _max_entries()
+    if excess > 0:
+        stale = list(
+            AiResponseCache.objects.order_by("last_used_at", "pk").values_list("pk", flat=True)[:excess]
+        )
+        extra, _ = AiResponseCache.objects.filter(pk__in=stale).delete()
+        removed += extra
+    if removed:
+        _bump("evictions", removed)
+    return removed
+
+
+def clear_cache() -> int:
+    deleted, _ = AiResponseCache.objects.all().delete()
+    return deleted
+
+
+def cache_stats() -> dict:
+    """Process-local hit/miss counters plus table totals."""
+    with _counters_lock:
+        counters = dict(_counters)
+    lookups = counters["hits"] + counters["misses"]
+    agg = AiResponseCache.objects.aggregate(stored_hits=Sum("hit_count"))
+    return {
+        "enabled": cache_enabled(),
+        "ttlSeconds": _ttl_seconds(),
+        "maxEntries": _max_entries(),
+        "entries": AiResponseCache.objects.count(),
+        "storedHits": agg["stored_hits"] or 0,
+        "process": {
+            **counters,
+            "hitRate": round(counters["hits"] / lookups, 4) if lookups else None,
+        },
+    }
@@ -0,0 +1,150 @@
+"""
+Barcode history: what have we priced this item at before?
+
+A scanned code is matched against every line that can carry it:
+RepricingSessionItem / UploadSessionItem by ``barcode`` or ``stock_barcode``
+(both db-indexed), and RequestItem through its variant's ``cex_sku`` (the
+CeX box barcode staff also scan in quick reprice). Each source is one
+indexed, bounded query with its session joined in, so a counter scan costs
+three small queries however much history the shop has.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+
+from django.db.models import Q
+
+from pricing.models_v2 import RepricingSessionItem, RequestItem, UploadSessionItem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+SOURCE_REPRICING = "repricing"
+SOURCE_UPLOAD = "upload"
+SOURCE_REQUEST = "request"
+
+
+def _money(value: Decimal | None) -> float | None:
+    return float(value) if value is not None else None
+
+
+@dataclass
+class BarcodeHistory:
+    """Lines matching one scanned code, newest first per source."""
+
+    barcode: str
+    repricing: list[dict] = field(default_factory=list)
+    uploads: list[dict] = field(default_factory=list)
+    requests: list[dict] = field(default_factory=list)
+
+    def last_priced(self) -> dict | None:
+        """Most recent repricing / upload line that set a new retail price."""
+        priced = [
+            row for row in self.repricing + self.uploads
+            if row["new_retail_price"] is not None
+        ]
+        return max(priced, key=lambda row: row["created_at"]) if priced else None
+
+    def last_bought(self) -> dict | None:
+        """Most recent buying line with a negotiated price."""
+        bought = [row for row in self.requests if row["negotiated_price_gbp"] is not None]
+        return max(bought, key=lambda row: row["created_at"]) if bought else None
+
+    def as_dict(self) -> dict:
+        return {
+            "barcode": self.barcode,
+            "last_priced": self.last_priced(),
+            "last_bought": self.last_bought(),
+            "repricing": self.repricing,
+            "uploads": self.uploads,
+            "requests": self.requests,
+        }
+
+
+def _stock_line_row(line, *, source: str, session_id: int, session_status: str, created_at: datetime) -> dict:
+    return {
+        "source": source,
+        "session_id": session_id,
+        "session_status": session_status,
+        "line_id": line.pk,
+        "item_identifier": line.item_identifier,
+        "title": line.title,
+        "barcode": line.barcode,
+        "stock_barcode": line.stock_barcode,
+        "stock_url": line.stock_url,
+        "quantity": line.quantity,
+        "old_retail_price": _money(line.old_retail_price),
+        "new_retail_price": _money(line.new_retail_price),
+        "cex_sell_price": _money(line.cex_sell_at_repricing),
+        "our_sale_price": _money(line.our_sale_price_at_repricing),
+        "created_at": created_at,
+    }
+
+
+def lookup_barcode_history(code: str, *, limit: int = DEFAULT_LIMIT) -> BarcodeHistory:
+    """Repricing, upload and buying lines for ``code`` (at most ``limit`` of each)."""
+    code = (code or "").strip()
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    history = BarcodeHistory(barcode=code)
+    if not code:
+        return history
+
+    code_q = Q(barcode=code) | Q(stock_barcode=code)
+
+    for line in (
+        RepricingSessionItem.objects.filter(code_q)
+        .select_related("repricing_session")
+        .order_by("-created_at", "-pk")[:limit]
+    ):
+        history.repricing.append(
+            _stock_line_row(
+                line,
+                source=SOURCE_REPRICING,
+                session_id=line.repricing_session_id,
+                session_status=line.repricing_session.status,
+                created_at=line.created_at,
+            )
+        )
+
+    for line in (
+        UploadSessionItem.objects.filter(code_q)
+        .select_related("upload_session")
+        .order_by("-created_at", "-pk")[:limit]
+    ):
+        row = _stock_line_row(
+            line,
+            source=SOURCE_UPLOAD,
+            session_id=line.upload_session_id,
+            session_status=line.upload_session.status,
+            created_at=line.created_at,
+        )
+        row["session_mode"] = line.upload_session.mode
+        history.uploads.append(row)
+
+    for item in (
+        RequestItem.objects.filter(variant__cex_sku=code)
+        .select_related("request", "variant")
+        .order_by("-request__created_at", "-pk")[:limit]
+    ):
+        history.requests.append(
+            {
+                "source": SOURCE_REQUEST,
+                "request_id": item.request_id,
+                "request_item_id": item.pk,
+                "intent": item.request.intent,
+                "variant_id": item.variant_id,
+                "title": item.variant.title,
+                "quantity": item.quantity,
+                "negotiated_price_gbp": _money(item.negotiated_price_gbp),
+                "cex_sell_price": _money(item.cex_sell_at_negotiation),
+                "our_sale_price": _money(item.our_sale_price_at_negotiation),
+                "created_at": item.request.created_at,
+            }
+        )
+
+    return history
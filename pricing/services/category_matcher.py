@@ -0,0 +1,276 @@
+"""
+Local lexical NosPos category matcher (BM25 over a token index).
+
+Many items name their category outright ("iPhone 13" → … > Apple iPhone), so
+asking an LLM is wasted latency and quota. Each NosPos leaf becomes one
+document built from:
+
+* its ``full_name`` segments (the leaf segment counted twice),
+* the names of ProductCategories mapped to it (NosposCategoryMapping),
+* titles of request lines whose ``aiSuggestedNosposStockCategory`` was
+  chosen by staff rather than the model (most recent LEARNED_LIMIT lines,
+  LEARNED_PER_LEAF per leaf). Model picks carry an ``…_ai`` ``source`` and
+  are skipped, so the matcher never trains on its own or the LLM's guesses.
+
+The index lives in process memory, is built from the cached catalogue
+snapshot and is refreshed at most every REFRESH_SECONDS. ``match_category``
+scores an item with BM25 and reports a confidence in [0, 1]: the share of the
+query's IDF mass the best leaf covers, scaled by its margin over the
+runner-up. Query tokens the index has never seen count towards that mass at
+the index's mean IDF (half that for tokens with digits, which are mostly
+model numbers and capacities), so "Apple Watch Series 7" is not a confident
+Apple iPhone just because "apple" is the only word the index knows. Callers
+answer locally only above AI_LOCAL_CATEGORY_MATCH_THRESHOLD and fall back to
+the LLM otherwise.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from pricing.models_v2 import NosposCategoryMapping, RequestItem
+from pricing.services.nospos_catalogue import get_catalogue_snapshot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.6
+REFRESH_SECONDS = 300
+LEARNED_LIMIT = 5000
+LEARNED_PER_LEAF = 50
+BM25_K1 = 1.2
+BM25_B = 0.75
+UNSEEN_NUMERIC_WEIGHT = 0.5
+AI_PICK_SOURCE_SUFFIX = "_ai"
+
+_SEGMENT_SPLIT_RE = re.compile(r"\s*[>›]\s*")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset({
+    "a", "an", "and", "for", "in", "of", "on", "or", "the", "to", "with",
+    "other", "misc", "miscellaneous", "item", "items",
+})
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-case alphanumeric tokens with stopwords dropped and plurals folded."""
+    out = []
+    for tok in _TOKEN_RE.findall((text or "").lower()):
+        if tok in _STOPWORDS or (len(tok) < 2 and not tok.isdigit()):
+            continue
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        out.append(tok)
+    return out
+
+
+def path_segments(full_name: str) -> list[str]:
+    return [seg for seg in _SEGMENT_SPLIT_RE.split((full_name or "").strip()) if seg]
+
+
+def _path_key(full_name: str) -> str:
+    return " > ".join(path_segments(full_name)).lower()
+
+
+@dataclass
+class LocalCategoryMatch:
+    nospos_id: int
+    full_name: str
+    path: list[str]
+    score: float
+    confidence: float
+
+
+class _Bm25Index:
+    def __init__(self, docs: list[tuple[int, str, list[str]]], version: int | None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.ids = [d[0] for d in docs]
+        self.names = [d[1] for d in docs]
+        self.lengths = [len(d[2]) for d in docs]
+        self.avg_len = (sum(self.lengths) / len(docs)) if docs else 0.0
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        for idx, (_, _, tokens) in enumerate(docs):
+            for tok, tf in Counter(tokens).items():
+                self.postings.setdefault(tok, []).append((idx, tf))
+        n = len(docs)
+        self.idf = {
+            tok: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for tok, p in self.postings.items()
+        }
+        self.default_idf = (sum(self.idf.values()) / len(self.idf)) if self.idf else 0.0
+
+    def _weight(self, tok: str) -> float:
+        if tok in self.idf:
+            return self.idf[tok]
+        if any(ch.isdigit() for ch in tok):
+            return self.default_idf * UNSEEN_NUMERIC_WEIGHT
+        return self.default_idf
+
+    def search(self, tokens: list[str], allowed_prefix: str = "") -> LocalCategoryMatch | None:
+        unique = list(dict.fromkeys(tokens))
+        known = [t for t in unique if t in self.postings]
+        if not known:
+            return None
+        scores: dict[int, float] = {}
+        covered: dict[int, float] = {}
+        for tok in known:
+            idf = self.idf[tok]
+            for idx, tf in self.postings[tok]:
+                if allowed_prefix and not self.names[idx].lower().startswith(allowed_prefix):
+                    continue
+                norm = 1 - BM25_B + BM25_B * self.lengths[idx] / (self.avg_len or 1)
+                scores[idx] = scores.get(idx, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+                covered[idx] = covered.get(idx, 0.0) + idf
+        if not scores:
+            return None
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        best_idx, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        total_idf = sum(self._weight(t) for t in unique)
+        coverage = covered[best_idx] / total_idf if total_idf else 0.0
+        margin = 1 - runner_up / best if best > 0 else 0.0
+        return LocalCategoryMatch(
+            nospos_id=self.ids[best_idx],
+            full_name=self.names[best_idx],
+            path=path_segments(self.names[best_idx]),
+            score=round(best, 4),
+            confidence=round(coverage * margin, 4),
+        )
+
+
+def _is_staff_pick(pick: dict) -> bool:
+    """
+    True for a NosPos category staff chose themselves. Model picks are stamped
+    with a ``source`` such as "negotiation_ai"; hints derived from the line's
+    internal ProductCategory carry an internal id rather than a NosPos one.
+    """
+    if pick.get("fromInternalProductCategory"):
+        return False
+    return not str(pick.get("source") or "").endswith(AI_PICK_SOURCE_SUFFIX)
+
+
+def _learned_titles(leaf_by_id: dict[int, str], leaf_by_path: dict[str, int]) -> dict[int, list[str]]:
+    learned: dict[int, list[str]] = {}
+    rows = (
+        RequestItem.objects.filter(line_metadata_json__has_key="aiSuggestedNosposStockCategory")
+        .order_by("-pk")
+        .values_list("line_metadata_json", "variant__title")[:LEARNED_LIMIT]
+    )
+    for meta, variant_title in rows:
+        pick = (meta or {}).get("aiSuggestedNosposStockCategory") or {}
+        if not isinstance(pick, dict) or not _is_staff_pick(pick):
+            continue
+        nid = pick.get("nosposId")
+        try:
+            nid = int(nid) if nid is not None else None
+        except (TypeError, ValueError):
+            nid = None
+        if nid not in leaf_by_id:
+            nid = leaf_by_path.get(_path_key(pick.get("fullName") or ""))
+        title = str((meta or {}).get("display_title") or variant_title or "").strip()
+        if nid is None or not title:
+            continue
+        bucket = learned.setdefault(nid, [])
+        if len(bucket) < LEARNED_PER_LEAF:
+            bucket.append(title)
+    return learned
+
+
+def _build_index() -> _Bm25Index:
+    snapshot = get_catalogue_snapshot()
+    parents = {row["parentNosposId"] for row in snapshot.results if row.get("parentNosposId")}
+    leaf_by_id = {
+        row["nosposId"]: row["fullName"]
+        for row in snapshot.results
+        if row.get("nosposId") and row["nosposId"] not in parents and row.get("fullName")
+    }
+    leaf_by_path = {_path_key(name): nid for nid, name in leaf_by_id.items()}
+
+    mapped: dict[int, list[str]] = {}
+    for name, nospos_path in NosposCategoryMapping.objects.values_list("category__name", "nospos_path"):
+        nid = leaf_by_path.get(_path_key(nospos_path))
+        if nid is not None:
+            mapped.setdefault(nid, []).append(name)
+
+    learned = _learned_titles(leaf_by_id, leaf_by_path)
+
+    docs = []
+    for nid, full_name in leaf_by_id.items():
+        segs = path_segments(full_name)
+        tokens = tokenize(" ".join(segs)) + tokenize(segs[-1] if segs else "")
+        for name in mapped.get(nid, []):
+            tokens += tokenize(name)
+        for title in learned.get(nid, []):
+            tokens += list(dict.fromkeys(tokenize(title)))
+        docs.append((nid, " > ".join(segs), tokens))
+
+    logger.info(
+        "[Category matcher] Indexed %d leaves (%d mapped, %d with learned titles) from catalogue v%s",
+        len(docs), len(mapped), len(learned), snapshot.version,
+    )
+    return _Bm25Index(docs, snapshot.version)
+
+
+_index: _Bm25Index | None = None
+_index_lock = threading.Lock()
+
+
+def _get_index() -> _Bm25Index:
+    global _index
+    index = _index
+    if index is not None and time.monotonic() - index.built_at < REFRESH_SECONDS:
+        return index
+    with _index_lock:
+        if _index is None or time.monotonic() - _index.built_at >= REFRESH_SECONDS:
+            _index = _build_index()
+        return _index
+
+
+def reset_index() -> None:
+    """Drop the in-process index so the next match rebuilds it."""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def match_threshold() -> float:
+    return float(getattr(settings, "AI_LOCAL_CATEGORY_MATCH_THRESHOLD", DEFAULT_THRESHOLD))
+
+
+def match_category(
+    item_name: str,
+    db_category: str | None = None,
+    previous_path: list[str] | None = None,
+) -> LocalCategoryMatch | None:
+    """
+    Best NosPos leaf for the item by BM25, optionally restricted to leaves
+    under ``previous_path``. None when no indexed token matches.
+    """
+    tokens = tokenize(item_name) + tokenize(db_category or "")
+    prefix = ""
+    if previous_path:
+        prefix = " > ".join(s.strip() for s in previous_path if s and s.strip()).lower()
+        prefix = f"{prefix} > " if prefix else ""
+    try:
+        return _get_index().search(tokens, prefix)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("[Category matcher] Lookup failed (%s: %s)", type(exc).__name__, exc)
+        return None
+
+
+def confident_match(
+    item_name: str,
+    db_category: str | None = None,
+    previous_path: list[str] | None = None,
+) -> LocalCategoryMatch | None:
+    """``match_category`` result when its confidence clears the configured threshold."""
+    match = match_category(item_name, db_category, previous_path)
+    if match is not None and match.confidence >= match_threshold():
+        return match
+    return None
@@ -13,11 +13,11 @@ CEX_BOX_DETAIL_HEADERS = {
 }
 
 
-def fetch_cex_box_detail(sku):
+def fetch_cex_box_detail(sku, timeout=10):
     """Fetch live box details from CEX API. Returns dict or None on failure."""
     url = f"https://wss2.cex.uk.webuy.io/v3/boxes/{sku}/detail"
     try:
-        resp = requests.get(url, headers=CEX_BOX_DETAIL_HEADERS, timeout=10)
+        resp = requests.get(url, headers=CEX_BOX_DETAIL_HEADERS, timeout=timeout)
         resp.raise_for_status()
         data = resp.json()
         response = data.get("response", {})
@@ -0,0 +1,499 @@
+"""
+Freshness-aware CeX reference prices for catalogue variants.
+
+Pricing endpoints used to call CeX live on every request and silently fall
+back to whatever was in the DB when CeX failed. Here a stored price is served
+as-is while it is younger than the applicable max age (PricingRule override,
+else settings.CEX_PRICE_MAX_AGE_MINUTES); only stale variants are fetched
+live, and live results are written back to Variant + VariantPriceHistory in
+one batch so the next request is served from the DB.
+
+Every request-path lookup is also counted towards Variant.price_lookup_count
+/ last_price_lookup_at. Counts are buffered in-process and written in
+batches (settings.CEX_LOOKUP_FLUSH_SECONDS / CEX_LOOKUP_FLUSH_MAX_PENDING),
+so a pricing GET normally does not write. A timer thread flushes the buffer
+CEX_LOOKUP_FLUSH_SECONDS after its first count, so counts from a till that
+goes quiet still land even if the worker is later killed without atexit. The refresh_hot_cex_prices worker
+uses those counts to keep hot SKUs fresh ahead of expiry; with
+settings.CEX_PRICE_REFRESH_WORKER on, request handlers never call CeX
+themselves (except an explicit refresh).
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from pricing.models_v2 import PricingRule, ProductCategory, Variant, VariantPriceHistory
+from pricing.services.cex_client import fetch_cex_box_detail
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DB = "db"              # stored price, still within max age
+SOURCE_LIVE = "live"          # fetched from CeX for this request
+SOURCE_DB_STALE = "db_stale"  # stored price past max age (live fetch failed or left to the worker)
+
+_WRITE_BACK_FIELDS = [
+    "current_price_gbp",
+    "tradein_cash",
+    "tradein_voucher",
+    "cex_out_of_stock",
+    "cex_price_checked_at",
+    "cex_image_urls",
+]
+
+
+@dataclass
+class CexReferencePrices:
+    """CeX sell / trade-in prices for one variant plus where they came from."""
+
+    sale_price: float
+    tradein_cash: float
+    tradein_voucher: float
+    out_of_stock: bool
+    source: str
+    checked_at: datetime | None
+    max_age_seconds: int
+    image_urls: dict = field(default_factory=dict)
+    box_name: str | None = None
+
+    @property
+    def age_seconds(self) -> int | None:
+        if self.checked_at is None:
+            return None
+        return max(0, int((timezone.now() - self.checked_at).total_seconds()))
+
+    def as_reference_fields(self) -> dict:
+        """Provenance keys merged into API reference_data payloads."""
+        return {
+            "cex_price_source": self.source,
+            "cex_price_checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "cex_price_age_seconds": self.age_seconds,
+            "cex_price_max_age_seconds": self.max_age_seconds,
+        }
+
+
+_UNRESOLVED = object()
+
+
+def cex_price_max_age(variant: Variant, rule=_UNRESOLVED) -> timedelta:
+    """
+    Max age for ``variant``'s stored CeX price (rule override, else settings
+    default). Pass ``rule`` (None included) when it is already resolved.
+    """
+    if rule is _UNRESOLVED:
+        rule = variant.get_applicable_rule()
+    minutes = getattr(rule, "cex_price_max_age_minutes", None)
+    if minutes is None:
+        minutes = getattr(settings, "CEX_PRICE_MAX_AGE_MINUTES", 60)
+    return timedelta(minutes=max(0, int(minutes)))
+
+
+class PricingRuleResolver:
+    """
+    ``Variant.get_applicable_rule()`` for many variants at once. All rules and
+    the category tree are read up front (two queries) and each category's rule
+    is resolved once, instead of a query per ancestor per variant.
+    """
+
+    def __init__(self):
+        self._by_product: dict[int, PricingRule] = {}
+        self._by_category: dict[int, PricingRule] = {}
+        self._global: PricingRule | None = None
+        for rule in PricingRule.objects.order_by("pk"):
+            if rule.product_id is not None:
+                self._by_product.setdefault(rule.product_id, rule)
+            if rule.category_id is not None:
+                self._by_category.setdefault(rule.category_id, rule)
+            if rule.is_global_default and self._global is None:
+                self._global = rule
+        self._parents = dict(ProductCategory.objects.values_list("category_id", "parent_category_id"))
+        self._resolved: dict[int, PricingRule | None] = {}
+
+    def _for_category(self, category_id: int | None) -> PricingRule | None:
+        if category_id in self._resolved:
+            return self._resolved[category_id]
+        rule = None
+        seen = set()
+        current = category_id
+        while current is not None and current not in seen:
+            rule = self._by_category.get(current)
+            if rule is not None:
+                break
+            seen.add(current)
+            current = self._parents.get(current)
+        rule = rule or self._global
+        self._resolved[category_id] = rule
+        return rule
+
+    def for_variant(self, variant: Variant) -> PricingRule | None:
+        rule = self._by_product.get(variant.product_id)
+        if rule is not None:
+            return rule
+        return self._for_category(variant.product.category_id)
+
+
+def cex_price_checked_at(variant: Variant) -> datetime | None:
+    """
+    When the stored prices and images were last confirmed. None (legacy rows,
+    new imports) counts as stale, so the next lookup goes live and stores the
+    images the import does not carry.
+    """
+    return variant.cex_price_checked_at
+
+
+def _box_decimal(box: dict, key: str) -> Decimal | None:
+    try:
+        val = Decimal(str(box.get(key) or 0))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return val if val > 0 else None
+
+
+def _from_db(variant: Variant, source: str, max_age: timedelta) -> CexReferencePrices:
+    return CexReferencePrices(
+        sale_price=float(variant.current_price_gbp),
+        tradein_cash=float(variant.tradein_cash or 0),
+        tradein_voucher=float(variant.tradein_voucher or 0),
+        out_of_stock=bool(variant.cex_out_of_stock),
+        source=source,
+        checked_at=cex_price_checked_at(variant),
+        max_age_seconds=int(max_age.total_seconds()),
+        image_urls=dict(variant.cex_image_urls or {}),
+    )
+
+
+def _apply_live_box(variant: Variant, box: dict, now: datetime) -> bool:
+    """Copy live CeX values onto ``variant`` in memory. Returns True if the sell price changed."""
+    sell = _box_decimal(box, "sellPrice")
+    cash = _box_decimal(box, "cashPrice")
+    voucher = _box_decimal(box, "exchangePrice")
+    price_changed = sell is not None and sell != variant.current_price_gbp
+    if sell is not None:
+        variant.current_price_gbp = sell
+    if cash is not None:
+        variant.tradein_cash = cash
+    if voucher is not None:
+        variant.tradein_voucher = voucher
+    variant.cex_out_of_stock = bool(box.get("outOfStock", 0))
+    image_urls = box.get("imageUrls")
+    if isinstance(image_urls, dict) and image_urls:
+        variant.cex_image_urls = {k: image_urls.get(k) for k in ("large", "medium", "small")}
+    variant.cex_price_checked_at = now
+    return price_changed
+
+
+class _LookupBuffer:
+    """Process-local lookup counts waiting to be written to Variant."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts: Counter[int] = Counter()
+        self.last_at: datetime | None = None
+        self.started: float | None = None
+        self.timer: threading.Timer | None = None
+
+
+_lookups = _LookupBuffer()
+
+
+def record_price_lookups(variant_ids, now: datetime | None = None) -> None:
+    """
+    Count lookups of ``variant_ids`` for refresh worker hotness. Counts are
+    buffered and flushed once the buffer holds CEX_LOOKUP_FLUSH_MAX_PENDING
+    variants or is CEX_LOOKUP_FLUSH_SECONDS old (0 writes every call), by
+    this call or by the buffer's timer, whichever comes first.
+    """
+    variant_ids = list(variant_ids)
+    if not variant_ids:
+        return
+    now = now or timezone.now()
+    max_pending = int(getattr(settings, "CEX_LOOKUP_FLUSH_MAX_PENDING", 500))
+    max_seconds = float(getattr(settings, "CEX_LOOKUP_FLUSH_SECONDS", 30))
+    with _lookups.lock:
+        _lookups.counts.update(variant_ids)
+        if _lookups.last_at is None or now > _lookups.last_at:
+            _lookups.last_at = now
+        if _lookups.started is None:
+            _lookups.started = time.monotonic()
+        due = (
+            len(_lookups.counts) >= max_pending
+            or time.monotonic() - _lookups.started >= max_seconds
+        )
+        if not due and _lookups.timer is None:
+            _lookups.timer = threading.Timer(max_seconds, _flush_price_lookups_on_timer)
+            _lookups.timer.daemon = True
+            _lookups.timer.start()
+    if due:
+        flush_price_lookups()
+
+
+def flush_price_lookups() -> int:
+    """
+    Write buffered lookup counts, one UPDATE per distinct increment (and per
+    500 ids). last_price_lookup_at is the newest lookup in the buffer, so it is
+    accurate to within the flush interval. Returns the number of variants written.
+    """
+    with _lookups.lock:
+        counts = dict(_lookups.counts)
+        last_at = _lookups.last_at
+        _lookups.counts.clear()
+        _lookups.last_at = None
+        _lookups.started = None
+        timer, _lookups.timer = _lookups.timer, None
+    if timer is not None and timer is not threading.current_thread():
+        timer.cancel()
+    if not counts:
+        return 0
+
+    by_increment: dict[int, list[int]] = defaultdict(list)
+    for variant_id, n in counts.items():
+        by_increment[n].append(variant_id)
+    try:
+        for n, ids in by_increment.items():
+            for start in range(0, len(ids), 500):
+                Variant.objects.filter(variant_id__in=ids[start:start + 500]).update(
+                    price_lookup_count=F("price_lookup_count") + n,
+                    last_price_lookup_at=last_at,
+                )
+    except DatabaseError as exc:
+        logger.warning("[CeX prices] Dropped %d buffered lookup count(s): %s", len(counts), exc)
+        return 0
+    return len(counts)
+
+
+def _flush_price_lookups_on_timer() -> None:
+    try:
+        flush_price_lookups()
+    except Exception as exc:  # noqa: BLE001 - a background thread has no caller to raise to
+        logger.warning("[CeX prices] Timed lookup flush failed (%s: %s)", type(exc).__name__, exc)
+    finally:
+        connections.close_all()
+
+
+@atexit.register
+def _flush_price_lookups_at_exit() -> None:
+    try:
+        flush_price_lookups()
+    except Exception:  # noqa: BLE001 - interpreter shutdown, nothing left to report to
+        pass
+
+
+def decay_price_lookup_counts() -> int:
+    """Halve every non-zero lookup count so hotness follows recent demand. Returns rows touched."""
+    return Variant.objects.filter(price_lookup_count__gt=0).update(
+        price_lookup_count=F("price_lookup_count") / 2,
+    )
+
+
+def write_back_live_prices(refreshed: list[Variant], price_changed: list[Variant], now: datetime) -> None:
+    """Persist refreshed variants and append history rows for sell-price changes, in one batch."""
+    if not refreshed:
+        return
+    with transaction.atomic():
+        Variant.objects.bulk_update(refreshed, _WRITE_BACK_FIELDS, batch_size=500)
+        if price_changed:
+            VariantPriceHistory.objects.bulk_create(
+                [
+                    VariantPriceHistory(variant=v, price_gbp=v.current_price_gbp, recorded_at=now)
+                    for v in price_changed
+                ],
+                batch_size=500,
+            )
+
+
+def resolve_cex_reference_prices(
+    variants: list[Variant],
+    *,
+    rules: dict | None = None,
+    force_live: bool = False,
+) -> dict[int, CexReferencePrices]:
+    """
+    Return CeX reference prices keyed by variant_id.
+
+    Fresh variants are served from the DB; stale ones (or all, with
+    ``force_live``) are fetched from CeX and written back together. When
+    settings.CEX_PRICE_REFRESH_WORKER is on, stale variants are served from
+    the DB as ``db_stale`` and left to the worker.
+    ``rules`` optionally maps variant_id → applicable PricingRule so callers
+    that already resolved the rule do not repeat the lookup.
+    """
+    now = timezone.now()
+    out: dict[int, CexReferencePrices] = {}
+    refreshed: list[Variant] = []
+    price_changed: list[Variant] = []
+    live_allowed = force_live or not getattr(settings, "CEX_PRICE_REFRESH_WORKER", False)
+
+    record_price_lookups((v.variant_id for v in variants), now)
+
+    for variant in variants:
+        rule = rules.get(variant.variant_id, _UNRESOLVED) if rules is not None else _UNRESOLVED
+        max_age = cex_price_max_age(variant, rule)
+        checked_at = cex_price_checked_at(variant)
+        if not force_live and checked_at is not None and now - checked_at <= max_age:
+            out[variant.variant_id] = _from_db(variant, SOURCE_DB, max_age)
+            continue
+        if not live_allowed:
+            out[variant.variant_id] = _from_db(variant, SOURCE_DB_STALE, max_age)
+            continue
+
+        box = fetch_cex_box_detail(variant.cex_sku)
+        if box is None:
+            logger.warning(
+                "[CeX prices] Live fetch failed for %s; serving stored price from %s",
+                variant.cex_sku, checked_at,
+            )
+            out[variant.variant_id] = _from_db(variant, SOURCE_DB_STALE, max_age)
+            continue
+
+        if _apply_live_box(variant, box, now):
+            price_changed.append(variant)
+        refreshed.append(variant)
+        prices = _from_db(variant, SOURCE_LIVE, max_age)
+        prices.box_name = box.get("boxName") or None
+        out[variant.variant_id] = prices
+
+    write_back_live_prices(refreshed, price_changed, now)
+    return out
+
+
+@dataclass
+class RefreshResult:
+    """Outcome of one refresh_cex_prices pass."""
+
+    refreshed: int = 0
+    price_changed: int = 0
+    failed: int = 0
+    skus_refreshed: list[str] = field(default_factory=list)
+    skus_failed: list[str] = field(default_factory=list)
+
+
+class RefreshBackoff:
+    """
+    Per-SKU exponential backoff for the refresh worker. A SKU whose CeX fetch
+    fails is skipped for ``base`` × 2^(failures - 1) seconds, capped at ``cap``,
+    so a dead SKU does not head every cycle; a successful fetch clears it.
+    """
+
+    def __init__(self, base: float, cap: float):
+        self.base = base
+        self.cap = cap
+        self._state: dict[str, tuple[int, float]] = {}
+
+    def blocked(self, now: float | None = None) -> set[str]:
+        """SKUs still backing off; entries expired for longer than ``cap`` are forgotten."""
+        now = time.monotonic() if now is None else now
+        for sku, (_, until) in list(self._state.items()):
+            if until + self.cap < now:
+                del self._state[sku]
+        return {sku for sku, (_, until) in self._state.items() if until > now}
+
+    def record(self, result: RefreshResult, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        for sku in result.skus_refreshed:
+            self._state.pop(sku, None)
+        for sku in result.skus_failed:
+            failures = self._state.get(sku, (0, 0.0))[0] + 1
+            self._state[sku] = (failures, now + min(self.cap, self.base * 2 ** (failures - 1)))
+
+
+def select_hot_variants(
+    *,
+    window: timedelta,
+    limit: int,
+    min_lookups: int = 1,
+    refresh_ahead: float = 0.8,
+    skip_skus: set[str] | None = None,
+) -> list[Variant]:
+    """
+    Variants looked up within ``window`` whose stored price is due for a
+    refresh, hottest first (lookup count, then most recent lookup).
+
+    A variant is due once its age reaches ``refresh_ahead`` × its max age, so
+    hot SKUs are refreshed before request handlers would see them as stale.
+    ``skip_skus`` (e.g. RefreshBackoff.blocked()) are left out.
+    """
+    now = timezone.now()
+    rules = PricingRuleResolver()
+    candidates = (
+        Variant.objects
+        .filter(
+            last_price_lookup_at__gte=now - window,
+            price_lookup_count__gte=min_lookups,
+        )
+        .exclude(cex_sku__isnull=True)
+        .exclude(cex_sku="")
+        .select_related("product__category")
+        .order_by("-price_lookup_count", "-last_price_lookup_at")
+    )
+    due: list[Variant] = []
+    for variant in candidates.iterator(chunk_size=500):
+        if skip_skus and variant.cex_sku in skip_skus:
+            continue
+        checked_at = cex_price_checked_at(variant)
+        if checked_at is not None:
+            threshold = cex_price_max_age(variant, rules.for_variant(variant)) * refresh_ahead
+            if now - checked_at < threshold:
+                continue
+        due.append(variant)
+        if len(due) >= limit:
+            break
+    return due
+
+
+def refresh_cex_prices(
+    variants: list[Variant],
+    *,
+    min_interval: float = 0.0,
+    batch_size: int = 50,
+    should_stop=None,
+) -> RefreshResult:
+    """
+    Fetch ``variants`` from CeX one by one, at most one call per
+    ``min_interval`` seconds, writing results back every ``batch_size``
+    variants. ``should_stop`` (callable) lets a worker abort between calls.
+    """
+    result = RefreshResult()
+    refreshed: list[Variant] = []
+    price_changed: list[Variant] = []
+    last_call = 0.0
+
+    def flush():
+        write_back_live_prices(refreshed, price_changed, timezone.now())
+        result.refreshed += len(refreshed)
+        result.price_changed += len(price_changed)
+        refreshed.clear()
+        price_changed.clear()
+
+    for variant in variants:
+        if should_stop is not None and should_stop():
+            break
+        wait = min_interval - (time.monotonic() - last_call)
+        if wait > 0:
+            time.sleep(wait)
+        last_call = time.monotonic()
+
+        box = fetch_cex_box_detail(variant.cex_sku)
+        if box is None:
+            result.failed += 1
+            result.skus_failed.append(variant.cex_sku)
+            continue
+        if _apply_live_box(variant, box, timezone.now()):
+            price_changed.append(variant)
+        refreshed.append(variant)
+        result.skus_refreshed.append(variant.cex_sku)
+        if len(refreshed) >= batch_size:
+            flush()
+
+    flush()
+    return result
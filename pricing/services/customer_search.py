@@ -0,0 +1,103 @@
+"""
+Server-side customer search over the normalised Customer search columns.
+
+The customer lookup used to download every Customer and filter in the
+browser. Searches now run against indexed, normalised columns kept in step
+by ``Customer.save()``:
+
+* ``phone_digits``: digits only, +44 folded to 0;
+* ``name_search`` / ``surname_search``: case-folded, no punctuation, so
+  "smi" finds "John Smith" and "obri" finds "O'Brien";
+* ``email_search``: lower-cased.
+
+Each kind of match is a separate prefix query written as a range
+(``col >= p AND col < p + U+FFFF``) next to ``startswith``. SQLite's
+``LIKE ... ESCAPE`` cannot use a B-tree index on its own, but the range can,
+on both SQLite and PostgreSQL. Every query is capped at ``limit``, and the
+results are merged and ranked: exact phone / email / name first, then phone,
+name, surname and email prefixes, then by name. Prefix queries are ordered
+by name, so an exact phone or email match gets its own equality query and
+cannot be crowded out of the capped prefix results (an exact name already
+sorts first in its own range).
+"""
+from __future__ import annotations
+
+import re
+from typing import Callable
+
+from django.db.models import Q
+
+from pricing.models_v2 import Customer
+from pricing.utils.parsing import normalize_phone, normalize_search_text
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MIN_TEXT_LENGTH = 2
+MIN_PHONE_DIGITS = 3
+
+# Lower is better.
+RANK_EXACT_PHONE = 0
+RANK_EXACT_EMAIL = 1
+RANK_EXACT_NAME = 2
+RANK_PHONE_PREFIX = 3
+RANK_NAME_PREFIX = 4
+RANK_SURNAME_PREFIX = 5
+RANK_EMAIL_PREFIX = 6
+
+_PREFIX_UPPER = "\uffff"
+_NON_PHONE_RE = re.compile(r"[^\d\s+\-().]")
+
+
+def _prefix(field: str, prefix: str) -> Q:
+    return Q(**{f"{field}__gte": prefix, f"{field}__lt": prefix + _PREFIX_UPPER, f"{field}__startswith": prefix})
+
+
+def _looks_like_phone(query: str, digits: str) -> bool:
+    return len(digits) >= MIN_PHONE_DIGITS and not _NON_PHONE_RE.search(query)
+
+
+def search_customers(query: str, limit: int = DEFAULT_LIMIT) -> list[Customer]:
+    """Best-ranked customers whose phone, name, surname or email starts with ``query``."""
+    query = (query or "").strip()
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    digits = normalize_phone(query)
+    text = normalize_search_text(query)
+    email = query.lower()
+
+    probes: list[tuple[Q, Callable[[Customer], int]]] = []
+    if _looks_like_phone(query, digits):
+        phone_q = _prefix("phone_digits", digits)
+        if not digits.startswith("0"):
+            # "7700 900…" typed without the national 0.
+            phone_q |= _prefix("phone_digits", "0" + digits)
+        exact_phones = [digits] if digits.startswith("0") else [digits, "0" + digits]
+        probes.append((Q(phone_digits__in=exact_phones), lambda c: RANK_EXACT_PHONE))
+        probes.append((
+            phone_q,
+            lambda c: RANK_EXACT_PHONE if c.phone_digits in exact_phones else RANK_PHONE_PREFIX,
+        ))
+    elif "@" in email:
+        probes.append((Q(email_search=email), lambda c: RANK_EXACT_EMAIL))
+        probes.append((
+            _prefix("email_search", email),
+            lambda c: RANK_EXACT_EMAIL if c.email_search == email else RANK_EMAIL_PREFIX,
+        ))
+    elif len(text) >= MIN_TEXT_LENGTH:
+        probes.append((
+            _prefix("name_search", text),
+            lambda c: RANK_EXACT_NAME if c.name_search == text else RANK_NAME_PREFIX,
+        ))
+        if " " not in text:
+            probes.append((_prefix("surname_search", text), lambda c: RANK_SURNAME_PREFIX))
+        probes.append((_prefix("email_search", email), lambda c: RANK_EMAIL_PREFIX))
+
+    ranked: dict[int, tuple[int, Customer]] = {}
+    for q, rank_of in probes:
+        for customer in Customer.objects.select_related("stats").filter(q).order_by("name_search", "customer_id")[:limit]:
+            rank = rank_of(customer)
+            current = ranked.get(customer.customer_id)
+            if current is None or rank < current[0]:
+                ranked[customer.customer_id] = (rank, customer)
+
+    ordered = sorted(ranked.values(), key=lambda rc: (rc[0], rc[1].name_search, rc[1].customer_id))
+    return [customer for _, customer in ordered[:limit]]
@@ -0,0 +1,148 @@
+"""
+Incrementally maintained per-customer request statistics (CustomerStats).
+
+``Customer.cancel_rate`` used to run ``self.requests.count()`` for every
+serialised customer, including each nested ``customer_details`` in a request
+list. Instead, ``RequestStatusHistory.save()`` calls ``record_status_change``
+for every new status row, inside the same transaction. That moves the request
+from the bucket of its previous latest status to the bucket of the new one,
+counts it on its first row and adds its negotiated total when it first
+reaches COMPLETE. Readers ``select_related("stats")`` (or
+``"customer__stats"``), so the figures come back in the customer query.
+
+``Request.save()`` calls ``request_stats_changed`` when a request moves to
+another customer or a completed request's negotiated total changes, and
+``Request.delete()`` rebuilds the customer's row.
+``rebuild_customer_stats`` recomputes rows from the history tables. Use it
+after bulk imports, queryset ``update()`` / ``delete()`` calls and anything
+else that bypasses those methods.
+"""
+from __future__ import annotations
+
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+
+from pricing.models_v2 import (
+    Customer,
+    CustomerStats,
+    Request,
+    RequestStatus,
+    RequestStatusHistory,
+)
+
+logger = logging.getLogger(__name__)
+
+_BUCKETS = {
+    RequestStatus.QUOTE: "open_quotes",
+    RequestStatus.BOOKED_FOR_TESTING: "booked_for_testing",
+    RequestStatus.COMPLETE: "completed",
+}
+
+
+def _previous_status(history: RequestStatusHistory) -> str | None:
+    return (
+        RequestStatusHistory.objects.filter(request_id=history.request_id)
+        .exclude(pk=history.pk)
+        .filter(effective_at__lte=history.effective_at)
+        .order_by("-effective_at", "-pk")
+        .values_list("status", flat=True)
+        .first()
+    )
+
+
+def record_status_change(history: RequestStatusHistory) -> None:
+    """Apply one newly written status row to its customer's CustomerStats."""
+    request_id, customer_id, negotiated = (
+        Request.objects.filter(pk=history.request_id)
+        .values_list("request_id", "customer_id", "negotiated_grand_total_gbp")
+        .get()
+    )
+    previous = _previous_status(history)
+    if previous == history.status:
+        return
+
+    with transaction.atomic():
+        stats, _ = CustomerStats.objects.select_for_update().get_or_create(customer_id=customer_id)
+        updates = {}
+        if previous is None:
+            updates["total_requests"] = F("total_requests") + 1
+        elif previous in _BUCKETS:
+            updates[_BUCKETS[previous]] = F(_BUCKETS[previous]) - 1
+        if history.status in _BUCKETS:
+            updates[_BUCKETS[history.status]] = F(_BUCKETS[history.status]) + 1
+        if history.status == RequestStatus.COMPLETE:
+            updates["negotiated_total_gbp"] = F("negotiated_total_gbp") + (negotiated or Decimal("0"))
+        if previous == RequestStatus.COMPLETE:
+            updates["negotiated_total_gbp"] = F("negotiated_total_gbp") - (negotiated or Decimal("0"))
+        if stats.last_request_id is None or request_id >= stats.last_request_id:
+            updates["last_request_id"] = request_id
+            updates["last_request_status"] = history.status
+        CustomerStats.objects.filter(pk=customer_id).update(**updates)
+
+
+def request_stats_changed(request: Request, old_customer_id, old_negotiated) -> None:
+    """Rebuild the affected customers after a saved request changed customer or total."""
+    if request.customer_id != old_customer_id:
+        rebuild_customer_stats({old_customer_id, request.customer_id} - {None})
+        return
+    if request.negotiated_grand_total_gbp == old_negotiated:
+        return
+    latest = (
+        RequestStatusHistory.objects.filter(request_id=request.pk)
+        .order_by("-effective_at", "-pk")
+        .values_list("status", flat=True)
+        .first()
+    )
+    if latest == RequestStatus.COMPLETE:
+        rebuild_customer_stats([request.customer_id])
+
+
+def rebuild_customer_stats(customer_ids=None) -> int:
+    """Recompute CustomerStats from scratch for ``customer_ids`` (all customers when None)."""
+    customers = Customer.objects.all()
+    history = RequestStatusHistory.objects.all()
+    requests = Request.objects.all()
+    existing = CustomerStats.objects.all()
+    if customer_ids is not None:
+        customer_ids = list(customer_ids)
+        customers = customers.filter(customer_id__in=customer_ids)
+        history = history.filter(request__customer_id__in=customer_ids)
+        requests = requests.filter(customer_id__in=customer_ids)
+        existing = existing.filter(customer_id__in=customer_ids)
+
+    rows = {
+        customer_id: CustomerStats(customer_id=customer_id)
+        for customer_id in customers.values_list("customer_id", flat=True).iterator()
+    }
+
+    latest: dict[int, str] = {}
+    for request_id, status in (
+        history.order_by("request_id", "effective_at", "pk").values_list("request_id", "status").iterator()
+    ):
+        latest[request_id] = status
+
+    for request_id, customer_id, negotiated in (
+        requests.order_by("request_id")
+        .values_list("request_id", "customer_id", "negotiated_grand_total_gbp")
+        .iterator()
+    ):
+        status = latest.get(request_id)
+        stats = rows.get(customer_id)
+        if status is None or stats is None:
+            continue
+        stats.total_requests += 1
+        if status in _BUCKETS:
+            setattr(stats, _BUCKETS[status], getattr(stats, _BUCKETS[status]) + 1)
+        if status == RequestStatus.COMPLETE:
+            stats.negotiated_total_gbp += negotiated or Decimal("0")
+        stats.last_request_id = request_id
+        stats.last_request_status = status
+
+    with transaction.atomic():
+        existing.delete()
+        CustomerStats.objects.bulk_create(rows.values(), batch_size=1000)
+    logger.info("[Customer stats] Rebuilt stats for %d customers", len(rows))
+    return len(rows)
@@ -0,0 +1,142 @@
+"""
+In-process TTL + LRU cache for marketplace filter facets.
+
+eBay refinements and Cash Converters facet groups for a search change slowly,
+but every research panel open asked the marketplace again. Facet lists are
+now cached per process under a normalised key: the exact upstream query
+parameters, sorted, with the search term lower-cased and its whitespace
+collapsed. Both the ``q`` + ``category_path`` form and the ``url`` form
+reduce to the same parameters, so they share entries. Entries expire after
+MARKETPLACE_FACET_CACHE_TTL_SECONDS. The least recently used are dropped
+beyond MARKETPLACE_FACET_CACHE_MAX_ENTRIES. Concurrent misses for the same
+key are coalesced: one caller fetches and the others wait for its result or
+its exception. Failures are never cached.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable
+from urllib.parse import parse_qsl, unquote_plus, urlparse
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 15 * 60
+DEFAULT_MAX_ENTRIES = 512
+
+_SEARCH_TERM_PARAMS = frozenset({"_nkw", "query"})
+
+
+class TtlLruCache:
+    """Thread-safe TTL + LRU map with single-flight ``get_or_compute``."""
+
+    def __init__(self, name: str, ttl_setting: str, size_setting: str):
+        self.name = name
+        self._ttl_setting = ttl_setting
+        self._size_setting = size_setting
+        self._entries: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Any, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _ttl(self) -> float:
+        return float(getattr(settings, self._ttl_setting, DEFAULT_TTL_SECONDS))
+
+    def _max_entries(self) -> int:
+        return max(1, int(getattr(settings, self._size_setting, DEFAULT_MAX_ENTRIES)))
+
+    def get_or_compute(self, key, compute: Callable[[], Any]) -> tuple[Any, str]:
+        """
+        Cached value for ``key`` or the result of ``compute()``. Returns
+        (value, "hit" | "miss" | "coalesced"); exceptions from ``compute``
+        propagate to every waiting caller.
+        """
+        ttl = self._ttl()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], "hit"
+            if entry is not None:
+                del self._entries[key]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result(), "coalesced"
+
+        try:
+            value = compute()
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+            if ttl > 0:
+                self._entries[key] = (time.monotonic() + ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max_entries():
+                    self._entries.popitem(last=False)
+        future.set_result(value)
+        return value, "miss"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+
+def _normalise_term(value: str) -> str:
+    return " ".join(unquote_plus(str(value)).lower().split())
+
+
+def params_cache_key(source: str, params: dict) -> tuple:
+    """Order-independent key for upstream query params (search term normalised)."""
+    items = []
+    for key, value in params.items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for v in values:
+            items.append((str(key), _normalise_term(v) if key in _SEARCH_TERM_PARAMS else str(v)))
+    return (source, tuple(sorted(items)))
+
+
+def url_cache_key(source: str, url: str) -> tuple:
+    """Key for an upstream URL: host + path + normalised, sorted query params."""
+    parsed = urlparse(url)
+    params: dict[str, list[str]] = {}
+    for key, value in parse_qsl(parsed.query, keep_blank_values=True):
+        params.setdefault(key, []).append(value)
+    return (parsed.netloc.lower(), parsed.path.rstrip("/"), *params_cache_key(source, params))
+
+
+ebay_facet_cache = TtlLruCache(
+    "ebay_filters", "MARKETPLACE_FACET_CACHE_TTL_SECONDS", "MARKETPLACE_FACET_CACHE_MAX_ENTRIES",
+)
+cashconverters_facet_cache = TtlLruCache(
+    "cashconverters_filters", "MARKETPLACE_FACET_CACHE_TTL_SECONDS", "MARKETPLACE_FACET_CACHE_MAX_ENTRIES",
+)
@@ -0,0 +1,264 @@
+"""
+Hedged LLM provider router.
+
+The AI suggestion services used to try Groq and only start Gemini after Groq
+had failed outright, so a slow Groq timeout added its whole latency before
+the fallback began. LlmRouter instead starts the preferred provider and, if
+it has not answered within a hedge delay (its observed p95 latency, clamped
+to [AI_HEDGE_MIN_DELAY_MS, AI_HEDGE_MAX_DELAY_MS]), starts the next provider
+alongside it. The first response that passes validation (parseable JSON)
+wins. Providers that have not started yet are cancelled. A call already in
+flight cannot be interrupted from Python, so its result is discarded (its
+latency / error is still recorded). A provider that fails fast hands over to
+the next one immediately.
+
+Each provider keeps rolling latency and error-rate stats. Once every
+provider has MIN_SAMPLES outcomes, the primary is whichever has the lowest
+p95 after an error-rate penalty. Until then the configured order holds,
+except that a provider failing most of its recent calls is tried last.
+Providers are plain callables, so tests and local runs can pass fakes
+(see ``fake_provider``).
+
+Each provider runs on its own small thread pool (AI_PROVIDER_MAX_WORKERS), so
+a provider whose calls hang can only tie up its own threads and never delays
+the hedge to the other one. Provider calls should pass ``provider_timeout_s()``
+to their client so a stuck request gives its thread back at the deadline.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEDGE_DELAY_MS = 2000
+DEFAULT_MIN_HEDGE_DELAY_MS = 250
+DEFAULT_MAX_HEDGE_DELAY_MS = 8000
+DEFAULT_TIMEOUT_SECONDS = 60
+DEFAULT_MAX_WORKERS = 8
+MIN_SAMPLES = 5
+WINDOW = 100
+DEMOTE_ERROR_RATE = 0.5
+
+
+@dataclass
+class Provider:
+    name: str
+    call: Callable[[str, str, int], str]  # (system, user, max_tokens) -> raw text
+
+
+@dataclass
+class ProviderStats:
+    latencies_ms: deque = field(default_factory=lambda: deque(maxlen=WINDOW))
+    outcomes: deque = field(default_factory=lambda: deque(maxlen=WINDOW))
+    calls: int = 0
+    errors: int = 0
+    wins: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, ok: bool, latency_ms: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.outcomes.append(ok)
+            if ok:
+                self.latencies_ms.append(latency_ms)
+            else:
+                self.errors += 1
+
+    def record_win(self) -> None:
+        with self._lock:
+            self.wins += 1
+
+    def samples(self) -> int:
+        return len(self.outcomes)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+    def p95_ms(self) -> float | None:
+        with self._lock:
+            if not self.latencies_ms:
+                return None
+            ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def as_dict(self) -> dict:
+        p95 = self.p95_ms()
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "wins": self.wins,
+            "errorRate": round(self.error_rate(), 4),
+            "p95Ms": round(p95, 1) if p95 is not None else None,
+        }
+
+
+def _ms_setting(name: str, default: int) -> float:
+    return float(getattr(settings, name, default))
+
+
+def provider_timeout_s() -> float:
+    """Overall router deadline; also the per-request timeout for provider clients."""
+    return float(getattr(settings, "AI_PROVIDER_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS))
+
+
+def _default_validate(raw: str) -> None:
+    text = (raw or "").strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
+    json.loads(text)
+
+
+class LlmRouter:
+    """Route one prompt across providers with hedging; see module docstring."""
+
+    def __init__(self, providers: list[Provider]):
+        if not providers:
+            raise ValueError("LlmRouter needs at least one provider.")
+        self.providers = list(providers)
+        self.stats = {p.name: ProviderStats() for p in self.providers}
+        workers = max(1, int(getattr(settings, "AI_PROVIDER_MAX_WORKERS", DEFAULT_MAX_WORKERS)))
+        self.executors = {
+            p.name: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"llm-{p.name}")
+            for p in self.providers
+        }
+
+    def ordered_providers(self) -> list[Provider]:
+        stats = self.stats
+        if all(stats[p.name].samples() >= MIN_SAMPLES for p in self.providers):
+            def expected_ms(p: Provider) -> float:
+                s = stats[p.name]
+                p95 = s.p95_ms()
+                if p95 is None:
+                    return float("inf")
+                return p95 / max(0.05, 1 - s.error_rate())
+            return sorted(self.providers, key=expected_ms)
+        return sorted(
+            self.providers,
+            key=lambda p: stats[p.name].samples() >= 3 and stats[p.name].error_rate() >= DEMOTE_ERROR_RATE,
+        )
+
+    def hedge_delay_s(self, provider: Provider) -> float:
+        lo = _ms_setting("AI_HEDGE_MIN_DELAY_MS", DEFAULT_MIN_HEDGE_DELAY_MS)
+        hi = _ms_setting("AI_HEDGE_MAX_DELAY_MS", DEFAULT_MAX_HEDGE_DELAY_MS)
+        stats = self.stats[provider.name]
+        p95 = stats.p95_ms() if stats.samples() >= MIN_SAMPLES else None
+        delay = p95 if p95 is not None else _ms_setting("AI_HEDGE_DELAY_MS", DEFAULT_HEDGE_DELAY_MS)
+        return min(hi, max(lo, delay)) / 1000.0
+
+    def _invoke(self, provider: Provider, system: str, user: str, max_tokens: int, validate) -> str:
+        started = time.monotonic()
+        try:
+            raw = provider.call(system, user, max_tokens)
+            validate(raw)
+        except Exception:
+            self.stats[provider.name].record(False, (time.monotonic() - started) * 1000)
+            raise
+        self.stats[provider.name].record(True, (time.monotonic() - started) * 1000)
+        return raw
+
+    def call(
+        self,
+        system: str,
+        user: str,
+        max_tokens: int,
+        label: str,
+        validate: Callable[[str], object] | None = None,
+    ) -> tuple[str, str]:
+        """
+        First valid response as (raw, provider name). Raises RuntimeError when
+        every provider failed or the overall timeout passed.
+        """
+        validate = validate or _default_validate
+        timeout = provider_timeout_s()
+        deadline = time.monotonic() + timeout
+        queue = self.ordered_providers()
+        pending: dict = {}
+        errors: list[str] = []
+        last_started: Provider | None = None
+        last_started_at = 0.0
+
+        def launch() -> None:
+            nonlocal last_started, last_started_at
+            provider = queue.pop(0)
+            future = self.executors[provider.name].submit(self._invoke, provider, system, user, max_tokens, validate)
+            pending[future] = provider
+            last_started, last_started_at = provider, time.monotonic()
+
+        launch()
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wait_s = deadline - now
+            if queue:
+                wait_s = min(wait_s, max(0.0, last_started_at + self.hedge_delay_s(last_started) - now))
+            done, _ = wait(list(pending), timeout=wait_s, return_when=FIRST_COMPLETED)
+
+            if not done:
+                if queue:
+                    logger.info(
+                        "[%s] %s slow (> %.0f ms) — hedging with %s",
+                        label, last_started.name, self.hedge_delay_s(last_started) * 1000, queue[0].name,
+                    )
+                    launch()
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    raw = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    errors.append(f"{provider.name}: {type(exc).__name__}: {exc}")
+                    logger.warning(
+                        "[%s] %s failed (%s: %s)", label, provider.name, type(exc).__name__, exc,
+                    )
+                    continue
+                for other in pending:
+                    other.cancel()
+                self.stats[provider.name].record_win()
+                logger.debug("[%s] %s responded OK", label, provider.name)
+                return raw, provider.name
+
+            # Every finished future failed; don't wait out the hedge delay.
+            if queue:
+                launch()
+
+        for future in pending:
+            future.cancel()
+        if pending:
+            errors.extend(f"{p.name}: timed out after {timeout:.0f}s" for p in pending.values())
+        raise RuntimeError(f"All AI providers failed. {'; '.join(errors)}.")
+
+    def stats_dict(self) -> dict:
+        order = [p.name for p in self.ordered_providers()]
+        return {
+            "order": order,
+            "providers": {name: s.as_dict() for name, s in self.stats.items()},
+        }
+
+
+def fake_provider(
+    name: str,
+    response: str | Callable[[str, str], str],
+    *,
+    delay_s: float = 0.0,
+    error: Exception | None = None,
+) -> Provider:
+    """Local provider for tests / offline runs: sleeps ``delay_s``, then returns or raises."""
+    def call(system: str, user: str, max_tokens: int) -> str:
+        if delay_s:
+            time.sleep(delay_s)
+        if error is not None:
+            raise error
+        return response(system, user) if callable(response) else response
+    return Provider(name=name, call=call)
@@ -0,0 +1,141 @@
+"""
+Process-wide pooled HTTP clients for the marketplace proxy endpoints.
+
+The eBay / Cash Converters proxies used to build a fresh requests.Session per
+call, which meant a new TLS handshake every time. eBay also paid an extra
+warm-up GET of the home page for cookies before each refine call. Each
+marketplace now has one MarketplaceClient per process: a Session with a
+bounded keep-alive connection pool, fixed browser-like headers and a
+persistent cookie jar. Its warm-up request runs once and again only when it
+is older than the warm-up TTL, when a cookie it set has expired, or after
+the site answers 401/403. Warm-up failures are logged, not raised; the real
+request still goes ahead. The warm-up GET runs outside the client lock: one
+caller does it while concurrent callers carry on with the current cookies
+instead of queueing behind it.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_WARMUP_TTL_SECONDS = 30 * 60
+WARMUP_TIMEOUT = 10
+
+BROWSER_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+
+
+class MarketplaceClient:
+    """Shared Session for one marketplace; see module docstring."""
+
+    def __init__(self, name: str, headers: dict[str, str], warmup_url: str | None = None):
+        self.name = name
+        self.headers = dict(headers)
+        self.warmup_url = warmup_url
+        self._session: requests.Session | None = None
+        self._warmed_at: float | None = None
+        self._warming = False
+        self._generation = 0  # bumped by invalidate() / reset() so an in-flight warm-up can't re-validate
+        self._lock = threading.Lock()
+
+    def _build_session(self) -> requests.Session:
+        pool_maxsize = int(getattr(settings, "MARKETPLACE_HTTP_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE))
+        session = requests.Session()
+        session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _warmup_stale(self) -> bool:
+        if self.warmup_url is None:
+            return False
+        if self._warmed_at is None:
+            return True
+        ttl = float(getattr(settings, "MARKETPLACE_WARMUP_TTL_SECONDS", DEFAULT_WARMUP_TTL_SECONDS))
+        if time.monotonic() - self._warmed_at >= ttl:
+            return True
+        now = time.time()
+        return any(c.expires is not None and c.expires <= now for c in self._session.cookies)
+
+    def session(self) -> requests.Session:
+        """The shared Session, warmed up if needed (by this caller or one already doing it)."""
+        with self._lock:
+            if self._session is None:
+                self._session = self._build_session()
+            session = self._session
+            if self._warming or not self._warmup_stale():
+                return session
+            self._warming = True
+            generation = self._generation
+
+        started = time.monotonic()
+        try:
+            session.get(self.warmup_url, timeout=WARMUP_TIMEOUT)
+            logger.debug(
+                "[Marketplace HTTP] %s warm-up OK (%.0f ms)",
+                self.name, (time.monotonic() - started) * 1000,
+            )
+        except requests.RequestException as exc:
+            logger.warning("[Marketplace HTTP] %s warm-up failed: %s", self.name, exc)
+        finally:
+            with self._lock:
+                self._warming = False
+                if generation == self._generation:
+                    self._warmed_at = time.monotonic()
+        return session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        response = self.session().get(url, **kwargs)
+        if response.status_code in (401, 403):
+            self.invalidate()
+        return response
+
+    def invalidate(self) -> None:
+        """Forget cookies and force a fresh warm-up on the next request."""
+        with self._lock:
+            if self._session is not None:
+                self._session.cookies.clear()
+            self._warmed_at = None
+            self._generation += 1
+
+    def reset(self) -> None:
+        """Close pooled connections and start over (e.g. in tests)."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._warmed_at = None
+            self._generation += 1
+
+
+ebay_client = MarketplaceClient(
+    "eBay",
+    {
+        "User-Agent": BROWSER_USER_AGENT,
+        "Accept": "application/json",
+        "Accept-Language": "en-GB,en;q=0.9",
+        "Referer": "https://www.ebay.co.uk/",
+    },
+    warmup_url="https://www.ebay.co.uk/",
+)
+
+cashconverters_client = MarketplaceClient(
+    "Cash Converters",
+    {
+        "User-Agent": BROWSER_USER_AGENT,
+        "Accept": "application/json",
+        "Accept-Language": "en-GB,en;q=0.9",
+        "Referer": "https://www.cashconverters.co.uk/",
+    },
+)
@@ -0,0 +1,190 @@
+"""
+Versioned NosPos catalogue snapshot (categories + linked fields).
+
+The extension and the frontend read the whole NosPos category tree with its
+field links, which changes only when the NosPos sync endpoints (or admin)
+write. Instead of rebuilding it per request, the JSON body is built once
+after each write, gzip-compressed and stored as a NosposCatalogueSnapshot row
+keyed by a content hash. GET /nospos-categories/ serves those bytes with the
+hash as ETag, so a client revalidating an unchanged tree gets a 304 after one
+tiny query. Each process keeps the latest decoded snapshot in memory and only
+reloads the blob when the version moves.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from pricing.models_v2 import NosposCatalogueSnapshot, NosposCategory, NosposCategoryField
+
+logger = logging.getLogger(__name__)
+
+KEEP_SNAPSHOTS = 3
+SUBTREE_CACHE_SIZE = 64
+
+
+def build_catalogue_results() -> list[dict]:
+    """Category rows with their linked fields, in (level, full_name, nospos_id) order."""
+    field_link_qs = NosposCategoryField.objects.select_related("field").order_by("field__name")
+    qs = (
+        NosposCategory.objects.select_related("parent")
+        .prefetch_related(Prefetch("field_links", queryset=field_link_qs))
+        .order_by("level", "full_name", "nospos_id")
+    )
+    results = []
+    for c in qs:
+        linked_fields = []
+        for link in c.field_links.all():
+            linked_fields.append({
+                "nosposFieldId": link.field.nospos_field_id,
+                "name": link.field.name,
+                "active": link.active,
+                "editable": link.editable,
+                "sensitive": link.sensitive,
+                "required": link.required,
+            })
+        results.append({
+            "id": c.id,
+            "nosposId": c.nospos_id,
+            "level": c.level,
+            "fullName": c.full_name,
+            "status": c.status or "",
+            "parentNosposId": c.parent.nospos_id if c.parent_id else None,
+            "parentFullName": c.parent.full_name if c.parent_id else None,
+            "buybackRate": str(c.buyback_rate) if c.buyback_rate is not None else None,
+            "offerRate": str(c.offer_rate) if c.offer_rate is not None else None,
+            "updatedAt": c.updated_at.isoformat() if c.updated_at else None,
+            "linkedFields": linked_fields,
+        })
+    return results
+
+
+def _encode(results: list[dict]) -> bytes:
+    return json.dumps(
+        {"count": len(results), "results": results},
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+
+def rebuild_catalogue_snapshot() -> NosposCatalogueSnapshot:
+    """
+    Build the catalogue and store it as a new snapshot unless its content hash
+    matches the latest one. Older snapshots beyond KEEP_SNAPSHOTS are pruned.
+    """
+    results = build_catalogue_results()
+    body = _encode(results)
+    etag = hashlib.sha256(body).hexdigest()[:32]
+
+    latest = NosposCatalogueSnapshot.objects.only("version", "etag").first()
+    if latest is not None and latest.etag == etag:
+        return latest
+
+    snapshot = NosposCatalogueSnapshot.objects.create(
+        etag=etag,
+        category_count=len(results),
+        payload_gzip=gzip.compress(body, compresslevel=6),
+    )
+    stale = NosposCatalogueSnapshot.objects.values_list("version", flat=True)[KEEP_SNAPSHOTS:]
+    NosposCatalogueSnapshot.objects.filter(version__in=list(stale)).delete()
+    logger.info(
+        "[NosPos catalogue] v%s: %d categories, %d bytes (%d gzipped)",
+        snapshot.version, len(results), len(body), len(snapshot.payload_gzip),
+    )
+    return snapshot
+
+
+def schedule_catalogue_rebuild() -> None:
+    """
+    Rebuild the snapshot once the current transaction commits. A sync request
+    calls this for every batch it writes; while a rebuild is already queued
+    later calls are dropped, so the transaction rebuilds once. A queued
+    rebuild is only discarded by a rollback that also undoes the caller's
+    writes. Outside a transaction it rebuilds immediately.
+    """
+    connection = transaction.get_connection()
+    if any(func is rebuild_catalogue_snapshot for _sids, func, _robust in connection.run_on_commit):
+        return
+    transaction.on_commit(rebuild_catalogue_snapshot)
+
+
+@dataclass
+class CatalogueSnapshot:
+    """Decoded snapshot kept in process memory."""
+
+    version: int
+    etag: str
+    body_gzip: bytes
+    body: bytes
+    results: list[dict]
+    _subtrees: dict[int, tuple[bytes, bytes] | None] = field(default_factory=dict)
+
+    def subtree(self, root_nospos_id: int) -> tuple[bytes, bytes] | None:
+        """(json, gzip json) for ``root_nospos_id`` and its descendants; None if unknown."""
+        if root_nospos_id in self._subtrees:
+            return self._subtrees[root_nospos_id]
+        children: dict[int | None, list[dict]] = {}
+        by_id: dict[int, dict] = {}
+        for row in self.results:
+            by_id[row["nosposId"]] = row
+            children.setdefault(row["parentNosposId"], []).append(row)
+        encoded = None
+        if root_nospos_id in by_id:
+            keep: set[int] = set()
+            stack = [root_nospos_id]
+            while stack:
+                nid = stack.pop()
+                if nid in keep:
+                    continue
+                keep.add(nid)
+                stack.extend(child["nosposId"] for child in children.get(nid, []))
+            body = _encode([row for row in self.results if row["nosposId"] in keep])
+            encoded = (body, gzip.compress(body, compresslevel=6))
+        if len(self._subtrees) >= SUBTREE_CACHE_SIZE:
+            self._subtrees.clear()
+        self._subtrees[root_nospos_id] = encoded
+        return encoded
+
+
+_cached: CatalogueSnapshot | None = None
+_cache_lock = threading.Lock()
+
+
+def latest_catalogue_etag() -> tuple[int, str] | None:
+    """(version, etag) of the newest snapshot without loading its payload."""
+    row = NosposCatalogueSnapshot.objects.values_list("version", "etag").first()
+    return (row[0], row[1]) if row else None
+
+
+def get_catalogue_snapshot() -> CatalogueSnapshot:
+    """Newest snapshot, decoded once per process per version (built on first use)."""
+    global _cached
+    head = latest_catalogue_etag()
+    cached = _cached
+    if cached is not None and head is not None and cached.version == head[0]:
+        return cached
+
+    with _cache_lock:
+        if _cached is not None and head is not None and _cached.version == head[0]:
+            return _cached
+        row = NosposCatalogueSnapshot.objects.first()
+        if row is None:
+            row = rebuild_catalogue_snapshot()
+            row.refresh_from_db()
+        body_gzip = bytes(row.payload_gzip)
+        body = gzip.decompress(body_gzip)
+        _cached = CatalogueSnapshot(
+            version=row.version,
+            etag=row.etag,
+            body_gzip=body_gzip,
+            body=body,
+            results=json.loads(body)["results"],
+        )
+        return _cached
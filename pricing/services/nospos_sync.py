@@ -0,0 +1,400 @@
+"""
+Set-based upserts for the NosPos mirror tables fed by the browser extension.
+
+A full /stock/category/index export is thousands of rows. Rather than an
+update_or_create plus a parent lookup per row, the existing table is read
+once, parents are resolved in memory from the ``full_name`` paths
+(``A > B > C`` → parent ``A > B``) and the changes are written with
+bulk_create / bulk_update, so the statement count depends on batch size,
+not on the number of categories. Field labels and per-category field links
+from /stock/category/modify are synced the same way, for one category or a
+whole crawl batch at a time. Any write schedules a rebuild of the cached
+catalogue snapshot (services.nospos_catalogue) for after commit.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from pricing.models_v2 import NosposCategory, NosposCategoryField, NosposField
+from pricing.services.nospos_catalogue import schedule_catalogue_rebuild
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+_CATEGORY_VALUE_FIELDS = ("level", "full_name", "status", "buyback_rate", "offer_rate")
+
+
+def parent_path_from_full_name(full_name: str | None) -> str | None:
+    """``"A > B > C"`` → ``"A > B"``; None for a root path."""
+    parts = [p.strip() for p in re.split(r"\s*>\s*", (full_name or "").strip()) if p.strip()]
+    if len(parts) < 2:
+        return None
+    return " > ".join(parts[:-1])
+
+
+@dataclass
+class SyncResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    relinked: int = 0
+    timings_ms: dict[str, float] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "relinked": self.relinked,
+            "timings_ms": self.timings_ms,
+        }
+
+
+class Stopwatch:
+    """Records named lap times (ms) into a SyncResult's ``timings_ms``."""
+
+    def __init__(self, timings: dict[str, float]):
+        self._timings = timings
+        self._started = self._last = time.perf_counter()
+
+    def lap(self, name: str) -> None:
+        now = time.perf_counter()
+        self._timings[name] = round((now - self._last) * 1000, 1)
+        self._last = now
+
+    def stop(self) -> None:
+        self._timings["total"] = round((time.perf_counter() - self._started) * 1000, 1)
+
+
+def sync_nospos_categories(rows: list[dict]) -> SyncResult:
+    """
+    Upsert normalised category rows (``nospos_id``, ``level``, ``full_name``,
+    ``status``, ``buyback_rate``, ``offer_rate``) keyed on nospos_id.
+
+    Parents of the received rows are recomputed from their paths; rows already
+    in the table that are still missing a parent (e.g. a child synced before
+    its parent existed) are re-linked when their parent path now resolves.
+    """
+    result = SyncResult()
+    clock = Stopwatch(result.timings_ms)
+
+    # Later duplicates win, matching the old row-by-row upsert order.
+    incoming: dict[int, dict] = {}
+    for row in sorted(rows, key=lambda r: (r["level"], r["nospos_id"])):
+        incoming[row["nospos_id"]] = row
+
+    with transaction.atomic():
+        existing = {obj.nospos_id: obj for obj in NosposCategory.objects.all()}
+        clock.lap("load")
+
+        # Final state of every category after this sync, keyed on nospos_id.
+        final = dict(existing)
+        now = timezone.now()
+        to_create: list[NosposCategory] = []
+        changed: dict[int, NosposCategory] = {}
+        for nid, row in incoming.items():
+            obj = existing.get(nid)
+            if obj is None:
+                obj = NosposCategory(nospos_id=nid, **{f: row[f] for f in _CATEGORY_VALUE_FIELDS})
+                to_create.append(obj)
+            elif any(getattr(obj, f) != row[f] for f in _CATEGORY_VALUE_FIELDS):
+                for f in _CATEGORY_VALUE_FIELDS:
+                    setattr(obj, f, row[f])
+                changed[nid] = obj
+            final[nid] = obj
+
+        nid_by_path: dict[str, int] = {}
+        for obj in sorted(final.values(), key=lambda o: (o.level, o.full_name, o.nospos_id)):
+            nid_by_path.setdefault(obj.full_name, obj.nospos_id)
+
+        def parent_nid(obj: NosposCategory) -> int | None:
+            if obj.level <= 0:
+                return None
+            path = parent_path_from_full_name(obj.full_name)
+            pnid = nid_by_path.get(path) if path else None
+            return pnid if pnid != obj.nospos_id else None
+
+        # Received rows always take the parent implied by their path; other
+        # rows are only re-linked when they have none.
+        desired_parent: dict[int, int | None] = {}
+        for nid, obj in final.items():
+            if nid in incoming:
+                desired_parent[nid] = parent_nid(obj)
+            elif obj.parent_id is None:
+                pnid = parent_nid(obj)
+                if pnid is not None:
+                    desired_parent[nid] = pnid
+
+        pk_by_nid = {nid: obj.pk for nid, obj in existing.items()}
+        clock.lap("resolve")
+
+        # Insert new rows one level at a time so children can point at parents
+        # created in the previous batch (statements scale with depth, not rows).
+        by_level: dict[int, list[NosposCategory]] = {}
+        for obj in to_create:
+            by_level.setdefault(obj.level, []).append(obj)
+        for level in sorted(by_level):
+            batch = by_level[level]
+            for obj in batch:
+                obj.parent_id = pk_by_nid.get(desired_parent.get(obj.nospos_id))
+            NosposCategory.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+            pk_by_nid.update({obj.nospos_id: obj.pk for obj in batch})
+        created_nids = {obj.nospos_id for obj in to_create}
+
+        # Links still unresolved above (parent path at a deeper level) and
+        # changed / re-linked existing rows.
+        new_parent_links: list[NosposCategory] = []
+        for nid, pnid in desired_parent.items():
+            obj = final[nid]
+            parent_pk = pk_by_nid.get(pnid)
+            if obj.parent_id == parent_pk:
+                continue
+            obj.parent_id = parent_pk
+            if nid in created_nids:
+                new_parent_links.append(obj)
+            else:
+                changed[nid] = obj
+
+        for obj in changed.values():
+            obj.updated_at = now
+        NosposCategory.objects.bulk_update(
+            list(changed.values()),
+            [*_CATEGORY_VALUE_FIELDS, "parent", "updated_at"],
+            batch_size=BATCH_SIZE,
+        )
+        NosposCategory.objects.bulk_update(new_parent_links, ["parent"], batch_size=BATCH_SIZE)
+        if to_create or changed:
+            schedule_catalogue_rebuild()
+        clock.lap("write")
+
+    result.created = len(to_create)
+    result.updated = sum(1 for nid in changed if nid in incoming)
+    result.unchanged = len(incoming) - result.created - result.updated
+    result.relinked = len(changed) - result.updated
+    clock.stop()
+    logger.info(
+        "[NosPos sync] categories: %d received, %d created, %d updated, %d re-linked in %.0fms",
+        len(incoming), result.created, result.updated, result.relinked, result.timings_ms["total"],
+    )
+    return result
+
+
+_LINK_FLAG_FIELDS = ("active", "editable", "sensitive", "required")
+
+_RATE_QUANT = Decimal("0.0001")
+
+
+def _rate_str(value: Decimal | None) -> str | None:
+    # Same text as the stored DecimalField(decimal_places=4) reads back as.
+    return str(Decimal(value).quantize(_RATE_QUANT)) if value is not None else None
+
+
+@dataclass
+class CategoryFieldsPayload:
+    """One category's /stock/category/modify scrape (already normalised)."""
+
+    category_nospos_id: int
+    fields: list[dict]
+    buyback_rate: Decimal | None = None
+    offer_rate: Decimal | None = None
+
+
+@dataclass
+class CategoryFieldsResult:
+    category_nospos_id: int
+    category: NosposCategory | None = None
+    error: str | None = None
+    total_received: int = 0
+    links_for_active_fields: int = 0
+    field_links_created: int = 0
+    field_links_updated: int = 0
+    field_links_removed: int = 0
+
+    def as_dict(self) -> dict:
+        if self.error:
+            return {"ok": False, "categoryNosposId": self.category_nospos_id, "error": self.error}
+        category = self.category
+        return {
+            "ok": True,
+            "categoryNosposId": self.category_nospos_id,
+            "total_received": self.total_received,
+            "links_for_active_fields": self.links_for_active_fields,
+            "field_links_created": self.field_links_created,
+            "field_links_updated": self.field_links_updated,
+            "field_links_removed": self.field_links_removed,
+            "buybackRate": _rate_str(category.buyback_rate),
+            "offerRate": _rate_str(category.offer_rate),
+        }
+
+
+@dataclass
+class FieldUpsertResult:
+    by_nospos_id: dict[int, NosposField] = field(default_factory=dict)
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
+def upsert_nospos_fields(rows: list[dict]) -> FieldUpsertResult:
+    """
+    Upsert ``{"nospos_field_id", "name"}`` rows (later duplicates win) with one
+    SELECT, one bulk_create and one bulk_update. Call inside a transaction.
+    """
+    names: dict[int, str] = {}
+    for row in rows:
+        names[row["nospos_field_id"]] = row["name"]
+    result = FieldUpsertResult()
+    if not names:
+        return result
+
+    existing = {f.nospos_field_id: f for f in NosposField.objects.filter(nospos_field_id__in=names)}
+    now = timezone.now()
+    to_create: list[NosposField] = []
+    to_update: list[NosposField] = []
+    for fid, name in names.items():
+        obj = existing.get(fid)
+        if obj is None:
+            obj = NosposField(nospos_field_id=fid, name=name)
+            to_create.append(obj)
+        elif obj.name != name:
+            obj.name = name
+            obj.updated_at = now
+            to_update.append(obj)
+        result.by_nospos_id[fid] = obj
+
+    NosposField.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+    NosposField.objects.bulk_update(to_update, ["name", "updated_at"], batch_size=BATCH_SIZE)
+    if to_create or to_update:
+        schedule_catalogue_rebuild()
+    result.created = len(to_create)
+    result.updated = len(to_update)
+    result.unchanged = len(names) - result.created - result.updated
+    return result
+
+
+def sync_nospos_category_fields(
+    payloads: list[CategoryFieldsPayload],
+) -> tuple[list[CategoryFieldsResult], FieldUpsertResult, dict[str, float]]:
+    """
+    Apply category field scrapes for many categories in one transaction.
+
+    Per category: optional buy-back / offer rates are stored; when ``fields``
+    is non-empty, every active field gets a NosposCategoryField link with the
+    scraped flags and links to fields no longer active are removed. Fields
+    from all payloads are upserted together, categories / links are read once,
+    and links are written with bulk_create / bulk_update plus a single DELETE.
+    Payloads naming an unknown category come back with ``error`` set.
+
+    Returns (per-payload results, field upsert totals, timings in ms).
+    """
+    timings: dict[str, float] = {}
+    clock = Stopwatch(timings)
+    results = [CategoryFieldsResult(category_nospos_id=p.category_nospos_id) for p in payloads]
+
+    with transaction.atomic():
+        categories = {
+            c.nospos_id: c
+            for c in NosposCategory.objects.filter(
+                nospos_id__in={p.category_nospos_id for p in payloads}
+            )
+        }
+        valid: list[tuple[CategoryFieldsPayload, CategoryFieldsResult]] = []
+        for payload, res in zip(payloads, results):
+            category = categories.get(payload.category_nospos_id)
+            if category is None:
+                res.error = (
+                    f"No NosposCategory with nospos_id={payload.category_nospos_id}. "
+                    "Run \u201cUpdate from NoSpos\u201d on the categories page first."
+                )
+                continue
+            res.category = category
+            res.total_received = len(payload.fields)
+            valid.append((payload, res))
+        clock.lap("load")
+
+        # Rates apply in payload order; links come from the last payload per
+        # category that carried fields, as sequential single-category calls would.
+        now = timezone.now()
+        rated: dict[int, NosposCategory] = {}
+        with_fields: dict[int, tuple[CategoryFieldsPayload, CategoryFieldsResult]] = {}
+        for payload, res in valid:
+            category = res.category
+            if payload.buyback_rate is not None and category.buyback_rate != payload.buyback_rate:
+                category.buyback_rate = payload.buyback_rate
+                rated[category.pk] = category
+            if payload.offer_rate is not None and category.offer_rate != payload.offer_rate:
+                category.offer_rate = payload.offer_rate
+                rated[category.pk] = category
+            if payload.fields:
+                with_fields[category.pk] = (payload, res)
+        for category in rated.values():
+            category.updated_at = now
+        NosposCategory.objects.bulk_update(
+            list(rated.values()), ["buyback_rate", "offer_rate", "updated_at"], batch_size=BATCH_SIZE
+        )
+
+        fields = upsert_nospos_fields([row for p, _r in valid for row in p.fields])
+        clock.lap("fields")
+
+        existing_links: dict[tuple[int, int], NosposCategoryField] = {
+            (link.category_id, link.field_id): link
+            for link in NosposCategoryField.objects.filter(category_id__in=list(with_fields))
+        }
+        to_create: list[NosposCategoryField] = []
+        to_update: list[NosposCategoryField] = []
+        keep: set[tuple[int, int]] = set()
+        for category_pk, (payload, res) in with_fields.items():
+            # Flags come from the last active row for a field.
+            active_rows = {row["nospos_field_id"]: row for row in payload.fields if row["active"]}
+            res.links_for_active_fields = len(active_rows)
+            for fid, row in active_rows.items():
+                field_obj = fields.by_nospos_id[fid]
+                key = (category_pk, field_obj.pk)
+                keep.add(key)
+                wanted = {
+                    "active": True,
+                    "editable": row["editable"],
+                    "sensitive": row["sensitive"],
+                    "required": row["required"],
+                }
+                link = existing_links.get(key)
+                if link is None:
+                    to_create.append(NosposCategoryField(category=res.category, field=field_obj, **wanted))
+                    res.field_links_created += 1
+                    continue
+                res.field_links_updated += 1
+                if any(getattr(link, k) != v for k, v in wanted.items()):
+                    for k, v in wanted.items():
+                        setattr(link, k, v)
+                    link.updated_at = now
+                    to_update.append(link)
+
+        stale = [link for key, link in existing_links.items() if key not in keep]
+        for link in stale:
+            with_fields[link.category_id][1].field_links_removed += 1
+
+        NosposCategoryField.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        NosposCategoryField.objects.bulk_update(
+            to_update, [*_LINK_FLAG_FIELDS, "updated_at"], batch_size=BATCH_SIZE
+        )
+        if stale:
+            NosposCategoryField.objects.filter(pk__in=[link.pk for link in stale]).delete()
+        if rated or to_create or to_update or stale:
+            schedule_catalogue_rebuild()
+        clock.lap("links")
+
+    clock.stop()
+    logger.info(
+        "[NosPos sync] category fields: %d categories, %d fields (%d new), %d links created, %d removed in %.0fms",
+        len(valid), len(fields.by_nospos_id), fields.created,
+        len(to_create), len(stale), timings["total"],
+    )
+    return results, fields, timings
@@ -0,0 +1,187 @@
+"""
+Persistent cache in front of the Ideal Postcodes lookup API.
+
+Ideal Postcodes charges per lookup, and staff look up the same customers'
+postcodes again and again. Answers are stored in PostcodeLookupCache under
+the normalised postcode (upper-case, spaces removed), so "sw1a 2aa" and
+"SW1A2AA" share one entry. Found postcodes are kept for
+ADDRESS_LOOKUP_CACHE_TTL_SECONDS. A 404 is cached too, for the shorter
+ADDRESS_LOOKUP_NEGATIVE_TTL_SECONDS, so typos are not paid for twice. Key,
+quota and network errors are never cached. Upstream calls share one pooled
+session. Cache read/write failures are logged and treated as a miss so the
+lookup still works. Postcodes that do not normalise to 4-8 letters and digits
+are rejected before the cache or the API is touched, and the postcode is
+percent-encoded into the URL path either way.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from datetime import timedelta
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from pricing.models_v2 import PostcodeLookupCache
+from pricing.services.marketplace_http import MarketplaceClient
+
+logger = logging.getLogger(__name__)
+
+IDEAL_POSTCODES_URL = "https://api.ideal-postcodes.co.uk/v1/postcodes/{postcode}"
+DEFAULT_TTL_SECONDS = 90 * 24 * 3600
+DEFAULT_NEGATIVE_TTL_SECONDS = 24 * 3600
+_POSTCODE_RE = re.compile(r"[A-Z0-9]{4,8}")
+
+ideal_postcodes_client = MarketplaceClient("Ideal Postcodes", {"Accept": "application/json"})
+
+_counters = {"hits": 0, "negativeHits": 0, "misses": 0, "stores": 0, "errors": 0}
+_counters_lock = threading.Lock()
+
+
+class PostcodeLookupError(Exception):
+    """Upstream lookup failed; ``status_code`` is the HTTP status to return to the client."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _bump(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def _ttl_seconds(negative: bool) -> int:
+    if negative:
+        return max(0, int(getattr(settings, "ADDRESS_LOOKUP_NEGATIVE_TTL_SECONDS", DEFAULT_NEGATIVE_TTL_SECONDS)))
+    return max(0, int(getattr(settings, "ADDRESS_LOOKUP_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)))
+
+
+def normalise_postcode(postcode: str) -> str:
+    return "".join((postcode or "").split()).upper()
+
+
+def _cached(postcode: str):
+    now = timezone.now()
+    try:
+        row = (
+            PostcodeLookupCache.objects.filter(postcode=postcode, expires_at__gt=now)
+            .values_list("pk", "found", "addresses")
+            .first()
+        )
+        if row is not None:
+            PostcodeLookupCache.objects.filter(pk=row[0]).update(hit_count=F("hit_count") + 1, last_used_at=now)
+        return row
+    except Exception as exc:  # noqa: BLE001
+        _bump("errors")
+        logger.warning("[Postcode cache] Lookup failed (%s: %s)", type(exc).__name__, exc)
+        return None
+
+
+def _store(postcode: str, found: bool, addresses: list) -> None:
+    ttl = _ttl_seconds(negative=not found)
+    if ttl <= 0:
+        return
+    now = timezone.now()
+    try:
+        PostcodeLookupCache.objects.filter(expires_at__lte=now).delete()
+        PostcodeLookupCache.objects.update_or_create(
+            postcode=postcode,
+            defaults={
+                "found": found,
+                "addresses": addresses,
+                "hit_count": 0,
+                "fetched_at": now,
+                "last_used_at": now,
+                "expires_at": now + timedelta(seconds=ttl),
+            },
+        )
+        _bump("stores")
+    except Exception as exc:  # noqa: BLE001
+        _bump("errors")
+        logger.warning("[Postcode cache] Store failed (%s: %s)", type(exc).__name__, exc)
+
+
+def _fetch(postcode: str, api_key: str) -> tuple[bool, list]:
+    """(found, addresses) from Ideal Postcodes; raises PostcodeLookupError for anything not cacheable."""
+    try:
+        resp = ideal_postcodes_client.get(
+            IDEAL_POSTCODES_URL.format(postcode=quote(postcode, safe="")), params={"api_key": api_key}, timeout=10,
+        )
+        if resp.status_code == 401:
+            logger.warning("Ideal Postcodes 401: invalid API key")
+            raise PostcodeLookupError(
+                "Invalid Ideal Postcodes API key. Check your key at https://ideal-postcodes.co.uk/", 401,
+            )
+        if resp.status_code == 402:
+            logger.warning("Ideal Postcodes 402: no lookups remaining")
+            raise PostcodeLookupError(
+                "Address lookup limit reached. Top up at https://ideal-postcodes.co.uk/", 402,
+            )
+        if resp.status_code == 404:
+            return False, []
+        resp.raise_for_status()
+        result = resp.json().get("result", [])
+    except requests.RequestException as exc:
+        logger.warning("Ideal Postcodes postcode lookup failed: %s", exc)
+        raise PostcodeLookupError("Address lookup failed", 502) from exc
+    except ValueError as exc:
+        logger.warning("Ideal Postcodes returned invalid JSON: %s", exc)
+        raise PostcodeLookupError("Address lookup failed", 502) from exc
+    if not isinstance(result, list):
+        result = [result] if result else []
+    return True, result
+
+
+def lookup_addresses(postcode: str, api_key: str) -> tuple[list, str]:
+    """
+    Addresses for ``postcode`` and where they came from: "hit", "negative_hit"
+    (cached 404), "miss" or "invalid" (not 4-8 letters and digits). Raises
+    PostcodeLookupError when the API rejects the key, is out of credit or
+    cannot be reached.
+    """
+    normalised = normalise_postcode(postcode)
+    if not _POSTCODE_RE.fullmatch(normalised):
+        return [], "invalid"
+
+    row = _cached(normalised)
+    if row is not None:
+        _, found, addresses = row
+        _bump("hits" if found else "negativeHits")
+        return (addresses or []) if found else [], "hit" if found else "negative_hit"
+
+    _bump("misses")
+    found, addresses = _fetch(normalised, api_key)
+    _store(normalised, found, addresses)
+    return addresses, "miss"
+
+
+def clear_cache() -> int:
+    deleted, _ = PostcodeLookupCache.objects.all().delete()
+    return deleted
+
+
+def cache_stats() -> dict:
+    """Process-local hit/miss counters plus table totals."""
+    with _counters_lock:
+        counters = dict(_counters)
+    hits = counters["hits"] + counters["negativeHits"]
+    lookups = hits + counters["misses"]
+    now = timezone.now()
+    live = PostcodeLookupCache.objects.filter(expires_at__gt=now)
+    agg = PostcodeLookupCache.objects.aggregate(stored_hits=Sum("hit_count"))
+    return {
+        "ttlSeconds": _ttl_seconds(negative=False),
+        "negativeTtlSeconds": _ttl_seconds(negative=True),
+        "entries": live.filter(found=True).count(),
+        "negativeEntries": live.filter(found=False).count(),
+        "storedHits": agg["stored_hits"] or 0,
+        "process": {
+            **counters,
+            "hitRate": round(hits / lookups, 4) if lookups else None,
+        },
+    }
@@ -0,0 +1,116 @@
+"""
+Post-import CeX price movement detection ("movers").
+
+import_cex_data collects one (variant, previous price, new price) triple for
+every existing variant whose sell price changed in the run. Once the run has
+finished, those triples are ranked per category and the largest % drops and
+rises are written to VariantPriceMovement so repricing staff can prioritise
+stock whose reference price moved.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import transaction
+
+from pricing.models_v2 import VariantPriceMovement
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_ABS_PCT = Decimal("5")
+DEFAULT_TOP_PER_CATEGORY = 50
+
+_PCT_QUANT = Decimal("0.01")
+
+
+@dataclass
+class PriceChange:
+    """One observed sell-price change for an existing variant."""
+
+    variant_id: int
+    category_id: int
+    previous_price_gbp: Decimal
+    new_price_gbp: Decimal
+
+
+def rank_price_movements(
+    changes: list[PriceChange],
+    *,
+    min_abs_pct: Decimal = DEFAULT_MIN_ABS_PCT,
+    top_per_category: int = DEFAULT_TOP_PER_CATEGORY,
+) -> list[dict]:
+    """
+    Compute deltas over the changed set and keep, per category, the
+    ``top_per_category`` largest drops and largest rises whose absolute %
+    change is at least ``min_abs_pct``. Returns plain dict rows.
+    """
+    # Later batches win if a SKU appears more than once in the import file.
+    latest: dict[int, PriceChange] = {}
+    for ch in changes:
+        prev = latest.get(ch.variant_id)
+        latest[ch.variant_id] = (
+            PriceChange(ch.variant_id, ch.category_id, prev.previous_price_gbp, ch.new_price_gbp)
+            if prev is not None
+            else ch
+        )
+
+    drops: dict[int, list[dict]] = defaultdict(list)
+    rises: dict[int, list[dict]] = defaultdict(list)
+    for ch in latest.values():
+        if not ch.previous_price_gbp or ch.previous_price_gbp <= 0:
+            continue
+        delta = ch.new_price_gbp - ch.previous_price_gbp
+        if delta == 0:
+            continue
+        pct = (delta * 100 / ch.previous_price_gbp).quantize(_PCT_QUANT)
+        if abs(pct) < min_abs_pct:
+            continue
+        row = {
+            "variant_id": ch.variant_id,
+            "category_id": ch.category_id,
+            "previous_price_gbp": ch.previous_price_gbp,
+            "new_price_gbp": ch.new_price_gbp,
+            "delta_gbp": delta,
+            "delta_pct": pct,
+        }
+        (drops if delta < 0 else rises)[ch.category_id].append(row)
+
+    ranked: list[dict] = []
+    for rows in drops.values():
+        rows.sort(key=lambda r: r["delta_pct"])
+        ranked.extend(rows[:top_per_category])
+    for rows in rises.values():
+        rows.sort(key=lambda r: r["delta_pct"], reverse=True)
+        ranked.extend(rows[:top_per_category])
+    return ranked
+
+
+def record_price_movements(
+    changes: list[PriceChange],
+    import_run_at,
+    *,
+    min_abs_pct: Decimal = DEFAULT_MIN_ABS_PCT,
+    top_per_category: int = DEFAULT_TOP_PER_CATEGORY,
+) -> int:
+    """Rank ``changes`` and store the movers for this run. Returns rows written."""
+    ranked = rank_price_movements(
+        changes,
+        min_abs_pct=min_abs_pct,
+        top_per_category=top_per_category,
+    )
+    if not ranked:
+        return 0
+    with transaction.atomic():
+        VariantPriceMovement.objects.filter(import_run_at=import_run_at).delete()
+        VariantPriceMovement.objects.bulk_create(
+            [VariantPriceMovement(import_run_at=import_run_at, **row) for row in ranked],
+            batch_size=1000,
+        )
+    logger.info(
+        "[Price movers] %d mover(s) from %d change(s) for run %s",
+        len(ranked), len(changes), import_run_at,
+    )
+    return len(ranked)
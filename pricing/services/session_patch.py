@@ -0,0 +1,294 @@
+"""
+JSON-patch (RFC 6902) autosave for repricing / upload session_data.
+
+Autosaves send the operations that turn version N of session_data into
+version N + 1 instead of the whole blob. Each accepted patch is stored as a
+small SessionDataPatch row and the session's version counter is bumped; the
+full session_data column is only rewritten every SESSION_DATA_SNAPSHOT_EVERY
+versions (or when the session completes), at which point the folded patch
+rows are deleted. Readers call materialize_session_data() to get the current
+document. A patch naming any version other than the current one is rejected
+with SessionDataConflict so a stale tab cannot silently overwrite newer work.
+"""
+from __future__ import annotations
+
+import copy
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from pricing.models_v2 import RepricingSession, SessionDataPatch, UploadSession
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_EVERY = 50
+
+_MISSING = object()
+
+
+class JsonPatchError(ValueError):
+    """The patch document is malformed or cannot be applied to the target."""
+
+
+class SessionDataConflict(Exception):
+    """The client edited a session_data version that is no longer current."""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"session_data is at version {current_version}")
+        self.current_version = current_version
+
+
+# ─── RFC 6902 ────────────────────────────────────────────────────────────────
+
+def _parse_pointer(pointer) -> list[str]:
+    if not isinstance(pointer, str):
+        raise JsonPatchError("JSON pointer must be a string")
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"JSON pointer must start with '/': {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _list_index(container: list, token: str, *, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index {token!r}")
+    index = int(token)
+    upper = len(container) if allow_end else len(container) - 1
+    if index > upper:
+        raise JsonPatchError(f"Array index {index} out of range")
+    return index
+
+
+def _resolve_parent(doc, tokens: list[str]):
+    """Walk to the container holding the last token. Returns (container, last token)."""
+    node = doc
+    for token in tokens[:-1]:
+        if isinstance(node, dict):
+            if token not in node:
+                raise JsonPatchError(f"Path segment {token!r} not found")
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_list_index(node, token, allow_end=False)]
+        else:
+            raise JsonPatchError(f"Cannot traverse into a scalar at {token!r}")
+    return node, tokens[-1]
+
+
+def _get(doc, tokens: list[str]):
+    if not tokens:
+        return doc
+    parent, last = _resolve_parent(doc, tokens)
+    if isinstance(parent, dict):
+        if last not in parent:
+            raise JsonPatchError(f"Path {'/' + '/'.join(tokens)!r} not found")
+        return parent[last]
+    if isinstance(parent, list):
+        return parent[_list_index(parent, last, allow_end=False)]
+    raise JsonPatchError("Cannot read a member of a scalar")
+
+
+def _add(doc, tokens: list[str], value):
+    if not tokens:
+        return value
+    parent, last = _resolve_parent(doc, tokens)
+    if isinstance(parent, dict):
+        parent[last] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, last, allow_end=True), value)
+    else:
+        raise JsonPatchError("Cannot add a member to a scalar")
+    return doc
+
+
+def _remove(doc, tokens: list[str]):
+    if not tokens:
+        raise JsonPatchError("Cannot remove the document root")
+    parent, last = _resolve_parent(doc, tokens)
+    if isinstance(parent, dict):
+        if last not in parent:
+            raise JsonPatchError(f"Path {'/' + '/'.join(tokens)!r} not found")
+        return parent.pop(last)
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, last, allow_end=False))
+    raise JsonPatchError("Cannot remove a member of a scalar")
+
+
+def apply_json_patch(doc, operations, *, in_place: bool = False):
+    """
+    Apply RFC 6902 ``operations`` to ``doc`` and return the result.
+
+    The input is deep-copied first unless ``in_place``, so a failing patch
+    leaves the caller's document untouched. Raises JsonPatchError.
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError("Patch must be a list of operations")
+    if not in_place:
+        doc = copy.deepcopy(doc)
+
+    for op in operations:
+        if not isinstance(op, dict):
+            raise JsonPatchError("Each patch operation must be an object")
+        kind = op.get("op")
+        tokens = _parse_pointer(op.get("path"))
+        value = op.get("value", _MISSING)
+
+        if kind in ("add", "replace", "test") and value is _MISSING:
+            raise JsonPatchError(f"'{kind}' operation requires a value")
+
+        if kind == "add":
+            doc = _add(doc, tokens, value)
+        elif kind == "remove":
+            _remove(doc, tokens)
+        elif kind == "replace":
+            if tokens:
+                _get(doc, tokens)
+                _remove(doc, tokens)
+            doc = _add(doc, tokens, value)
+        elif kind in ("move", "copy"):
+            from_tokens = _parse_pointer(op.get("from"))
+            if kind == "move":
+                if tokens[:len(from_tokens)] == from_tokens and tokens != from_tokens:
+                    raise JsonPatchError("Cannot move a value into one of its own children")
+                moved = _remove(doc, from_tokens) if from_tokens else doc
+            else:
+                moved = copy.deepcopy(_get(doc, from_tokens))
+            doc = _add(doc, tokens, moved)
+        elif kind == "test":
+            if _get(doc, tokens) != value:
+                raise JsonPatchError(f"Test failed at {op.get('path')!r}")
+        else:
+            raise JsonPatchError(f"Unsupported patch op {kind!r}")
+    return doc
+
+
+# ─── Session storage ─────────────────────────────────────────────────────────
+
+def _parent_filter(session) -> dict:
+    if isinstance(session, RepricingSession):
+        return {"repricing_session_id": session.pk}
+    if isinstance(session, UploadSession):
+        return {"upload_session_id": session.pk}
+    raise TypeError(f"Unsupported session type {type(session).__name__}")
+
+
+def _snapshot_every() -> int:
+    return max(1, int(getattr(settings, "SESSION_DATA_SNAPSHOT_EVERY", DEFAULT_SNAPSHOT_EVERY)))
+
+
+def materialize_session_data(session):
+    """Current session_data: the stored snapshot with any newer patch rows applied."""
+    if session.session_data_version <= session.session_data_snapshot_version:
+        return session.session_data
+    patches = (
+        SessionDataPatch.objects
+        .filter(
+            **_parent_filter(session),
+            version__gt=session.session_data_snapshot_version,
+            version__lte=session.session_data_version,
+        )
+        .order_by("version")
+        .values_list("operations", flat=True)
+    )
+    doc = copy.deepcopy(session.session_data)
+    for operations in patches:
+        doc = apply_json_patch(doc, operations, in_place=True)
+    return doc
+
+
+def _store_snapshot(session, doc, version: int) -> None:
+    """Write ``doc`` as the full snapshot at ``version`` and drop the folded patches."""
+    type(session).objects.filter(pk=session.pk).update(
+        session_data=doc,
+        session_data_version=version,
+        session_data_snapshot_version=version,
+        updated_at=timezone.now(),
+    )
+    SessionDataPatch.objects.filter(**_parent_filter(session), version__lte=version).delete()
+
+
+def _sync_in_memory(session, doc, version: int) -> None:
+    # session_data now holds the document at ``version``; keep the snapshot marker
+    # in step so materialize_session_data() does not replay patches twice.
+    session.session_data = doc
+    session.session_data_version = version
+    session.session_data_snapshot_version = version
+
+
+def _lock_current(session):
+    return (
+        type(session).objects
+        .select_for_update()
+        .only("pk", "session_data", "session_data_version", "session_data_snapshot_version")
+        .get(pk=session.pk)
+    )
+
+
+def apply_session_data_patch(session, base_version: int, operations) -> int:
+    """
+    Apply a JSON-patch autosave made against ``base_version`` and persist it.
+    Returns the new version. Raises SessionDataConflict or JsonPatchError.
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError("session_data_patch must be a list of operations")
+
+    with transaction.atomic():
+        current = _lock_current(session)
+        if current.session_data_version != base_version:
+            raise SessionDataConflict(current.session_data_version)
+
+        doc = apply_json_patch(materialize_session_data(current), operations)
+        new_version = base_version + 1
+
+        if new_version - current.session_data_snapshot_version >= _snapshot_every():
+            _store_snapshot(session, doc, new_version)
+        else:
+            SessionDataPatch.objects.create(
+                **_parent_filter(session),
+                version=new_version,
+                operations=operations,
+            )
+            type(session).objects.filter(pk=session.pk).update(
+                session_data_version=new_version,
+                updated_at=timezone.now(),
+            )
+
+    _sync_in_memory(session, doc, new_version)
+    return new_version
+
+
+def replace_session_data(session, doc, base_version: int | None = None) -> int:
+    """
+    Store ``doc`` as a full snapshot (legacy whole-blob autosave). When
+    ``base_version`` is given it must match the current version.
+    """
+    with transaction.atomic():
+        current = _lock_current(session)
+        if base_version is not None and current.session_data_version != base_version:
+            raise SessionDataConflict(current.session_data_version)
+        new_version = current.session_data_version + 1
+        _store_snapshot(session, doc, new_version)
+
+    _sync_in_memory(session, doc, new_version)
+    return new_version
+
+
+def compact_session_data(session) -> None:
+    """
+    Fold any pending patch rows into session_data (e.g. when a session completes).
+
+    Decided on the locked row, not ``session``: after apply_session_data_patch
+    the in-memory snapshot marker already matches the version even though the
+    stored snapshot is older.
+    """
+    with transaction.atomic():
+        current = _lock_current(session)
+        if current.session_data_version <= current.session_data_snapshot_version:
+            return
+        doc = materialize_session_data(current)
+        _store_snapshot(session, doc, current.session_data_version)
+    _sync_in_memory(session, doc, current.session_data_version)
@@ -0,0 +1,112 @@
+"""
+Set-based upsert for the Web EPOS category mirror fed by the browser extension.
+
+The extension re-posts the whole Web EPOS category tree (hundreds of nodes)
+on every walk. Instead of a lookup + save per node and then an UPDATE per
+child to wire parents, the table is read once and diffed in memory. New
+nodes go in with one bulk_create. Name / level / parent changes go out with
+bulk_update. The statement count therefore depends on batch size rather
+than tree size, and a re-scrape with nothing changed only does the read.
+"""
+from __future__ import annotations
+
+import logging
+
+from django.db import transaction
+
+from pricing.models_v2 import WebEposCategory
+from pricing.services.nospos_sync import BATCH_SIZE, SyncResult, Stopwatch
+
+logger = logging.getLogger(__name__)
+
+
+def sync_webepos_categories(nodes: list[dict]) -> SyncResult:
+    """
+    Upsert normalised nodes (``webepos_uuid``, ``name``, ``level``,
+    ``parent_webepos_uuid``) keyed on webepos_uuid.
+
+    Parents are resolved after every node exists, so input order does not
+    matter. A node naming a parent that is not in the table ends up as a
+    root. A node without ``parent_webepos_uuid`` keeps its current parent.
+    ``updated`` counts name / level changes; ``relinked`` counts parent
+    changes on existing rows.
+    """
+    result = SyncResult()
+    clock = Stopwatch(result.timings_ms)
+
+    # Later duplicates win, matching the old row-by-row upsert order.
+    incoming: dict[str, dict] = {}
+    for node in nodes:
+        incoming[node["webepos_uuid"]] = node
+
+    with transaction.atomic():
+        existing = {obj.webepos_uuid: obj for obj in WebEposCategory.objects.all()}
+        clock.lap("load")
+
+        final = dict(existing)
+        to_create: list[WebEposCategory] = []
+        changed_fields: dict[str, set[str]] = {}
+        for uuid, node in incoming.items():
+            obj = existing.get(uuid)
+            if obj is None:
+                obj = WebEposCategory(
+                    webepos_uuid=uuid, name=node["name"], level=node["level"], parent_category=None,
+                )
+                to_create.append(obj)
+                final[uuid] = obj
+                continue
+            for f in ("name", "level"):
+                if getattr(obj, f) != node[f]:
+                    setattr(obj, f, node[f])
+                    changed_fields.setdefault(uuid, set()).add(f)
+        updated = len(changed_fields)
+        clock.lap("diff")
+
+        def parent_pk(uuid: str):
+            parent = final.get(incoming[uuid].get("parent_webepos_uuid"))
+            return parent.pk if parent is not None else None
+
+        # Insert new rows one level at a time so children can point at parents
+        # created in the previous batch; anything still unresolved (parent at
+        # the same or a deeper level) is linked afterwards.
+        by_level: dict[int, list[WebEposCategory]] = {}
+        for obj in to_create:
+            by_level.setdefault(obj.level, []).append(obj)
+        for level in sorted(by_level):
+            batch = by_level[level]
+            for obj in batch:
+                if incoming[obj.webepos_uuid].get("parent_webepos_uuid"):
+                    obj.parent_category_id = parent_pk(obj.webepos_uuid)
+            WebEposCategory.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+        created = {obj.webepos_uuid for obj in to_create}
+
+        relinked = 0
+        for uuid, node in incoming.items():
+            if not node.get("parent_webepos_uuid"):
+                continue
+            obj = final[uuid]
+            pk = parent_pk(uuid)
+            if obj.parent_category_id == pk:
+                continue
+            obj.parent_category_id = pk
+            changed_fields.setdefault(uuid, set()).add("parent_category")
+            relinked += uuid not in created
+
+        # bulk_update builds a CASE per field, so only send the fields each row changed.
+        groups: dict[tuple[str, ...], list[WebEposCategory]] = {}
+        for uuid, fields in changed_fields.items():
+            groups.setdefault(tuple(sorted(fields)), []).append(final[uuid])
+        for fields, objs in groups.items():
+            WebEposCategory.objects.bulk_update(objs, list(fields), batch_size=BATCH_SIZE)
+        clock.lap("write")
+
+    result.created = len(to_create)
+    result.updated = updated
+    result.relinked = relinked
+    result.unchanged = len(incoming) - result.created - len(set(changed_fields) - created)
+    clock.stop()
+    logger.info(
+        "[Web EPOS sync] categories: %d received, %d created, %d updated, %d re-linked in %.0fms",
+        len(incoming), result.created, result.updated, result.relinked, result.timings_ms["total"],
+    )
+    return result
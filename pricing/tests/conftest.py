@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+import pytest
+from django.apps import apps
+from django.db import connection
+
+
+@pytest.fixture(scope="session")
+def django_db_setup(django_db_setup, django_db_blocker):
+    """
+    Test databases are built without migrations (see pytest.ini), and syncdb
+    skips pricing because its models live in models_v2 rather than a models
+    module, so create the pricing tables here.
+    """
+    with django_db_blocker.unblock():
+        existing = set(connection.introspection.table_names())
+        with connection.schema_editor() as editor:
+            for model in apps.get_app_config("pricing").get_models():
+                if model._meta.db_table not in existing:
+                    editor.create_model(model)
+
+
+@pytest.fixture
+def make_variant(db):
+    """Create a Variant (and its product / category / grade) with CeX prices."""
+    from pricing.models_v2 import ConditionGrade, Product, ProductCategory, Variant
+
+    def make(cex_sku, price="100.00", title=None, category=None, **fields):
+        category = category or ProductCategory.objects.get_or_create(name="Phones")[0]
+        grade = ConditionGrade.objects.get_or_create(code="BOXED")[0]
+        product = Product.objects.create(category=category, name=title or cex_sku)
+        return Variant.objects.create(
+            product=product,
+            condition_grade=grade,
+            cex_sku=cex_sku,
+            current_price_gbp=Decimal(price),
+            tradein_cash=Decimal(price) / 2,
+            tradein_voucher=Decimal(price) * Decimal("0.6"),
+            variant_signature=cex_sku,
+            title=title or cex_sku,
+            **fields,
+        )
+
+    return make
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from pricing.services import ai_category
+from pricing.services.llm_router import LlmRouter, fake_provider
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def use_provider():
+    def install(reply):
+        ai_category.set_router(LlmRouter([fake_provider("groq", reply)]))
+
+    yield install
+    ai_category.set_router(None)
+
+
+def test_short_search_titles_still_go_through_the_prompt(use_provider):
+    prompts = []
+
+    def reply(system, user):
+        prompts.append(user)
+        return json.dumps({"searchTerm": "iPhone 13", "reasoning": "dropped condition words"})
+
+    use_provider(reply)
+    result = ai_category.suggest_marketplace_research_search_term("Brand New Sealed iPhone 13", None, {})
+
+    assert result.search_term == "iPhone 13"
+    assert result.provider == "groq"
+    assert "Brand New Sealed iPhone 13" in prompts[0]
+
+
+def _line(key, line_id, category_id=7, name="iPhone 13"):
+    return ai_category.FieldBatchItem(
+        key=key,
+        item_name=name,
+        db_category="Phones",
+        attributes={},
+        fields=[
+            {"name": f"DraftAgreementItem[{line_id}][grade]", "label": "Grade", "control": "select"},
+            {"name": f"DraftAgreementItem[{line_id}][imei]", "label": "IMEI", "control": "text"},
+        ],
+        category_id=category_id,
+    )
+
+
+def _chunk(items):
+    return ai_category._chunk_field_group(ai_category._group_fields(items), items)
+
+
+def test_chunks_respect_the_item_cap_and_token_budget(monkeypatch):
+    items = [_line(f"l{i}", i) for i in range(7)]
+    monkeypatch.setattr(ai_category, "FIELD_BATCH_MAX_ITEMS_PER_PROMPT", 3)
+    assert [[i.key for i in c] for c in _chunk(items)] == [["l0", "l1", "l2"], ["l3", "l4", "l5"], ["l6"]]
+
+    # Over budget, every line still gets a prompt of its own.
+    monkeypatch.setattr(ai_category, "FIELD_BATCH_PROMPT_TOKEN_BUDGET", 1)
+    assert [len(c) for c in _chunk(items[:3])] == [1, 1, 1]
+
+
+def test_batch_maps_answers_back_to_each_lines_own_field_names(use_provider):
+    prompts = []
+
+    def reply(system, user):
+        prompts.append(user)
+        return json.dumps({"items": {
+            "item1": {"grade": "A", "imei": "123"},
+            "item2": {"Grade": "B"},
+        }})
+
+    use_provider(reply)
+    no_fields = _line("none", 13)
+    no_fields.fields = []
+    results = ai_category.suggest_field_values_batch([_line("first", 11), no_fields, _line("second", 12)])
+
+    assert len(prompts) == 1
+    assert [(r.key, r.fields, r.error) for r in results] == [
+        ("first", {"DraftAgreementItem[11][grade]": "A", "DraftAgreementItem[11][imei]": "123"}, None),
+        ("none", {}, None),
+        ("second", {"DraftAgreementItem[12][grade]": "B"}, None),
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_chunk_marks_only_its_own_lines(use_provider):
+    def reply(system, user):
+        if "Broken Console" in user:
+            raise RuntimeError("provider down")
+        return json.dumps({"items": {"item1": {"grade": "A"}, "item2": {"grade": "C"}}})
+
+    use_provider(reply)
+    results = ai_category.suggest_field_values_batch([
+        _line("phone1", 1, category_id=7),
+        _line("console1", 2, category_id=8, name="Broken Console"),
+        _line("phone2", 3, category_id=7),
+        _line("console2", 4, category_id=8, name="Broken Console"),
+    ])
+
+    assert [r.key for r in results] == ["phone1", "console1", "phone2", "console2"]
+    by_key = {r.key: r for r in results}
+    assert by_key["phone1"].fields == {"DraftAgreementItem[1][grade]": "A"}
+    assert by_key["phone2"].fields == {"DraftAgreementItem[3][grade]": "C"}
+    for key in ("console1", "console2"):
+        assert by_key[key].fields == {}
+        assert by_key[key].error
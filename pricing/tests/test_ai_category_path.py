@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import pytest
+
+from pricing.services import ai_category_path
+from pricing.services.ai_category import CategorySuggestion
+
+TREE = [
+    "Phones",
+    "Phones > Apple",
+    "Phones > Apple > iPhone 13",
+    "Phones > Apple > iPhone 12",
+    "Phones > Apple > Cases",
+    "Phones > Samsung",
+    "Phones > Samsung > Galaxy S23",
+    "Consoles",
+    "Consoles > Sony",
+    "Consoles > Sony > PlayStation 5",
+]
+
+
+def _rows(full_names):
+    ids = {name: i + 1 for i, name in enumerate(full_names)}
+    return [
+        {"nosposId": ids[name], "fullName": name, "parentNosposId": ids.get(name.rpartition(" > ")[0])}
+        for name in full_names
+    ]
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Serve TREE without the DB and record what the model is offered."""
+    calls = {"full_path": [], "level": []}
+    answers = {"full_path": None, "level": {}}
+    monkeypatch.setattr(
+        ai_category_path, "get_catalogue_snapshot", lambda: SimpleNamespace(results=_rows(TREE))
+    )
+    monkeypatch.setattr(ai_category_path, "confident_match", lambda *args: None)
+
+    def full_path(item_name, db_category, attributes, candidate_paths):
+        calls["full_path"].append(candidate_paths)
+        return answers["full_path"]
+
+    def level(item_name, db_category, attributes, level_index, available_options, previous_path):
+        calls["level"].append(available_options)
+        return CategorySuggestion(answers["level"][level_index], "high", "walked")
+
+    monkeypatch.setattr(ai_category_path, "suggest_category_full_path", full_path)
+    monkeypatch.setattr(ai_category_path, "suggest_category", level)
+    return SimpleNamespace(calls=calls, answers=answers)
+
+
+def test_only_the_best_scoring_leaves_are_offered(monkeypatch, model):
+    monkeypatch.setattr(ai_category_path, "FULL_PATH_CANDIDATES", 2)
+    model.answers["full_path"] = CategorySuggestion("Phones › Apple › iPhone 13", "medium", "model")
+
+    result = ai_category_path.suggest_category_path("Apple iPhone 13 128GB", None, {})
+
+    assert model.calls["full_path"] == [["Phones > Apple > iPhone 13", "Phones > Apple > iPhone 12"]]
+    assert (result.full_name, result.mode, result.llm_calls) == ("Phones > Apple > iPhone 13", "full_path", 1)
+
+
+def test_leaves_sharing_no_token_are_never_candidates(model):
+    model.answers["full_path"] = CategorySuggestion("Consoles > Sony > PlayStation 5", "high", "model")
+
+    ai_category_path.suggest_category_path("Sony PlayStation 5 disc", None, {})
+
+    assert model.calls["full_path"] == [["Consoles > Sony > PlayStation 5"]]
+
+
+def test_low_confidence_pick_from_a_pruned_list_walks_the_levels(model):
+    model.answers["full_path"] = CategorySuggestion("Phones > Apple > iPhone 12", "low", "unsure")
+    model.answers["level"] = {0: "Phones", 1: "Apple", 2: "iPhone 13"}
+
+    result = ai_category_path.suggest_category_path("Apple iPhone", None, {})
+
+    assert result.mode == "per_level"
+    assert result.path == ["Phones", "Apple", "iPhone 13"]
+    assert result.llm_calls == 4
+    assert model.calls["level"][0] == ["Consoles", "Phones"]
+
+
+def test_walk_cuts_each_level_to_the_best_scoring_children(monkeypatch, model):
+    monkeypatch.setattr(ai_category_path, "LEVEL_OPTION_LIMIT", 1)
+    model.answers["full_path"] = CategorySuggestion("Not a path", "high", "bad")
+
+    result = ai_category_path.suggest_category_path("Samsung Galaxy S23", None, {})
+
+    # One option per level is picked without asking the model.
+    assert model.calls["level"] == []
+    assert result.path == ["Phones", "Samsung", "Galaxy S23"]
+    assert result.llm_calls == 1
+
+
+def test_single_unpruned_candidate_needs_no_model_call(model):
+    result = ai_category_path.suggest_category_path("PlayStation", None, {}, previous_path=["consoles"])
+
+    assert model.calls == {"full_path": [], "level": []}
+    assert (result.full_name, result.mode, result.llm_calls) == ("Consoles > Sony > PlayStation 5", "full_path", 0)
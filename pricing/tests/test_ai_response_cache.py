@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from pricing.models_v2 import AiResponseCache
+from pricing.services import ai_category
+from pricing.services.ai_response_cache import (
+    get_cached_response,
+    store_response,
+)
+from pricing.services.llm_router import LlmRouter, fake_provider
+
+pytestmark = pytest.mark.django_db
+
+
+def test_store_then_hit():
+    assert get_cached_response("sys", "user", "m1") is None
+    store_response("sys", "user", "m1", '{"a": 1}', "groq", "label")
+
+    assert get_cached_response("sys", "user", "m1") == ('{"a": 1}', "groq")
+    assert get_cached_response("sys", "user", "m2") is None
+    assert get_cached_response("sys", "other user", "m1") is None
+    assert AiResponseCache.objects.get().hit_count == 1
+
+
+def test_expired_entries_miss_and_are_replaced():
+    store_response("sys", "user", "m", "old", "groq")
+    AiResponseCache.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+    assert get_cached_response("sys", "user", "m") is None
+
+    store_response("sys", "user", "m", "new", "gemini")
+    assert get_cached_response("sys", "user", "m") == ("new", "gemini")
+    assert AiResponseCache.objects.count() == 1
+
+
+def test_least_recently_used_rows_are_evicted(settings):
+    settings.AI_RESPONSE_CACHE_MAX_ENTRIES = 2
+    store_response("sys", "user 0", "m", "0", "groq")
+    store_response("sys", "user 1", "m", "1", "groq")
+    AiResponseCache.objects.update(last_used_at=timezone.now() - timedelta(minutes=5))
+    get_cached_response("sys", "user 0", "m")  # touch: "user 1" is now least recently used
+
+    store_response("sys", "user 2", "m", "2", "groq")
+
+    assert AiResponseCache.objects.count() == 2
+    assert get_cached_response("sys", "user 1", "m") is None
+    assert get_cached_response("sys", "user 0", "m") == ("0", "groq")
+    assert get_cached_response("sys", "user 2", "m") == ("2", "groq")
+
+
+def test_disabled_with_zero_ttl(settings):
+    settings.AI_RESPONSE_CACHE_TTL_SECONDS = 0
+    store_response("sys", "user", "m", "x", "groq")
+    assert get_cached_response("sys", "user", "m") is None
+    assert not AiResponseCache.objects.exists()
+
+
+@pytest.fixture
+def fake_router():
+    calls = []
+
+    def reply(system, user):
+        calls.append(user)
+        return '{"suggested": "Phones", "confidence": "high", "reasoning": "fake"}'
+
+    ai_category.set_router(LlmRouter([fake_provider("groq", reply)]))
+    yield calls
+    ai_category.set_router(None)
+
+
+def test_provider_replies_are_cached_by_prompt(fake_router):
+    first = ai_category._call_with_fallback_with_provider("sys", "user", 100, "test")
+    second = ai_category._call_with_fallback_with_provider("sys", "user", 100, "test")
+
+    assert first == second
+    assert first[1] == "groq"
+    assert fake_router == ["user"]
+    assert AiResponseCache.objects.get().model == ai_category.MODEL_CHAIN
+
+
+def test_stub_mode_uses_the_cache_under_its_own_key(settings, fake_router):
+    user = "ITEM: Pixel 8\n\nAVAILABLE OPTIONS\n- Phones\n- Tablets"
+    settings.AI_PROVIDER = "stub"
+    stub = ai_category._call_with_fallback_with_provider(ai_category._CATEGORY_SYSTEM, user, 100, "test")
+    assert stub[1] == "stub"
+    assert ai_category._call_with_fallback_with_provider(ai_category._CATEGORY_SYSTEM, user, 100, "test") == stub
+    assert AiResponseCache.objects.get().model == ai_category.STUB_MODEL
+
+    # Leaving stub mode must not serve the stub's answer for the same prompt.
+    settings.AI_PROVIDER = ""
+    real = ai_category._call_with_fallback_with_provider(ai_category._CATEGORY_SYSTEM, user, 100, "test")
+    assert real[1] == "groq"
+    assert fake_router == [user]
+    assert AiResponseCache.objects.count() == 2
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+import pytest
+from rest_framework.test import APIClient
+
+from pricing.models_v2 import (
+    Customer,
+    RepricingSession,
+    RepricingSessionItem,
+    Request,
+    RequestItem,
+    UploadSession,
+    UploadSessionItem,
+)
+from pricing.services.barcode_history import lookup_barcode_history
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def history(make_variant):
+    repricing = RepricingSession.objects.create(session_data={})
+    for i, price in enumerate(["10", None, "12"]):
+        RepricingSessionItem.objects.create(
+            repricing_session=repricing, item_identifier=f"R{i}", barcode="CODE1",
+            new_retail_price=Decimal(price) if price else None,
+        )
+    RepricingSessionItem.objects.create(repricing_session=repricing, item_identifier="X", barcode="OTHER")
+
+    upload = UploadSession.objects.create(session_data={})
+    UploadSessionItem.objects.create(
+        upload_session=upload, item_identifier="U1", barcode="B-U1", stock_barcode="CODE1",
+        new_retail_price=Decimal("15"),
+    )
+
+    variant = make_variant("CODE1")
+    request = Request.objects.create(customer=Customer.objects.create(name="Jo Bloggs"), intent="BUYBACK")
+    RequestItem.objects.create(request=request, variant=variant, negotiated_price_gbp=Decimal("7"))
+    RequestItem.objects.create(request=request, variant=make_variant("OTHER"), negotiated_price_gbp=Decimal("1"))
+
+
+def test_lookup_is_three_queries_and_newest_first(history, django_assert_num_queries):
+    with django_assert_num_queries(3):
+        result = lookup_barcode_history("CODE1").as_dict()
+
+    assert [row["item_identifier"] for row in result["repricing"]] == ["R2", "R1", "R0"]
+    assert [row["item_identifier"] for row in result["uploads"]] == ["U1"]
+    assert [row["negotiated_price_gbp"] for row in result["requests"]] == [7.0]
+    assert result["last_priced"]["item_identifier"] == "U1"
+    assert result["last_bought"]["negotiated_price_gbp"] == 7.0
+
+
+def test_limit_applies_per_source(history):
+    result = lookup_barcode_history("CODE1", limit=1)
+    assert (len(result.repricing), len(result.uploads), len(result.requests)) == (1, 1, 1)
+
+
+def test_view_validates_params(history):
+    client = APIClient()
+    assert client.get("/api/barcode-history/").status_code == 400
+    assert client.get("/api/barcode-history/", {"barcode": "CODE1", "limit": "x"}).status_code == 400
+    data = client.get("/api/barcode-history/", {"barcode": " CODE1 ", "limit": 2}).json()
+    assert [row["item_identifier"] for row in data["repricing"]] == ["R2", "R1"]
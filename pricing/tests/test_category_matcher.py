@@ -0,0 +1,41 @@
+from pricing.services.category_matcher import _Bm25Index, _is_staff_pick, tokenize
+
+LEAVES = [
+    "Electronics > Mobile Phones > Apple iPhone",
+    "Electronics > Mobile Phones > Samsung Galaxy",
+    "Electronics > Games Consoles > PlayStation",
+    "Electronics > Games Consoles > Xbox",
+    "Jewellery > Gold > Rings",
+    "Jewellery > Silver > Chains",
+    "Tools > Power Tools > Drills",
+]
+
+
+def _index():
+    docs = []
+    for nid, name in enumerate(LEAVES, start=1):
+        leaf = name.split(" > ")[-1]
+        docs.append((nid, name, tokenize(name) + tokenize(leaf)))
+    return _Bm25Index(docs, version=1)
+
+
+def _confidence(query):
+    return _index().search(tokenize(query)).confidence
+
+
+def test_named_category_is_confident():
+    match = _index().search(tokenize("Samsung Galaxy"))
+    assert match.full_name == "Electronics > Mobile Phones > Samsung Galaxy"
+    assert match.confidence == 1.0
+    assert _confidence("iPhone 13") >= 0.6
+
+
+def test_unknown_words_lower_confidence():
+    for query in ("Apple Watch Series 7", "Apple MacBook Pro", "Samsung TV 55 inch"):
+        assert _confidence(query) < 0.6, query
+
+
+def test_only_staff_picks_are_learned():
+    assert _is_staff_pick({"nosposId": 19, "fullName": "Tools > Power Tools > Drills"})
+    assert not _is_staff_pick({"nosposId": 19, "source": "negotiation_ai"})
+    assert not _is_staff_pick({"nosposId": 4, "fromInternalProductCategory": True})
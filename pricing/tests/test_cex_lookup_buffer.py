@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+from pricing.models_v2 import Variant
+from pricing.services import cex_prices
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer():
+    cex_prices.flush_price_lookups()
+    yield
+    cex_prices.flush_price_lookups()
+
+
+def _count(variant):
+    return Variant.objects.get(pk=variant.pk).price_lookup_count
+
+
+@pytest.mark.django_db
+def test_lookups_are_buffered_until_the_batch_is_full(settings, make_variant, django_assert_num_queries):
+    settings.CEX_LOOKUP_FLUSH_MAX_PENDING = 2
+    a, b = make_variant("SKU-A"), make_variant("SKU-B")
+
+    with django_assert_num_queries(0):
+        cex_prices.record_price_lookups([a.pk])
+        cex_prices.record_price_lookups([a.pk])
+    assert _count(a) == 0
+
+    with django_assert_num_queries(2):  # one UPDATE per distinct increment
+        cex_prices.record_price_lookups([b.pk])
+    assert (_count(a), _count(b)) == (2, 1)
+    assert Variant.objects.get(pk=a.pk).last_price_lookup_at is not None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_quiet_buffer_is_flushed_by_its_timer(settings, make_variant):
+    settings.CEX_LOOKUP_FLUSH_SECONDS = 0.2
+    variant = make_variant("SKU-A")
+
+    cex_prices.record_price_lookups([variant.pk])
+    assert _count(variant) == 0
+
+    deadline = time.monotonic() + 5
+    while _count(variant) == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _count(variant) == 1
+    assert cex_prices._lookups.timer is None
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from pricing.models_v2 import PricingRule, Variant, VariantPriceHistory
+from pricing.services import cex_prices
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def cex(monkeypatch, settings):
+    """Stub CeX; each entry maps a sku to its box (None for a failed fetch)."""
+    settings.CEX_PRICE_MAX_AGE_MINUTES = 60
+    settings.CEX_PRICE_REFRESH_WORKER = False
+    boxes, fetched = {}, []
+
+    def fetch(sku, timeout=10):
+        fetched.append(sku)
+        return boxes.get(sku, {"sellPrice": 120, "cashPrice": 60, "exchangePrice": 80, "boxName": sku})
+
+    monkeypatch.setattr(cex_prices, "fetch_cex_box_detail", fetch)
+    cex_prices.flush_price_lookups()
+    yield boxes, fetched
+    cex_prices.flush_price_lookups()
+
+
+def _variant(make_variant, sku, minutes_ago):
+    checked_at = timezone.now() - timedelta(minutes=minutes_ago) if minutes_ago is not None else None
+    return make_variant(sku, price="100.00", cex_price_checked_at=checked_at)
+
+
+def _sources(result):
+    return {variant_id: prices.source for variant_id, prices in result.items()}
+
+
+def test_fresh_prices_come_from_the_db_and_stale_ones_go_live(cex, make_variant):
+    _boxes, fetched = cex
+    fresh, stale, legacy = (
+        _variant(make_variant, "FRESH", 5), _variant(make_variant, "STALE", 90), _variant(make_variant, "LEGACY", None),
+    )
+
+    result = cex_prices.resolve_cex_reference_prices([fresh, stale, legacy])
+
+    assert _sources(result) == {
+        fresh.pk: cex_prices.SOURCE_DB, stale.pk: cex_prices.SOURCE_LIVE, legacy.pk: cex_prices.SOURCE_LIVE,
+    }
+    assert fetched == ["STALE", "LEGACY"]
+    stored = Variant.objects.get(pk=stale.pk)
+    assert (stored.current_price_gbp, stored.tradein_cash) == (Decimal("120.00"), Decimal("60.00"))
+    assert stored.cex_price_checked_at is not None
+    assert VariantPriceHistory.objects.filter(variant=stale).count() == 1
+
+
+def test_live_write_back_does_not_grow_with_the_batch(make_variant):
+    def resolve(count, prefix):
+        variants = [_variant(make_variant, f"{prefix}{i}", 90) for i in range(count)]
+        with CaptureQueriesContext(connection) as queries:
+            cex_prices.resolve_cex_reference_prices(variants, rules={v.pk: None for v in variants})
+        return len(queries)
+
+    assert resolve(2, "A") == resolve(10, "B")
+
+
+def test_failed_fetch_and_refresh_worker_serve_stale_db_prices(cex, settings, make_variant):
+    boxes, fetched = cex
+    boxes["DEAD"] = None
+    dead = _variant(make_variant, "DEAD", 90)
+    assert _sources(cex_prices.resolve_cex_reference_prices([dead])) == {dead.pk: cex_prices.SOURCE_DB_STALE}
+
+    settings.CEX_PRICE_REFRESH_WORKER = True
+    stale = _variant(make_variant, "STALE", 90)
+    assert _sources(cex_prices.resolve_cex_reference_prices([stale])) == {stale.pk: cex_prices.SOURCE_DB_STALE}
+    assert fetched == ["DEAD"]
+
+    # An explicit refresh still goes live.
+    result = cex_prices.resolve_cex_reference_prices([stale], force_live=True)
+    assert _sources(result) == {stale.pk: cex_prices.SOURCE_LIVE}
+
+
+def test_rule_max_age_overrides_the_default(cex, make_variant):
+    _boxes, fetched = cex
+    variant = _variant(make_variant, "SKU", 30)
+    rule = PricingRule(cex_price_max_age_minutes=10)
+
+    result = cex_prices.resolve_cex_reference_prices([variant], rules={variant.pk: rule})
+
+    assert result[variant.pk].source == cex_prices.SOURCE_LIVE
+    assert result[variant.pk].max_age_seconds == 600
+    assert fetched == ["SKU"]
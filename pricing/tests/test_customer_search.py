@@ -0,0 +1,67 @@
+import pytest
+
+from pricing.models_v2 import Customer
+from pricing.services.customer_search import search_customers
+
+pytestmark = pytest.mark.django_db
+
+
+def _names(customers):
+    return [c.name for c in customers]
+
+
+def _customer(name, phone_number=None, **fields):
+    # phone_number is unique; give customers without one a distinct placeholder.
+    phone_number = phone_number or f"01632 {Customer.objects.count():06d}"
+    return Customer.objects.create(name=name, phone_number=phone_number, **fields)
+
+
+def test_exact_phone_ranks_first_within_the_limit():
+    for i in range(30):
+        _customer(name=f"Prefix {i:02d}", phone_number=f"07700 900{i:03d}")
+    exact = _customer(name="Zed Exact", phone_number="07700 900")
+
+    results = search_customers("07700900", limit=20)
+    assert len(results) == 20
+    assert results[0] == exact
+
+
+def test_plus_44_is_folded_to_the_national_zero():
+    customer = _customer(name="Jo Bloggs", phone_number="+44 7700 900123")
+    assert customer.phone_digits == "07700900123"
+    assert search_customers("07700 900123") == [customer]
+    assert search_customers("+447700900123") == [customer]
+    assert search_customers("7700 900") == [customer]  # typed without the national 0
+
+
+def test_exact_name_ranks_before_name_and_surname_prefixes():
+    for i in range(25):
+        _customer(name=f"John Smith{i:02d}")
+    _customer(name="Anna Johnson")
+    exact = _customer(name="John Smith")
+
+    results = search_customers("john smith", limit=20)
+    assert results[0] == exact
+    assert "Anna Johnson" not in _names(results)
+
+
+def test_surname_prefix_ignores_punctuation_and_case():
+    obrien = _customer(name="Mary O'Brien")
+    _customer(name="Bob Jones")
+
+    assert search_customers("obri") == [obrien]
+    assert search_customers("O'BRI") == [obrien]
+
+
+def test_email_and_short_queries():
+    customer = _customer(name="Sam Lee", email="Sam.Lee@Example.com")
+    assert search_customers("sam.lee@ex") == [customer]
+    assert search_customers("s") == []
+
+
+def test_exact_email_ranks_first_within_the_limit():
+    for i in range(25):
+        _customer(name=f"Aa {i:02d}", email=f"sam@example.com.{i:02d}")
+    exact = _customer(name="Zed", email="sam@example.com")
+
+    assert search_customers("sam@example.com", limit=20)[0] == exact
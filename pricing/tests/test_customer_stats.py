@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+import pytest
+from rest_framework.test import APIClient
+
+from pricing.models_v2 import Customer, Request, RequestStatus, RequestStatusHistory
+
+pytestmark = pytest.mark.django_db
+
+
+def _request(customer, *statuses):
+    req = Request.objects.create(customer=customer, intent=Request._meta.get_field("intent").choices[0][0])
+    for status in statuses:
+        RequestStatusHistory.objects.create(request=req, status=status)
+    return req
+
+
+def test_abandoned_quotes_stay_out_of_cancel_rate():
+    customer = Customer.objects.create(name="Jo Bloggs")
+    _request(customer, RequestStatus.QUOTE)
+    _request(customer, RequestStatus.QUOTE, RequestStatus.BOOKED_FOR_TESTING, RequestStatus.COMPLETE)
+    _request(customer, RequestStatus.QUOTE)
+
+    customer = Customer.objects.select_related("stats").get(pk=customer.pk)
+    assert customer.cancel_rate == 0.0
+
+    data = APIClient().get(f"/api/customers/{customer.pk}/").json()
+    assert data["cancel_rate"] == 0.0
+    assert data["stats"]["total_requests"] == 3
+    assert data["stats"]["completed"] == 1
+    assert data["stats"]["quote_abandoned"] == 1
+    assert "cancel_rate" not in data["stats"]
+
+
+def _stats(customer):
+    return Customer.objects.select_related("stats").get(pk=customer.pk).stats
+
+
+def test_moving_a_request_to_another_customer_moves_its_stats():
+    jo = Customer.objects.create(name="Jo Bloggs", phone_number="01632 000001")
+    sam = Customer.objects.create(name="Sam Lee", phone_number="01632 000002")
+    _request(jo, RequestStatus.QUOTE)
+    req = _request(jo, RequestStatus.QUOTE, RequestStatus.COMPLETE)
+    req.negotiated_grand_total_gbp = Decimal("40.00")
+    req.save()
+    assert _stats(jo).negotiated_total_gbp == Decimal("40.00")
+
+    req = Request.objects.get(pk=req.pk)
+    req.customer = sam
+    req.save()
+
+    jo_stats, sam_stats = _stats(jo), _stats(sam)
+    assert (jo_stats.total_requests, jo_stats.completed, jo_stats.negotiated_total_gbp) == (1, 0, 0)
+    assert (sam_stats.total_requests, sam_stats.completed, sam_stats.negotiated_total_gbp) == (1, 1, Decimal("40.00"))
+
+
+def test_deleting_a_request_removes_it_from_the_stats():
+    customer = Customer.objects.create(name="Jo Bloggs")
+    _request(customer, RequestStatus.QUOTE, RequestStatus.COMPLETE)
+    req = _request(customer, RequestStatus.QUOTE)
+
+    req.delete()
+
+    stats = _stats(customer)
+    assert (stats.total_requests, stats.open_quotes, stats.completed) == (1, 0, 1)
+
+
+def test_saving_an_unchanged_request_does_not_touch_the_stats(django_assert_num_queries):
+    customer = Customer.objects.create(name="Jo Bloggs")
+    req = Request.objects.get(pk=_request(customer, RequestStatus.QUOTE).pk)
+    req.overall_expectation_gbp = Decimal("10.00")
+    with django_assert_num_queries(1):
+        req.save()
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from pricing.services import facet_cache
+from pricing.services.facet_cache import TtlLruCache, params_cache_key, url_cache_key
+
+
+@pytest.fixture
+def cache(settings):
+    settings.MARKETPLACE_FACET_CACHE_TTL_SECONDS = 60
+    settings.MARKETPLACE_FACET_CACHE_MAX_ENTRIES = 2
+    return TtlLruCache("test", "MARKETPLACE_FACET_CACHE_TTL_SECONDS", "MARKETPLACE_FACET_CACHE_MAX_ENTRIES")
+
+
+def test_entries_expire_after_the_ttl(monkeypatch, cache):
+    assert cache.get_or_compute("a", lambda: 1) == (1, "miss")
+    assert cache.get_or_compute("a", lambda: 2) == (1, "hit")
+
+    real_monotonic = time.monotonic
+    monkeypatch.setattr(facet_cache.time, "monotonic", lambda: real_monotonic() + 61)
+    assert cache.get_or_compute("a", lambda: 3) == (3, "miss")
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("b", lambda: 2)
+    cache.get_or_compute("a", lambda: None)  # touch "a" so "b" is now the oldest
+    cache.get_or_compute("c", lambda: 3)
+
+    assert cache.get_or_compute("a", lambda: None) == (1, "hit")
+    assert cache.get_or_compute("b", lambda: 20) == (20, "miss")
+    assert cache.stats()["entries"] == 2
+
+
+def test_failures_are_not_cached(cache):
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("a", fail)
+    assert cache.get_or_compute("a", lambda: 1) == (1, "miss")
+
+
+@pytest.mark.parametrize("outcome", ["value", "error"])
+def test_concurrent_misses_share_one_upstream_call(cache, outcome):
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        if outcome == "error":
+            raise RuntimeError("upstream down")
+        return "facets"
+
+    results = []
+
+    def worker():
+        try:
+            results.append(cache.get_or_compute("a", compute))
+        except RuntimeError as exc:
+            results.append(str(exc))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    if outcome == "value":
+        assert sorted(status for _value, status in results) == ["coalesced"] * 3 + ["miss"]
+    else:
+        assert results == ["upstream down"] * 4
+
+
+def test_equivalent_queries_share_a_key():
+    assert params_cache_key("ebay", {"_nkw": "iPhone  13", "_sacat": "9355"}) == params_cache_key(
+        "ebay", {"_sacat": "9355", "_nkw": "iphone 13"}
+    )
+    assert url_cache_key("cc", "https://WWW.example.test/search/?query=IPhone+13&page=1") == url_cache_key(
+        "cc", "https://www.example.test/search?page=1&query=iphone%2013"
+    )
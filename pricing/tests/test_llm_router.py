@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from pricing.services.llm_router import MIN_SAMPLES, LlmRouter, fake_provider
+
+OK = '{"suggested": "Phones"}'
+
+
+@pytest.fixture(autouse=True)
+def fast_hedge(settings):
+    settings.AI_HEDGE_DELAY_MS = 50
+    settings.AI_HEDGE_MIN_DELAY_MS = 10
+    settings.AI_HEDGE_MAX_DELAY_MS = 100
+    settings.AI_PROVIDER_TIMEOUT_SECONDS = 5
+
+
+def test_first_provider_answers():
+    router = LlmRouter([fake_provider("groq", OK), fake_provider("gemini", '{"other": 1}')])
+    assert router.call("sys", "user", 100, "test") == (OK, "groq")
+    assert router.stats["groq"].wins == 1
+    assert router.stats["gemini"].calls == 0
+
+
+def test_slow_provider_is_hedged():
+    router = LlmRouter([
+        fake_provider("groq", '{"slow": 1}', delay_s=1.0),
+        fake_provider("gemini", OK),
+    ])
+    assert router.call("sys", "user", 100, "test") == (OK, "gemini")
+
+
+def test_failure_and_invalid_json_hand_over_immediately(settings):
+    settings.AI_HEDGE_DELAY_MS = 5000
+    settings.AI_HEDGE_MIN_DELAY_MS = 5000
+    settings.AI_HEDGE_MAX_DELAY_MS = 5000
+    for first in (fake_provider("groq", OK, error=ConnectionError("down")), fake_provider("groq", "not json")):
+        router = LlmRouter([first, fake_provider("gemini", OK)])
+        assert router.call("sys", "user", 100, "test") == (OK, "gemini")
+        assert router.stats["groq"].errors == 1
+
+
+def test_all_failing_raises():
+    router = LlmRouter([
+        fake_provider("groq", OK, error=TimeoutError("slow")),
+        fake_provider("gemini", "nope"),
+    ])
+    with pytest.raises(RuntimeError, match="All AI providers failed"):
+        router.call("sys", "user", 100, "test")
+
+
+def test_overall_timeout(settings):
+    settings.AI_PROVIDER_TIMEOUT_SECONDS = 0.2
+    router = LlmRouter([fake_provider("groq", OK, delay_s=1.0)])
+    with pytest.raises(RuntimeError, match="timed out"):
+        router.call("sys", "user", 100, "test")
+
+
+def test_failing_provider_is_demoted():
+    router = LlmRouter([fake_provider("groq", OK, error=ConnectionError("down")), fake_provider("gemini", OK)])
+    for _ in range(MIN_SAMPLES):
+        router.call("sys", "user", 100, "test")
+    assert [p.name for p in router.ordered_providers()][0] == "gemini"
+    stats = router.stats_dict()
+    assert stats["order"][0] == "gemini"
+    assert stats["providers"]["gemini"]["wins"] == MIN_SAMPLES
+
+
+def test_hung_provider_does_not_starve_the_other(settings):
+    settings.AI_PROVIDER_MAX_WORKERS = 1
+    release = threading.Event()
+
+    def hang(system, user):
+        release.wait(5)
+        return OK
+
+    router = LlmRouter([fake_provider("groq", hang), fake_provider("gemini", OK)])
+    try:
+        for _ in range(3):
+            assert router.call("sys", "user", 100, "test") == (OK, "gemini")
+    finally:
+        release.set()
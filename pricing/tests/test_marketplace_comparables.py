@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from rest_framework.test import APIClient
+
+from pricing.views import market_research
+
+URL = "/api/marketplace/comparables/"
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    """Replace the three source fetchers; tests override entries as needed."""
+    fns = {
+        "cex": lambda sku: {"results": [{"competitor": "CeX", "stable_id": sku}]},
+        "cashconverters": lambda url: {"results": [{"competitor": "CashConverters", "stable_id": "cc-1"}]},
+        "ebay": lambda params: {"filters": [{"name": "Brand"}], "cache": "miss"},
+    }
+    monkeypatch.setattr(market_research, "_cex_comparables", lambda arg: fns["cex"](arg))
+    monkeypatch.setattr(market_research, "_cashconverters_comparables", lambda arg: fns["cashconverters"](arg))
+    monkeypatch.setattr(market_research, "_ebay_comparables", lambda arg: fns["ebay"](arg))
+    return fns
+
+
+def test_all_sources_ok(sources):
+    data = APIClient().get(URL, {"q": "iphone 13", "cex_sku": "SKU1"}).json()
+    assert data["success"] and not data["partial"]
+    assert {s: info["status"] for s, info in data["sources"].items()} == {
+        "cex": "ok", "cashconverters": "ok", "ebay": "ok",
+    }
+    assert data["total_items"] == 2
+    assert data["sources"]["ebay"]["filters"] == [{"name": "Brand"}]
+
+
+def test_failed_source_returns_partial_results(sources):
+    def fail(sku):
+        raise market_research._UpstreamError("No CeX box detail")
+
+    sources["cex"] = fail
+    data = APIClient().get(URL, {"q": "iphone 13", "cex_sku": "SKU1"}).json()
+    assert data["success"] and data["partial"]
+    assert data["sources"]["cex"]["status"] == "error"
+    assert data["sources"]["cex"]["error"] == "No CeX box detail"
+    assert [r["competitor"] for r in data["results"]] == ["CashConverters"]
+
+
+def test_slow_source_times_out_without_holding_the_response(settings, sources):
+    settings.COMPARABLES_EBAY_TIMEOUT_SECONDS = 0.2
+    release = threading.Event()
+
+    def slow(params):
+        release.wait(5)
+        return {"filters": [], "cache": "miss"}
+
+    sources["ebay"] = slow
+    started = time.monotonic()
+    try:
+        data = APIClient().get(URL, {"q": "iphone 13"}).json()
+    finally:
+        release.set()
+    assert time.monotonic() - started < 2
+    assert data["sources"]["ebay"]["status"] == "timeout"
+    assert data["sources"]["cex"]["status"] == "skipped"
+    assert data["sources"]["cashconverters"]["status"] == "ok"
+    assert data["partial"]
+
+
+def test_every_source_failing_is_a_bad_gateway(sources):
+    def fail(arg):
+        raise market_research._UpstreamError("down")
+
+    sources["cashconverters"] = sources["ebay"] = fail
+    response = APIClient().get(URL, {"q": "iphone 13"})
+    assert response.status_code == 502
+    assert not response.json()["success"]
+
+
+def test_upstream_clients_get_the_source_budget(settings, monkeypatch):
+    settings.COMPARABLES_CEX_TIMEOUT_SECONDS = 3
+    seen = {}
+
+    def fetch(sku, timeout):
+        seen["timeout"] = timeout
+        return {"boxName": "Phone", "sellPrice": 10}
+
+    monkeypatch.setattr(market_research, "fetch_cex_box_detail", fetch)
+    assert market_research._cex_comparables("SKU1")["results"][0]["title"] == "Phone"
+    assert seen["timeout"] == 3
+
+
+def _cc_row(code, title="Item"):
+    return {"competitor": "CashConverters", "stable_id": code, "title": title, "url": f"/p/{code}"}
+
+
+def test_cashconverters_pages_stream_deduplicated_rows_and_error_lines(monkeypatch):
+    pages = {
+        "1": [_cc_row("A"), _cc_row("B")],
+        "2": [_cc_row("B"), _cc_row("C"), _cc_row(None, "No code")],
+        "4": [_cc_row(None, "No code")],
+    }
+
+    def fetch(api_url, timeout=20):
+        page = parse_qs(urlparse(api_url).query)["page"][0]
+        if page not in pages:
+            raise market_research._UpstreamError(f"page {page} failed")
+        return pages[page]
+
+    monkeypatch.setattr(market_research, "_fetch_cashconverters_results_page", fetch)
+    response = APIClient().get("/api/cashconverters/results/", {
+        "url": "https://www.cashconverters.co.uk/search-results?query=iphone",
+        "page": 1,
+        "pages": 4,
+    })
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+    done = lines[-1]
+    assert done == {
+        "type": "done", "success": False, "pages": [1, 2, 4], "failed_pages": [3], "total_items": 4,
+    }
+    assert [(line["page"], line["error"]) for line in lines if line["type"] == "error"] == [(3, "page 3 failed")]
+    sent = [row["stable_id"] for line in lines if line["type"] == "page" for row in line["results"]]
+    assert sorted(sent, key=str) == ["A", "B", "C", None]
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+from requests.cookies import RequestsCookieJar
+
+from pricing.services import marketplace_http
+from pricing.services.marketplace_http import MarketplaceClient
+
+WARMUP_URL = "https://www.example.test/"
+
+
+class FakeSession:
+    def __init__(self, warmup_gate=None):
+        self.cookies = RequestsCookieJar()
+        self.urls = []
+        self.status_code = 200
+        self.warmup_gate = warmup_gate
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if url == WARMUP_URL and self.warmup_gate is not None:
+            self.warmup_gate.wait(5)
+        response = type("Response", (), {})()
+        response.status_code = self.status_code
+        return response
+
+    def close(self):
+        pass
+
+    def warmups(self):
+        return self.urls.count(WARMUP_URL)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    session = FakeSession()
+    client = MarketplaceClient("Test", {}, warmup_url=WARMUP_URL)
+    monkeypatch.setattr(client, "_build_session", lambda: session)
+    return client, session
+
+
+def test_warm_up_runs_once_until_the_ttl_expires(settings, monkeypatch, client):
+    client, session = client
+    client.get("https://www.example.test/api")
+    client.get("https://www.example.test/api")
+    assert session.warmups() == 1
+
+    settings.MARKETPLACE_WARMUP_TTL_SECONDS = 60
+    real_monotonic = time.monotonic
+    monkeypatch.setattr(marketplace_http.time, "monotonic", lambda: real_monotonic() + 61)
+    client.get("https://www.example.test/api")
+    assert session.warmups() == 2
+
+
+@pytest.mark.parametrize("status_code", [401, 403])
+def test_auth_failure_forces_a_fresh_warm_up(client, status_code):
+    client, session = client
+    session.cookies.set("sid", "old")
+    session.status_code = status_code
+    client.get("https://www.example.test/api")
+    assert len(session.cookies) == 0
+
+    session.status_code = 200
+    client.get("https://www.example.test/api")
+    assert session.warmups() == 2
+
+
+def test_concurrent_requests_do_not_wait_for_the_warm_up(monkeypatch):
+    gate = threading.Event()
+    session = FakeSession(warmup_gate=gate)
+    client = MarketplaceClient("Test", {}, warmup_url=WARMUP_URL)
+    monkeypatch.setattr(client, "_build_session", lambda: session)
+
+    warming = threading.Thread(target=client.get, args=("https://www.example.test/first",))
+    warming.start()
+    try:
+        deadline = time.monotonic() + 5
+        while session.warmups() == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        client.get("https://www.example.test/second")
+        assert time.monotonic() - started < 1
+        assert session.warmups() == 1
+    finally:
+        gate.set()
+        warming.join()
+    assert "https://www.example.test/first" in session.urls
+    client.get("https://www.example.test/third")
+    assert session.warmups() == 1
+
+
+def test_invalidate_during_warm_up_is_not_forgotten(monkeypatch):
+    gate = threading.Event()
+    session = FakeSession(warmup_gate=gate)
+    client = MarketplaceClient("Test", {}, warmup_url=WARMUP_URL)
+    monkeypatch.setattr(client, "_build_session", lambda: session)
+
+    warming = threading.Thread(target=client.session)
+    warming.start()
+    deadline = time.monotonic() + 5
+    while session.warmups() == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    client.invalidate()
+    gate.set()
+    warming.join()
+
+    client.session()
+    assert session.warmups() == 2
@@ -0,0 +1,103 @@
+import gzip
+import json
+
+import pytest
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from pricing.models_v2 import NosposCatalogueSnapshot
+from pricing.services import nospos_catalogue
+from pricing.services.nospos_sync import sync_nospos_categories
+
+# Real commits, so the on-commit catalogue rebuilds run as in production.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+URL = "/api/nospos-categories/"
+
+
+def _row(nospos_id, full_name, status="Active"):
+    return {
+        "nospos_id": nospos_id,
+        "level": full_name.count(">"),
+        "full_name": full_name,
+        "status": status,
+        "buyback_rate": None,
+        "offer_rate": None,
+    }
+
+
+@pytest.fixture(autouse=True)
+def rebuilds(monkeypatch):
+    """Count catalogue rebuilds; starts from a synced three-category tree."""
+    monkeypatch.setattr(nospos_catalogue, "_cached", None)
+    calls = []
+    real_rebuild = nospos_catalogue.rebuild_catalogue_snapshot
+
+    def rebuild():
+        calls.append(1)
+        return real_rebuild()
+
+    monkeypatch.setattr(nospos_catalogue, "rebuild_catalogue_snapshot", rebuild)
+    sync_nospos_categories([_row(1, "Phones"), _row(2, "Phones > Apple"), _row(3, "Consoles")])
+    calls.clear()
+    return calls
+
+
+def test_matching_etag_is_a_304_after_one_query(django_assert_num_queries):
+    client = APIClient()
+    response = client.get(URL)
+    assert response.status_code == 200
+    assert json.loads(response.content)["count"] == 3
+    etag = response["ETag"]
+
+    with django_assert_num_queries(1):
+        response = client.get(URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+
+
+def test_gzip_and_subtree_responses():
+    client = APIClient()
+    full = client.get(URL, HTTP_ACCEPT_ENCODING="gzip")
+    assert full["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(full.content))["count"] == 3
+
+    subtree = client.get(URL, {"root": 1})
+    assert [row["fullName"] for row in json.loads(subtree.content)["results"]] == ["Phones", "Phones > Apple"]
+    assert subtree["ETag"] != full["ETag"]
+    assert client.get(URL, {"root": 1}, HTTP_IF_NONE_MATCH=subtree["ETag"]).status_code == 304
+    assert client.get(URL, {"root": 99}).status_code == 404
+
+
+def test_unchanged_rebuild_keeps_the_version_and_a_change_moves_it():
+    client = APIClient()
+    etag = client.get(URL)["ETag"]
+    assert NosposCatalogueSnapshot.objects.count() == 1
+
+    nospos_catalogue.rebuild_catalogue_snapshot()
+    assert NosposCatalogueSnapshot.objects.count() == 1
+
+    sync_nospos_categories([_row(3, "Consoles", status="Inactive")])
+    assert NosposCatalogueSnapshot.objects.count() == 2
+    response = client.get(URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+def test_writes_in_one_transaction_rebuild_once(rebuilds):
+    with transaction.atomic():
+        sync_nospos_categories([_row(4, "Tablets")])
+        sync_nospos_categories([_row(5, "Tablets > Apple")])
+    assert len(rebuilds) == 1
+    assert NosposCatalogueSnapshot.objects.first().category_count == 5
+
+    sync_nospos_categories([_row(5, "Tablets > Apple")])  # unchanged: nothing scheduled
+    assert len(rebuilds) == 1
+
+
+def test_rolled_back_writes_do_not_rebuild(rebuilds):
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            sync_nospos_categories([_row(4, "Tablets")])
+            raise RuntimeError
+    assert rebuilds == []
@@ -0,0 +1,149 @@
+from decimal import Decimal
+
+import pytest
+
+from pricing.models_v2 import NosposCategory, NosposCategoryField, NosposField
+from pricing.services.nospos_sync import (
+    CategoryFieldsPayload,
+    sync_nospos_categories,
+    sync_nospos_category_fields,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def _row(nospos_id, full_name, status="Active"):
+    return {
+        "nospos_id": nospos_id,
+        "level": full_name.count(">"),
+        "full_name": full_name,
+        "status": status,
+        "buyback_rate": None,
+        "offer_rate": None,
+    }
+
+
+def _parents():
+    return {
+        c.full_name: c.parent.full_name if c.parent else None
+        for c in NosposCategory.objects.select_related("parent")
+    }
+
+
+TREE = [
+    _row(3, "Phones > Apple > iPhone 13"),
+    _row(2, "Phones > Apple"),
+    _row(1, "Phones"),
+    _row(4, "Phones > Samsung"),
+]
+
+
+def test_new_tree_is_inserted_level_by_level(django_assert_num_queries):
+    # savepoint, SELECT, one INSERT per level, release
+    with django_assert_num_queries(6):
+        result = sync_nospos_categories(TREE)
+
+    assert (result.created, result.updated, result.relinked, result.unchanged) == (4, 0, 0, 0)
+    assert _parents() == {
+        "Phones": None,
+        "Phones > Apple": "Phones",
+        "Phones > Samsung": "Phones",
+        "Phones > Apple > iPhone 13": "Phones > Apple",
+    }
+
+
+def test_unchanged_resync_only_reads(django_assert_num_queries):
+    sync_nospos_categories(TREE)
+    with django_assert_num_queries(3):  # savepoint, SELECT, release
+        result = sync_nospos_categories(TREE)
+    assert (result.created, result.updated, result.relinked, result.unchanged) == (0, 0, 0, 4)
+
+
+def test_orphans_are_relinked_once_their_parent_arrives():
+    sync_nospos_categories([_row(2, "Phones > Apple"), _row(3, "Phones > Apple > iPhone 13")])
+    assert _parents()["Phones > Apple"] is None
+
+    result = sync_nospos_categories([_row(1, "Phones")])
+
+    assert (result.created, result.updated, result.relinked) == (1, 0, 1)
+    assert _parents()["Phones > Apple"] == "Phones"
+
+
+def test_parents_resolve_against_names_after_a_rename_in_the_same_payload():
+    sync_nospos_categories(TREE)
+
+    # "Phones" becomes "Mobiles" and its children are re-sent under the new path;
+    # a new "Phones" root takes over the old name.
+    result = sync_nospos_categories([
+        _row(1, "Mobiles"),
+        _row(2, "Mobiles > Apple"),
+        _row(3, "Mobiles > Apple > iPhone 13"),
+        _row(5, "Phones"),
+    ])
+
+    assert result.created == 1
+    parents = _parents()
+    assert parents["Mobiles > Apple"] == "Mobiles"
+    assert parents["Mobiles > Apple > iPhone 13"] == "Mobiles > Apple"
+    # Not re-sent, so it keeps the parent row it already had (now "Mobiles").
+    assert parents["Phones > Samsung"] == "Mobiles"
+    assert NosposCategory.objects.get(nospos_id=5).parent is None
+
+
+def test_a_renamed_row_never_becomes_its_own_parent():
+    sync_nospos_categories([_row(2, "Phones")])
+
+    # The parent path is the row's own old name; it must not resolve to itself.
+    sync_nospos_categories([_row(2, "Phones > Phones")])
+
+    assert NosposCategory.objects.get(nospos_id=2).parent_id is None
+
+
+def _field(fid, name, active=True, required=False):
+    return {
+        "nospos_field_id": fid,
+        "name": name,
+        "active": active,
+        "editable": True,
+        "sensitive": False,
+        "required": required,
+    }
+
+
+def _links():
+    return sorted(
+        (link.category.nospos_id, link.field.name, link.required)
+        for link in NosposCategoryField.objects.select_related("category", "field")
+    )
+
+
+def test_category_fields_for_several_categories_in_one_pass():
+    sync_nospos_categories(TREE)
+    results, fields, _timings = sync_nospos_category_fields([
+        CategoryFieldsPayload(2, [_field(10, "IMEI"), _field(11, "Colour", active=False)], buyback_rate=Decimal("0.4")),
+        CategoryFieldsPayload(4, [_field(10, "IMEI", required=True)]),
+        CategoryFieldsPayload(99, [_field(10, "IMEI")]),
+    ])
+
+    assert [r.error is None for r in results] == [True, True, False]
+    assert (fields.created, results[0].field_links_created, results[0].links_for_active_fields) == (2, 1, 1)
+    assert _links() == [(2, "IMEI", False), (4, "IMEI", True)]
+    assert NosposCategory.objects.get(nospos_id=2).buyback_rate == Decimal("0.4")
+
+
+def test_category_fields_resync_updates_and_removes_links(django_assert_num_queries):
+    sync_nospos_categories(TREE)
+    payload = [CategoryFieldsPayload(2, [_field(10, "IMEI"), _field(11, "Colour")])]
+    sync_nospos_category_fields(payload)
+
+    # savepoint, categories, fields, links, release
+    with django_assert_num_queries(5):
+        (result,), fields, _timings = sync_nospos_category_fields(payload)
+    assert (fields.unchanged, result.field_links_created, result.field_links_removed) == (2, 0, 0)
+
+    (result,), fields, _timings = sync_nospos_category_fields([
+        CategoryFieldsPayload(2, [_field(10, "Serial / IMEI", required=True), _field(11, "Colour", active=False)]),
+    ])
+    assert (fields.updated, result.field_links_updated, result.field_links_removed) == (1, 1, 1)
+    assert _links() == [(2, "Serial / IMEI", True)]
+    assert NosposField.objects.count() == 2
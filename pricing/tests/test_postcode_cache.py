@@ -0,0 +1,42 @@
+import pytest
+
+from pricing.services import postcode_cache
+
+pytestmark = pytest.mark.django_db
+
+
+class _Response:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"result": [{"line_1": "10 Downing Street"}]}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    urls = []
+
+    def get(url, **kwargs):
+        urls.append(url)
+        return _Response()
+
+    monkeypatch.setattr(postcode_cache.ideal_postcodes_client, "get", get)
+    return urls
+
+
+@pytest.mark.parametrize("postcode", ["", "SW1", "../keys", "SW1A?2AA", "SW1A/2AA", "SW1A2AA#", "SW1A 2AA EXTRA"])
+def test_malformed_postcodes_never_reach_the_api(upstream, postcode):
+    assert postcode_cache.lookup_addresses(postcode, "key") == ([], "invalid")
+    assert upstream == []
+
+
+def test_valid_postcode_is_normalised_and_cached(upstream):
+    addresses, state = postcode_cache.lookup_addresses("sw1a 2aa", "key")
+    assert state == "miss"
+    assert upstream == [postcode_cache.IDEAL_POSTCODES_URL.format(postcode="SW1A2AA")]
+
+    assert postcode_cache.lookup_addresses("SW1A2AA", "key") == (addresses, "hit")
+    assert len(upstream) == 1
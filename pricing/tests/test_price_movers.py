@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from pricing.models_v2 import ProductCategory, VariantPriceMovement
+from pricing.services.price_movers import PriceChange, rank_price_movements, record_price_movements
+
+
+def _change(variant_id, previous, new, category_id=1):
+    return PriceChange(variant_id, category_id, Decimal(previous), Decimal(new))
+
+
+def test_rank_keeps_largest_moves_per_category_and_direction():
+    ranked = rank_price_movements(
+        [
+            _change(1, "100", "80"),   # -20%
+            _change(2, "100", "50"),   # -50%
+            _change(3, "100", "97"),   # -3%: under the threshold
+            _change(4, "100", "130"),  # +30%
+            _change(5, "100", "110"),  # +10%
+            _change(6, "0", "10"),     # no previous price
+            _change(7, "100", "60", category_id=2),
+        ],
+        top_per_category=1,
+    )
+    assert [(r["variant_id"], r["delta_pct"]) for r in ranked] == [
+        (2, Decimal("-50.00")),
+        (7, Decimal("-40.00")),
+        (4, Decimal("30.00")),
+    ]
+
+
+def test_repeated_sku_keeps_first_previous_and_last_new_price():
+    ranked = rank_price_movements([_change(1, "100", "90"), _change(1, "90", "100")])
+    assert ranked == []
+    (row,) = rank_price_movements([_change(1, "100", "90"), _change(1, "90", "70")])
+    assert (row["previous_price_gbp"], row["new_price_gbp"]) == (Decimal("100"), Decimal("70"))
+
+
+@pytest.fixture
+def run(make_variant):
+    phones = ProductCategory.objects.create(name="Phones")
+    consoles = ProductCategory.objects.create(name="Consoles")
+    phone, console = make_variant("PHONE", category=phones), make_variant("CONSOLE", category=consoles)
+    run_at = timezone.now()
+    written = record_price_movements(
+        [
+            PriceChange(phone.pk, phones.pk, Decimal("200"), Decimal("150")),
+            PriceChange(console.pk, consoles.pk, Decimal("100"), Decimal("120")),
+        ],
+        run_at,
+    )
+    assert written == 2
+    return phones, consoles
+
+
+@pytest.mark.django_db
+def test_view_groups_movers_by_category(run):
+    phones, consoles = run
+    data = APIClient().get("/api/price-movers/").json()
+    by_name = {c["category_name"]: c for c in data["categories"]}
+    assert [m["cex_sku"] for m in by_name["Phones"]["drops"]] == ["PHONE"]
+    assert [m["cex_sku"] for m in by_name["Consoles"]["rises"]] == ["CONSOLE"]
+
+    data = APIClient().get("/api/price-movers/", {"category_id": phones.pk, "direction": "rise"}).json()
+    assert data["categories"] == []
+    assert VariantPriceMovement.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_view_rejects_non_integer_category(run):
+    response = APIClient().get("/api/price-movers/", {"category_id": "abc"})
+    assert response.status_code == 400
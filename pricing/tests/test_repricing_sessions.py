@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from pricing.models_v2 import MarketResearchListing, MarketResearchSession, RepricingSession, RepricingSessionItem
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/repricing-sessions/"
+
+
+def _research(term):
+    return {
+        "searchTerm": term,
+        "stats": {"median": 20, "average": 21},
+        "drillHistory": [{"min": 10, "max": 40}],
+        "listings": [{"_id": f"{term}-{i}", "title": f"{term} {i}", "price": 20 + i} for i in range(3)],
+    }
+
+
+def _items(count):
+    return [
+        {
+            "item_identifier": f"I{i}",
+            "barcode": f"B{i}",
+            "new_retail_price": "25",
+            "raw_data": _research(f"ebay {i}"),
+            "cash_converters_data": _research(f"cc {i}"),
+        }
+        for i in range(count)
+    ]
+
+
+def _post(items):
+    with CaptureQueriesContext(connection) as queries:
+        response = APIClient().post(URL, {"items_data": items}, format="json")
+    assert response.status_code == 201, response.content
+    return response, len(queries)
+
+
+def test_completed_session_lines_and_research_are_bulk_inserted():
+    response, small = _post(_items(2))
+    _response, large = _post(_items(10))
+
+    # Lines, research sessions, drill levels and listings are one INSERT each
+    # (while under the backend's batch limit), so the count is size-independent.
+    assert small == large
+    session = RepricingSession.objects.get(pk=response.json()["repricing_session_id"])
+    assert session.items.count() == 2
+    assert MarketResearchSession.objects.filter(repricing_session_item__repricing_session=session).count() == 4
+    assert MarketResearchListing.objects.filter(
+        session__repricing_session_item__repricing_session=session
+    ).count() == 12
+
+
+def test_invalid_line_rejects_the_whole_session():
+    items = _items(3)
+    del items[2]["barcode"]
+    response = APIClient().post(URL, {"items_data": items}, format="json")
+
+    assert response.status_code == 400
+    assert not RepricingSession.objects.exists()
+    assert not RepricingSessionItem.objects.exists()
+    assert not MarketResearchSession.objects.exists()
@@ -0,0 +1,149 @@
+import pytest
+from rest_framework.test import APIClient
+
+from pricing.models_v2 import RepricingSession, SessionDataPatch, UploadSession
+from pricing.services.session_patch import (
+    JsonPatchError,
+    SessionDataConflict,
+    apply_json_patch,
+    apply_session_data_patch,
+    compact_session_data,
+    materialize_session_data,
+    replace_session_data,
+)
+
+
+def _patch_rows(session):
+    return SessionDataPatch.objects.filter(repricing_session_id=session.pk).count()
+
+
+def _stored(session):
+    return RepricingSession.objects.get(pk=session.pk)
+
+
+def test_apply_json_patch_ops():
+    doc = {"items": [{"sku": "A"}], "meta": {"n": 1}}
+    result = apply_json_patch(doc, [
+        {"op": "add", "path": "/items/-", "value": {"sku": "B"}},
+        {"op": "replace", "path": "/meta/n", "value": 2},
+        {"op": "copy", "from": "/meta/n", "path": "/count"},
+        {"op": "move", "from": "/items/0", "path": "/first"},
+        {"op": "remove", "path": "/meta"},
+        {"op": "test", "path": "/count", "value": 2},
+    ])
+    assert result == {"items": [{"sku": "B"}], "count": 2, "first": {"sku": "A"}}
+    assert doc == {"items": [{"sku": "A"}], "meta": {"n": 1}}
+
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "remove", "path": "/missing"}],
+    [{"op": "add", "path": "/items/5", "value": 1}],
+    [{"op": "test", "path": "/items", "value": []}],
+    [{"op": "move", "from": "/items", "path": "/items/0"}],
+    [{"op": "add", "path": "no-slash", "value": 1}],
+    {"op": "add"},
+])
+def test_apply_json_patch_rejects_bad_patches(operations):
+    doc = {"items": [1]}
+    with pytest.raises(JsonPatchError):
+        apply_json_patch(doc, operations)
+    assert doc == {"items": [1]}
+
+
+@pytest.mark.django_db
+def test_patches_are_stored_as_rows_until_compacted():
+    session = RepricingSession.objects.create(session_data={"items": []})
+
+    assert apply_session_data_patch(session, 0, [{"op": "add", "path": "/items/-", "value": "A"}]) == 1
+    assert apply_session_data_patch(session, 1, [{"op": "add", "path": "/items/-", "value": "B"}]) == 2
+
+    stored = _stored(session)
+    assert stored.session_data == {"items": []}
+    assert (stored.session_data_version, stored.session_data_snapshot_version) == (2, 0)
+    assert _patch_rows(session) == 2
+    assert materialize_session_data(stored) == {"items": ["A", "B"]}
+
+    compact_session_data(session)
+
+    stored = _stored(session)
+    assert stored.session_data == {"items": ["A", "B"]}
+    assert (stored.session_data_version, stored.session_data_snapshot_version) == (2, 2)
+    assert _patch_rows(session) == 0
+
+
+@pytest.mark.django_db
+def test_stale_version_is_rejected():
+    session = RepricingSession.objects.create(session_data={})
+    apply_session_data_patch(session, 0, [{"op": "add", "path": "/a", "value": 1}])
+
+    with pytest.raises(SessionDataConflict) as exc:
+        apply_session_data_patch(_stored(session), 0, [{"op": "add", "path": "/b", "value": 2}])
+    assert exc.value.current_version == 1
+    with pytest.raises(SessionDataConflict):
+        replace_session_data(_stored(session), {"b": 2}, base_version=0)
+    assert materialize_session_data(_stored(session)) == {"a": 1}
+
+
+@pytest.mark.django_db
+def test_snapshot_every_n_versions(settings):
+    settings.SESSION_DATA_SNAPSHOT_EVERY = 3
+    session = RepricingSession.objects.create(session_data={"n": 0})
+    for version in range(3):
+        apply_session_data_patch(session, version, [{"op": "replace", "path": "/n", "value": version + 1}])
+
+    stored = _stored(session)
+    assert stored.session_data == {"n": 3}
+    assert stored.session_data_snapshot_version == 3
+    assert _patch_rows(session) == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model, url", [
+    (RepricingSession, "/api/repricing-sessions/{}/"),
+    (UploadSession, "/api/upload-sessions/{}/"),
+])
+def test_patch_with_completed_status_compacts(model, url):
+    session = model.objects.create(session_data={"items": []})
+    client = APIClient()
+    response = client.patch(url.format(session.pk), {
+        "session_data_version": 0,
+        "session_data_patch": [{"op": "add", "path": "/items/-", "value": "A"}],
+    }, format="json")
+    assert response.status_code == 200
+
+    response = client.patch(url.format(session.pk), {
+        "session_data_version": 1,
+        "session_data_patch": [{"op": "add", "path": "/items/-", "value": "B"}],
+        "status": "COMPLETED",
+    }, format="json")
+    assert response.status_code == 200
+
+    stored = model.objects.get(pk=session.pk)
+    assert stored.status == "COMPLETED"
+    assert stored.session_data == {"items": ["A", "B"]}
+    assert (stored.session_data_version, stored.session_data_snapshot_version) == (2, 2)
+    assert not SessionDataPatch.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model, url", [
+    (RepricingSession, "/api/repricing-sessions/{}/"),
+    (UploadSession, "/api/upload-sessions/{}/"),
+])
+def test_patch_with_invalid_items_saves_nothing(model, url):
+    session = model.objects.create(session_data={"items": []})
+    response = APIClient().patch(url.format(session.pk), {
+        "session_data_version": 0,
+        "session_data_patch": [{"op": "add", "path": "/items/-", "value": "A"}],
+        "status": "COMPLETED",
+        "items_data": [{"item_identifier": "A"}],
+    }, format="json")
+    assert response.status_code == 400
+    assert "barcode" in response.json()["error"]
+
+    stored = model.objects.get(pk=session.pk)
+    assert stored.status != "COMPLETED"
+    assert stored.session_data == {"items": []}
+    assert stored.session_data_version == 0
+    assert not SessionDataPatch.objects.exists()
+    assert not stored.items.exists()
@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+import pytest
+
+from pricing.models_v2 import UploadSession, UploadSessionItem
+from pricing.views.uploads import _reconcile_upload_session_items
+
+pytestmark = pytest.mark.django_db
+
+
+def _session(*iids):
+    session = UploadSession.objects.create(session_data={})
+    for iid in iids:
+        UploadSessionItem.objects.create(
+            upload_session=session, item_identifier=iid, barcode=f"B-{iid}", new_retail_price=Decimal("10"),
+        )
+    return session
+
+
+def _prices(session):
+    return {
+        line.item_identifier: line.new_retail_price
+        for line in UploadSessionItem.objects.filter(upload_session=session)
+    }
+
+
+def test_updates_existing_lines_and_inserts_new_ones():
+    session = _session("A", "B")
+    _reconcile_upload_session_items(session, [
+        {"item_identifier": "A", "new_retail_price": "12.50"},
+        {"item_identifier": "B"},
+        {"item_identifier": "C", "barcode": "B-C", "new_retail_price": "5"},
+        {"itemId": "C", "new_retail_price": "6"},  # repeated id updates the new line
+    ])
+
+    assert _prices(session) == {"A": Decimal("12.50"), "B": Decimal("10.00"), "C": Decimal("6.00")}
+
+
+@pytest.mark.parametrize("lines", [2, 20])
+def test_statement_count_does_not_grow_with_the_payload(django_assert_num_queries, lines):
+    existing = [f"E{i}" for i in range(lines)]
+    session = _session(*existing)
+    items = [{"item_identifier": iid, "new_retail_price": "11"} for iid in existing]
+    items += [{"item_identifier": f"N{i}", "barcode": f"B-N{i}"} for i in range(lines)]
+
+    # SELECT existing lines, one UPDATE, one INSERT
+    with django_assert_num_queries(3):
+        _reconcile_upload_session_items(session, items)
+    assert len(_prices(session)) == 2 * lines
+
+
+def test_invalid_entry_writes_nothing():
+    session = _session("A")
+    with pytest.raises(ValueError, match="barcode"):
+        _reconcile_upload_session_items(session, [
+            {"item_identifier": "A", "new_retail_price": "99"},
+            {"item_identifier": "N"},
+        ])
+    assert _prices(session) == {"A": Decimal("10.00")}
@@ -0,0 +1,61 @@
+import pytest
+
+from pricing.models_v2 import WebEposCategory
+from pricing.services.webepos_sync import sync_webepos_categories
+
+pytestmark = pytest.mark.django_db
+
+
+def _node(uuid, name, level, parent=None):
+    return {"webepos_uuid": uuid, "name": name, "level": level, "parent_webepos_uuid": parent}
+
+
+def _parents():
+    return {
+        c.webepos_uuid: c.parent_category.webepos_uuid if c.parent_category else None
+        for c in WebEposCategory.objects.select_related("parent_category")
+    }
+
+
+TREE = [
+    _node("phones-apple-13", "iPhone 13", 3, parent="phones-apple"),
+    _node("phones-apple", "Apple", 2, parent="phones"),
+    _node("phones", "Phones", 1),
+    _node("phones-samsung", "Samsung", 2, parent="phones"),
+]
+
+
+def test_children_listed_before_their_parents_are_linked():
+    result = sync_webepos_categories(TREE)
+
+    assert (result.created, result.updated, result.relinked, result.unchanged) == (4, 0, 0, 0)
+    assert _parents() == {
+        "phones": None,
+        "phones-apple": "phones",
+        "phones-samsung": "phones",
+        "phones-apple-13": "phones-apple",
+    }
+
+
+def test_unchanged_rescrape_only_reads(django_assert_num_queries):
+    sync_webepos_categories(TREE)
+    with django_assert_num_queries(3):  # savepoint, SELECT, release
+        result = sync_webepos_categories(list(reversed(TREE)))
+    assert (result.created, result.updated, result.relinked, result.unchanged) == (0, 0, 0, 4)
+
+
+def test_moved_rows_count_as_relinked_and_renames_as_updated():
+    sync_webepos_categories(TREE)
+    result = sync_webepos_categories([
+        _node("phones-apple-13", "iPhone 13", 3, parent="phones-samsung"),  # moved
+        _node("phones-samsung", "Samsung Galaxy", 2, parent="phones"),       # renamed
+        _node("phones-samsung-s23", "Galaxy S23", 3, parent="phones-samsung"),  # new
+        {"webepos_uuid": "phones-apple", "name": "Apple", "level": 2},        # keeps its parent
+    ])
+
+    assert (result.created, result.updated, result.relinked, result.unchanged) == (1, 1, 1, 1)
+    parents = _parents()
+    assert parents["phones-apple-13"] == "phones-samsung"
+    assert parents["phones-samsung-s23"] == "phones-samsung"
+    assert parents["phones-apple"] == "phones"
+    assert WebEposCategory.objects.get(webepos_uuid="phones-samsung").name == "Samsung Galaxy"
@@ -12,11 +12,13 @@ urlpatterns = [
     path('market-stats/', views.variant_market_stats),
     path('variant-prices/', views.variant_prices),
     path('cex-product-prices/', views.cex_product_prices),
+    path('price-movers/', views.price_movers, name='price_movers'),
 
     # Market research
     path('ebay/filters/', views.get_ebay_filters, name='api-get-ebay-filters'),
     path('cashconverters/filters/', views.get_cashconverters_filters, name='api-get-cashconverters-filters'),
     path('cashconverters/results/', views.get_cashconverters_results, name='api-get-cashconverters-results'),
+    path('marketplace/comparables/', views.get_marketplace_comparables, name='api-get-marketplace-comparables'),
 
     # Customers
     path('customers/', views.customers_view),
@@ -39,6 +41,7 @@ urlpatterns = [
 
     # Repricing
     path('quick-reprice/lookup/', views.quick_reprice_lookup, name='quick_reprice_lookup'),
+    path('barcode-history/', views.barcode_history, name='barcode_history'),
     path('repricing-sessions/', views.repricing_sessions_view, name='repricing_sessions'),
     path('repricing-sessions/overview/', views.repricing_sessions_view, name='repricing_sessions_overview'),
     path('repricing-sessions/<int:repricing_session_id>/', views.repricing_session_detail, name='repricing_session_detail'),
@@ -63,8 +66,10 @@ urlpatterns = [
     path('nospos-fields/sync/', views.nospos_fields_sync, name='nospos_fields_sync'),
     path('nospos-fields/', views.nospos_fields_list, name='nospos_fields_list'),
     path('nospos-category-fields/sync/', views.nospos_category_fields_sync, name='nospos_category_fields_sync'),
+    path('nospos-category-fields/sync-batch/', views.nospos_category_fields_sync_batch, name='nospos_category_fields_sync_batch'),
 
     # Integrations
+    path('address-lookup/cache-stats/', views.address_lookup_cache_stats, name='address_lookup_cache_stats'),
     path('address-lookup/<str:postcode>/', views.address_lookup, name='address_lookup'),
     path(
         'cash-generator/retail-categories/',
@@ -79,7 +84,19 @@ urlpatterns = [
 
     # AI
     path('ai/suggest-category/', ai_views.suggest_nospos_category, name='ai_suggest_nospos_category'),
+    path(
+        'ai/suggest-category-path/',
+        ai_views.suggest_nospos_category_path,
+        name='ai_suggest_nospos_category_path',
+    ),
+    path('ai/cache-stats/', ai_views.ai_response_cache_stats, name='ai_response_cache_stats'),
+    path('ai/provider-stats/', ai_views.ai_provider_stats, name='ai_provider_stats'),
     path('ai/suggest-fields/', ai_views.suggest_nospos_fields, name='ai_suggest_nospos_fields'),
+    path(
+        'ai/suggest-fields-batch/',
+        ai_views.suggest_nospos_fields_batch,
+        name='ai_suggest_nospos_fields_batch',
+    ),
     path(
         'ai/suggest-marketplace-search-term/',
         ai_views.suggest_marketplace_research_search_term_view,
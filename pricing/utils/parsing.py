@@ -1,7 +1,11 @@
 """Shared parsing helpers for the pricing app."""
 
+import re
 from decimal import Decimal, InvalidOperation
 
+_NON_DIGIT_RE = re.compile(r"\D")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
 
 def parse_decimal(value, field_name=None, default=None):
     """Parse a value to Decimal, returning *default* for None/blank.
@@ -30,3 +34,18 @@ def coerce_bool(val, default=False):
     if s in ("0", "false", "no", "off", ""):
         return False
     return default
+
+
+def normalize_phone(value):
+    """Digits only, with a +44 / 0044 prefix folded to the national leading 0."""
+    digits = _NON_DIGIT_RE.sub("", str(value or ""))
+    if digits.startswith("0044"):
+        digits = "0" + digits[4:]
+    elif digits.startswith("44") and len(digits) > 10:
+        digits = "0" + digits[2:]
+    return digits
+
+
+def normalize_search_text(value):
+    """Case-folded text with punctuation dropped and whitespace collapsed ("O'Brien " -> "obrien")."""
+    return " ".join(_PUNCT_RE.sub("", str(value or "").casefold()).split())
@@ -6,11 +6,11 @@ After the views_v2 split, every endpoint lives in a domain-specific module:
     - catalogue.py       — product / category / variant read endpoints
     - customers.py       — customer CRUD
     - requests.py        — Request lifecycle + items
-    - repricing.py       — RepricingSession + quick-reprice lookup
+    - repricing.py       — RepricingSession + quick-reprice / barcode history lookup
     - uploads.py         — UploadSession
     - pricing_rules.py   — pricing / customer-rule / ebay-margin endpoints
-    - market_stats.py    — variant_prices, cex_product_prices
-    - market_research.py — eBay / CashConverters filter + result fetches
+    - market_stats.py    — variant_prices, cex_product_prices, price_movers
+    - market_research.py — eBay / CashConverters filter + result fetches, comparables
     - integrations.py    — React shell, address lookup, CG scraper
     - nospos.py          — NosPos category / field / mapping sync
     - _shared.py         — cross-domain helpers (do not add new logic here)
@@ -28,10 +28,12 @@ from pricing.views.market_research import (
     get_ebay_filters,
     get_cashconverters_filters,
     get_cashconverters_results,
+    get_marketplace_comparables,
 )
 from pricing.views.integrations import (
     react_app,
     address_lookup,
+    address_lookup_cache_stats,
     cash_generator_retail_categories,
     webepos_categories_view,
 )
@@ -43,6 +45,7 @@ from pricing.views.nospos import (
     nospos_fields_list,
     nospos_fields_sync,
     nospos_category_fields_sync,
+    nospos_category_fields_sync_batch,
 )
 from pricing.views.requests import (
     requests_view,
@@ -62,6 +65,7 @@ from pricing.views.repricing import (
     repricing_sessions_view,
     repricing_session_detail,
     quick_reprice_lookup,
+    barcode_history,
 )
 from pricing.views.uploads import (
     upload_sessions_view,
@@ -78,4 +82,5 @@ from pricing.views.pricing_rules import (
 from pricing.views.market_stats import (
     variant_prices,
     cex_product_prices,
+    price_movers,
 )
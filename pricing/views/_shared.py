@@ -4,6 +4,8 @@ genuinely cross-domain."""
 import logging
 from decimal import Decimal
 from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.response import Response
 
 from pricing.models_v2 import (
     Variant,
@@ -14,6 +16,13 @@ from pricing.models_v2 import (
 from pricing import research_storage
 from pricing.utils.parsing import parse_decimal
 from pricing.services.offer_engine import round_price
+from pricing.services.session_patch import (
+    JsonPatchError,
+    SessionDataConflict,
+    apply_session_data_patch,
+    materialize_session_data,
+    replace_session_data,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -50,15 +59,15 @@ def _resolve_cex_sku_to_variant(item_payload):
         pass
 
 
-def _create_stock_session_line_from_payload(
+def _build_stock_session_line(
     session,
     item_data,
     idx,
     *,
     parent_fk_field: str,
     line_model,
-    ingest_post_create,
 ):
+    """Validate one items_data entry and return the unsaved line row."""
     barcode = (item_data.get('barcode') or '').strip()
     if not barcode:
         raise ValueError(f"items_data[{idx}].barcode is required")
@@ -83,38 +92,107 @@ def _create_stock_session_line_from_payload(
             item_data.get('our_sale_price_at_repricing'), 'our_sale_price_at_repricing'
         ),
     }
-    line = line_model.objects.create(**kwargs)
-    ingest_post_create(
-        line,
+    return line_model(**kwargs)
+
+
+def _research_payloads(item_data):
+    """(raw_data, cash_converters_data, cg_data) from an items_data entry."""
+    return (
         item_data.get('raw_data'),
         item_data.get('cash_converters_data'),
         item_data.get('cg_data'),
     )
-    return line
 
 
-def _create_repricing_session_item_from_payload(session, item_data, idx):
-    return _create_stock_session_line_from_payload(
+def _bulk_insert_stock_session_lines(lines, item_payloads):
+    """
+    INSERT already-validated line rows with one bulk_create, then store their
+    market research with one bulk write per table. ``item_payloads`` are the
+    items_data entries the lines were built from, in the same order.
+    """
+    if not lines:
+        return lines
+    type(lines[0]).objects.bulk_create(lines, batch_size=500)
+    research_storage.bulk_ingest_stock_session_research(
+        [(line, *_research_payloads(item_data)) for line, item_data in zip(lines, item_payloads)]
+    )
+    return lines
+
+
+def _bulk_create_stock_session_lines(session, items_data, *, parent_fk_field: str, line_model):
+    """
+    Build, insert and ingest research for a whole items_data list. Every entry
+    is validated first, so a ValueError leaves nothing written.
+    """
+    lines = [
+        _build_stock_session_line(
+            session, item_data, idx, parent_fk_field=parent_fk_field, line_model=line_model
+        )
+        for idx, item_data in enumerate(items_data)
+    ]
+    return _bulk_insert_stock_session_lines(lines, items_data)
+
+
+def _bulk_create_repricing_session_items_from_payload(session, items_data):
+    return _bulk_create_stock_session_lines(
         session,
-        item_data,
-        idx,
+        items_data,
         parent_fk_field="repricing_session",
         line_model=RepricingSessionItem,
-        ingest_post_create=research_storage.ingest_repricing_line_post_create,
     )
 
 
-def _create_upload_session_item_from_payload(session, item_data, idx):
-    return _create_stock_session_line_from_payload(
+def _bulk_create_upload_session_items_from_payload(session, items_data):
+    return _bulk_create_stock_session_lines(
         session,
-        item_data,
-        idx,
+        items_data,
         parent_fk_field="upload_session",
         line_model=UploadSessionItem,
-        ingest_post_create=research_storage.ingest_upload_line_post_create,
     )
 
 
+def _save_session_data_from_payload(session, data):
+    """
+    Persist a repricing/upload session_data autosave from a PATCH body.
+
+    ``session_data_patch`` (RFC 6902 ops) + ``session_data_version`` applies a
+    delta; ``session_data`` replaces the whole blob (version optional). Returns
+    an error Response (400 / 409 with the current version) or None.
+    """
+    if 'session_data_patch' not in data and 'session_data' not in data:
+        return None
+
+    raw_version = data.get('session_data_version')
+    base_version = None
+    if raw_version is not None:
+        try:
+            base_version = int(raw_version)
+        except (TypeError, ValueError):
+            return Response({"error": "session_data_version must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        if 'session_data_patch' in data:
+            if base_version is None:
+                return Response(
+                    {"error": "session_data_version is required with session_data_patch"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            apply_session_data_patch(session, base_version, data['session_data_patch'])
+        else:
+            replace_session_data(session, data['session_data'], base_version)
+    except SessionDataConflict as exc:
+        return Response(
+            {
+                "detail": "session_data has changed since this version; reload before saving",
+                "session_data_version": exc.current_version,
+            },
+            status=status.HTTP_409_CONFLICT,
+        )
+    except JsonPatchError as exc:
+        return Response({"error": f"Invalid session_data_patch: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
+    return None
+
+
 def _sync_upload_session_items_from_session_snapshot(session):
     """
     Create missing UploadSessionItem rows from session_data.items + barcodes.
@@ -122,9 +200,10 @@ def _sync_upload_session_items_from_session_snapshot(session):
     Draft autosave only PATCHes session_data (no items_data), so DB line rows
     did not exist until completion — but the Web EPOS proceed flow needs
     upload_session_item_id on each row. This keeps DB lines in sync with the
-    snapshot whenever the session is saved.
+    snapshot whenever the session is saved. Missing rows are diffed against
+    the existing identifiers in one query and inserted in bulk.
     """
-    session_data = session.session_data
+    session_data = materialize_session_data(session)
     if not isinstance(session_data, dict):
         return
     items = session_data.get('items') or []
@@ -140,6 +219,8 @@ def _sync_upload_session_items_from_session_snapshot(session):
     existing_ids = set(
         UploadSessionItem.objects.filter(upload_session=session).values_list('item_identifier', flat=True)
     )
+    new_lines = []
+    new_payloads = []
 
     for item in items:
         if not isinstance(item, dict):
@@ -198,11 +279,17 @@ def _sync_upload_session_items_from_session_snapshot(session):
             'cg_data': raw_cg if isinstance(raw_cg, dict) else {},
         }
         try:
-            _create_upload_session_item_from_payload(session, item_data, 0)
+            line = _build_stock_session_line(
+                session, item_data, 0, parent_fk_field="upload_session", line_model=UploadSessionItem
+            )
         except ValueError:
             continue
+        new_lines.append(line)
+        new_payloads.append(item_data)
         existing_ids.add(iid)
 
+    _bulk_insert_stock_session_lines(new_lines, new_payloads)
+
 
 def _sync_request_jewellery_reference_snapshot(existing_request, jewellery_reference_scrape):
     """
@@ -4,22 +4,38 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 
-from pricing.models_v2 import Customer
+from pricing.models_v2 import Customer, CustomerStats
 from pricing.serializers import CustomerSerializer
+from pricing.services.customer_search import DEFAULT_LIMIT, search_customers
 
 logger = logging.getLogger(__name__)
 
 
+def _customer_stats(customer):
+    try:
+        return customer.stats.as_dict()
+    except CustomerStats.DoesNotExist:
+        return CustomerStats(customer=customer).as_dict()
+
+
 @api_view(['GET', 'POST'])
 def customers_view(request):
     if request.method == 'GET':
-        customers = Customer.objects.all()
+        customers = Customer.objects.select_related("stats")
         nospos_q = request.query_params.get('nospos_customer_id')
+        search_q = request.query_params.get('search') or request.query_params.get('q')
         if nospos_q is not None and str(nospos_q).strip() != '':
             try:
                 customers = customers.filter(nospos_customer_id=int(nospos_q))
             except (TypeError, ValueError):
                 customers = Customer.objects.none()
+        elif search_q is not None:
+            # Ranked prefix search on phone / name / email; see customer_search.
+            try:
+                limit = int(request.query_params.get('limit') or DEFAULT_LIMIT)
+            except (TypeError, ValueError):
+                return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            customers = search_customers(search_q, limit=limit)
         data = [
             {
                 "id": c.customer_id,
@@ -56,7 +72,7 @@ def customers_view(request):
 def customer_detail(request, customer_id):
     """Get or update a single customer."""
     try:
-        customer = Customer.objects.get(customer_id=customer_id)
+        customer = Customer.objects.select_related("stats").get(customer_id=customer_id)
     except Customer.DoesNotExist:
         return Response({"error": "Customer not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -69,6 +85,7 @@ def customer_detail(request, customer_id):
             "address": customer.address or "",
             "cancel_rate": customer.cancel_rate,
             "nospos_customer_id": customer.nospos_customer_id,
+            "stats": _customer_stats(customer),
         }
         return Response(data)
 
@@ -4,7 +4,7 @@ import html
 import logging
 import re
 from typing import Iterable, List
-from urllib.parse import parse_qs, quote, urlparse
+from urllib.parse import parse_qs, urlparse
 
 import requests as http_requests
 from bs4 import BeautifulSoup
@@ -16,6 +16,10 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 
+from pricing.services.postcode_cache import PostcodeLookupError, lookup_addresses
+from pricing.services.postcode_cache import cache_stats as postcode_cache_stats
+from pricing.services.webepos_sync import sync_webepos_categories
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,45 +31,26 @@ def react_app(request):
 
 @api_view(['GET'])
 def address_lookup(request, postcode):
-    """Proxy to Ideal Postcodes postcode lookup API."""
+    """Proxy to Ideal Postcodes postcode lookup API, answered from the postcode cache when possible."""
     api_key = (getattr(settings, 'IDEAL_POSTCODES_API_KEY', '') or '').strip()
     if not api_key:
         return Response(
             {'error': 'Address lookup not configured. Set IDEAL_POSTCODES_API_KEY in .env.'},
             status=status.HTTP_503_SERVICE_UNAVAILABLE
         )
-    postcode_clean = (postcode or '').strip()
-    if not postcode_clean or len(postcode_clean.replace(' ', '')) < 4:
-        return Response({'addresses': []})
     try:
-        url = f"https://api.ideal-postcodes.co.uk/v1/postcodes/{quote(postcode_clean)}?api_key={api_key}"
-        resp = http_requests.get(url, timeout=10)
-        if resp.status_code == 401:
-            logger.warning('Ideal Postcodes 401: invalid API key')
-            return Response(
-                {'error': 'Invalid Ideal Postcodes API key. Check your key at https://ideal-postcodes.co.uk/'},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-        if resp.status_code == 402:
-            logger.warning('Ideal Postcodes 402: no lookups remaining')
-            return Response(
-                {'error': 'Address lookup limit reached. Top up at https://ideal-postcodes.co.uk/'},
-                status=status.HTTP_402_PAYMENT_REQUIRED
-            )
-        if resp.status_code == 404:
-            return Response({'addresses': []})
-        resp.raise_for_status()
-        data = resp.json()
-        result = data.get('result', [])
-        if not isinstance(result, list):
-            result = [result] if result else []
-        return Response({'addresses': result})
-    except http_requests.RequestException as e:
-        logger.warning('Ideal Postcodes postcode lookup failed: %s', e)
-        return Response(
-            {'error': str(e) if hasattr(e, 'message') else 'Address lookup failed'},
-            status=status.HTTP_502_BAD_GATEWAY
-        )
+        addresses, cache_state = lookup_addresses(postcode, api_key)
+    except PostcodeLookupError as e:
+        return Response({'error': str(e)}, status=e.status_code)
+    response = Response({'addresses': addresses})
+    response['X-Postcode-Cache'] = cache_state
+    return response
+
+
+@api_view(['GET'])
+def address_lookup_cache_stats(request):
+    """Postcode cache hit-rate counters (this process) and table totals."""
+    return Response(postcode_cache_stats())
 
 
 _CG_RETAIL_CATEGORY_UA = (
@@ -371,7 +356,8 @@ def webepos_categories_view(request):
     GET: flat list of rows from `webepos_categories`.
     POST: body `{ nodes: [{ webepos_uuid, name, parent_webepos_uuid?, level }] }`
       → upsert by `webepos_uuid`, setting name/level/parent on each pass. Parents
-      are resolved after all nodes exist so the input order doesn't matter.
+      are resolved after all nodes exist so the input order doesn't matter; the
+      merge is one read plus bulk writes (services.webepos_sync).
     """
     from pricing.models_v2 import WebEposCategory
 
@@ -387,62 +373,27 @@ def webepos_categories_view(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    added = 0
-    updated = 0
-    parent_uuid_by_child_uuid: dict[str, str] = {}
-
-    with transaction.atomic():
-        for raw in nodes:
-            if not isinstance(raw, dict):
-                continue
-            uuid = str(raw.get('webepos_uuid') or '').strip()
-            name = str(raw.get('name') or '').strip()
-            if not uuid or not name:
-                continue
-            level_raw = raw.get('level')
-            try:
-                level = max(1, int(level_raw)) if level_raw is not None else 1
-            except (TypeError, ValueError):
-                level = 1
-            parent_uuid = str(raw.get('parent_webepos_uuid') or '').strip() or None
-            if parent_uuid:
-                parent_uuid_by_child_uuid[uuid] = parent_uuid
-
-            obj = WebEposCategory.objects.filter(webepos_uuid=uuid).first()
-            if obj is None:
-                WebEposCategory.objects.create(
-                    webepos_uuid=uuid,
-                    name=name,
-                    level=level,
-                    parent_category=None,
-                )
-                added += 1
-            else:
-                changed = False
-                if obj.name != name:
-                    obj.name = name
-                    changed = True
-                if obj.level != level:
-                    obj.level = level
-                    changed = True
-                if changed:
-                    obj.save(update_fields=['name', 'level'])
-                    updated += 1
-
-        # Second pass: wire parents now that every node exists.
-        if parent_uuid_by_child_uuid:
-            pk_by_uuid = dict(
-                WebEposCategory.objects.filter(
-                    webepos_uuid__in=set(parent_uuid_by_child_uuid.keys())
-                    | set(parent_uuid_by_child_uuid.values())
-                ).values_list('webepos_uuid', 'pk')
-            )
-            for child_uuid, parent_uuid in parent_uuid_by_child_uuid.items():
-                child_pk = pk_by_uuid.get(child_uuid)
-                parent_pk = pk_by_uuid.get(parent_uuid)
-                if child_pk is None:
-                    continue
-                WebEposCategory.objects.filter(pk=child_pk).update(parent_category_id=parent_pk)
+    rows = []
+    for raw in nodes:
+        if not isinstance(raw, dict):
+            continue
+        uuid = str(raw.get('webepos_uuid') or '').strip()
+        name = str(raw.get('name') or '').strip()
+        if not uuid or not name:
+            continue
+        level_raw = raw.get('level')
+        try:
+            level = max(1, int(level_raw)) if level_raw is not None else 1
+        except (TypeError, ValueError):
+            level = 1
+        rows.append({
+            'webepos_uuid': uuid,
+            'name': name,
+            'level': level,
+            'parent_webepos_uuid': str(raw.get('parent_webepos_uuid') or '').strip() or None,
+        })
+
+    result = sync_webepos_categories(rows)
 
     qs = WebEposCategory.objects.all().order_by('level', 'name')
     return Response(
@@ -450,7 +401,9 @@ def webepos_categories_view(request):
             'ok': True,
             'rows': _webepos_category_rows(qs),
             'source': 'scrape',
-            'added': added,
-            'updated': updated,
+            'added': result.created,
+            'updated': result.updated,
+            'relinked': result.relinked,
+            'timings_ms': result.timings_ms,
         }
     )
@@ -1,9 +1,13 @@
 import re
+import json
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
 import requests as http_requests
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
@@ -17,32 +21,32 @@ from pricing.utils.cashconverters_filters import (
     build_cashconverters_url,
     convert_facet_groups_to_filters,
 )
+from pricing.services.cex_client import fetch_cex_box_detail
+from pricing.services.facet_cache import (
+    cashconverters_facet_cache,
+    ebay_facet_cache,
+    params_cache_key,
+    url_cache_key,
+)
+from pricing.services.marketplace_http import cashconverters_client, ebay_client
 
 logger = logging.getLogger(__name__)
 
 
-@api_view(['GET'])
-def get_ebay_filters(request):
-    search_term = request.GET.get("q", "").strip()
-    ebay_search_url = request.GET.get("url", "").strip()
-    category_path = request.GET.getlist("category_path")
+class _UpstreamError(Exception):
+    """Marketplace call failed; the message is returned to the client with a 502."""
 
-    if not search_term and not ebay_search_url:
-        return Response(
-            {"success": False, "error": "Provide either q or url"},
-            status=status.HTTP_400_BAD_REQUEST
-        )
 
-    ebay_url = "https://www.ebay.co.uk/sch/ajax/refine"
+EBAY_REFINE_URL = "https://www.ebay.co.uk/sch/ajax/refine"
+
 
+def _ebay_refine_params(search_term: str, ebay_search_url: str, category_path: list[str]) -> dict:
+    """Refine API params for a search URL or term; raises ValueError for an unparseable URL."""
     if ebay_search_url:
         try:
             params = extract_ebay_search_params(ebay_search_url)
-        except Exception:
-            return Response(
-                {"success": False, "error": "Invalid eBay URL"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        except Exception as e:
+            raise ValueError("Invalid eBay URL") from e
     else:
         if category_path:
             ebay_search_url = build_ebay_search_url(search_term, category_path)
@@ -54,53 +58,71 @@ def get_ebay_filters(request):
             params = {"_nkw": search_term, "_sacat": 0, "_fsrp": 1, "rt": "nc"}
 
     params.update({"modules": "SEARCH_REFINEMENTS_MODEL_V2:fa", "no_encode_refine_params": 1})
+    return params
 
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
-        ),
-        "Accept": "application/json",
-        "Accept-Language": "en-GB,en;q=0.9",
-        "Referer": "https://www.ebay.co.uk/",
-    }
 
-    session = http_requests.Session()
-    session.headers.update(headers)
-    session.get("https://www.ebay.co.uk/", timeout=10)
+def _fetch_ebay_filters(params: dict, timeout: float = 20) -> tuple[list, str]:
+    """(filters, cache state) for refine params; raises _UpstreamError on upstream failure."""
+    def fetch_filters():
+        try:
+            response = ebay_client.get(EBAY_REFINE_URL, params=params, timeout=timeout)
+            logger.debug("eBay request sent to: %s", response.url)
+            response.raise_for_status()
+        except http_requests.RequestException as e:
+            raise _UpstreamError(str(e)) from e
 
-    try:
-        response = session.get(ebay_url, params=params, timeout=20)
-        logger.debug("eBay request sent to: %s", response.url)
-        response.raise_for_status()
-    except http_requests.RequestException as e:
-        return Response({"success": False, "error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        data = response.json()
 
-    data = response.json()
+        refinements_module = None
+        if data.get("_type") == "SearchRefinementsModule":
+            refinements_module = data
+        else:
+            for module in data.get("modules", []):
+                if module.get("_type") == "SearchRefinementsModule":
+                    refinements_module = module
+                    break
 
-    refinements_module = None
-    if data.get("_type") == "SearchRefinementsModule":
-        refinements_module = data
-    else:
-        for module in data.get("modules", []):
-            if module.get("_type") == "SearchRefinementsModule":
-                refinements_module = module
-                break
+        if not refinements_module:
+            raise _UpstreamError("No refinements module found")
+
+        return extract_filters(refinements_module)
+
+    return ebay_facet_cache.get_or_compute(params_cache_key("ebay", params), fetch_filters)
+
+
+@api_view(['GET'])
+def get_ebay_filters(request):
+    search_term = request.GET.get("q", "").strip()
+    ebay_search_url = request.GET.get("url", "").strip()
+    category_path = request.GET.getlist("category_path")
+
+    if not search_term and not ebay_search_url:
+        return Response(
+            {"success": False, "error": "Provide either q or url"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-    if not refinements_module:
+    try:
+        params = _ebay_refine_params(search_term, ebay_search_url, category_path)
+    except ValueError as e:
         return Response(
-            {"success": False, "error": "No refinements module found"},
-            status=status.HTTP_502_BAD_GATEWAY
+            {"success": False, "error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
         )
 
-    filters = extract_filters(refinements_module)
+    try:
+        filters, cache_state = _fetch_ebay_filters(params)
+    except _UpstreamError as e:
+        return Response({"success": False, "error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
 
-    return JsonResponse({
+    response = JsonResponse({
         "success": True,
         "source": "url" if ebay_search_url else "query",
         "query": search_term or params.get("_nkw"),
         "filters": filters,
     })
+    response["X-Facet-Cache"] = cache_state
+    return response
 
 
 @api_view(['GET'])
@@ -122,142 +144,101 @@ def get_cashconverters_filters(request):
 
     logger.debug("CashConverters filters API URL: %s", api_url)
 
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
-        ),
-        "Accept": "application/json",
-        "Accept-Language": "en-GB,en;q=0.9",
-        "Referer": "https://www.cashconverters.co.uk/",
-    }
+    def fetch_filters():
+        try:
+            response = cashconverters_client.get(api_url, timeout=20)
+            logger.debug("Cash Converters filters request sent to: %s", response.url)
+            response.raise_for_status()
+        except http_requests.RequestException as e:
+            raise _UpstreamError(str(e)) from e
 
-    session = http_requests.Session()
-    session.headers.update(headers)
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise _UpstreamError(f"Invalid JSON response: {str(e)}") from e
 
-    try:
-        response = session.get(api_url, timeout=20)
-        logger.debug("Cash Converters filters request sent to: %s", response.url)
-        response.raise_for_status()
-    except http_requests.RequestException as e:
-        return Response({"success": False, "error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        if not data.get("WasSuccessful", False):
+            raise _UpstreamError(
+                data.get("Message", "Cash Converters API returned unsuccessful response")
+            )
 
-    try:
-        data = response.json()
-    except ValueError as e:
-        return Response(
-            {"success": False, "error": f"Invalid JSON response: {str(e)}"},
-            status=status.HTTP_502_BAD_GATEWAY
-        )
+        value = data.get("Value", {})
+        upper_facets = value.get("UpperFacetGroupList", [])
+        lower_facets = value.get("LowerFacetGroupList", [])
+        return convert_facet_groups_to_filters(upper_facets, lower_facets)
 
-    if not data.get("WasSuccessful", False):
-        return Response(
-            {"success": False, "error": data.get("Message", "Cash Converters API returned unsuccessful response")},
-            status=status.HTTP_502_BAD_GATEWAY
+    try:
+        filters, cache_state = cashconverters_facet_cache.get_or_compute(
+            url_cache_key("cashconverters", api_url), fetch_filters
         )
+    except _UpstreamError as e:
+        return Response({"success": False, "error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
 
-    value = data.get("Value", {})
-    upper_facets = value.get("UpperFacetGroupList", [])
-    lower_facets = value.get("LowerFacetGroupList", [])
-    filters = convert_facet_groups_to_filters(upper_facets, lower_facets)
-
-    return JsonResponse({
+    response = JsonResponse({
         "success": True,
         "source": "url" if cashconverters_url else "query",
         "query": search_term or "unknown",
         "filters": filters,
     })
+    response["X-Facet-Cache"] = cache_state
+    return response
+
+
+def _cashconverters_results_api_url(search_url: str, page) -> str:
+    """Translate a Cash Converters search-results URL into its results API URL for one page."""
+    parsed = urlparse(search_url)
+    params = parse_qs(parsed.query, keep_blank_values=True)
+
+    api_params = {}
+    for key, values in params.items():
+        match = re.match(r'f\[([^\]]+)\]\[(\d+)\]', key)
+        if match:
+            filter_name = match.group(1)
+            if filter_name not in ['category', 'locations']:
+                if filter_name not in api_params:
+                    api_params[filter_name] = []
+                api_params[filter_name].extend(values)
+        else:
+            api_params[key] = values
 
+    for key in api_params:
+        if isinstance(api_params[key], list) and len(api_params[key]) == 1:
+            api_params[key] = api_params[key][0]
 
-@api_view(['GET'])
-def get_cashconverters_results(request):
-    """Fetch Cash Converters results for a specific page."""
-    search_url = request.GET.get("url", "").strip()
-    page = request.GET.get("page", "1")
-    fetch_only_first_page = request.GET.get("fetch_only_first_page", "false").lower() == "true"
-
-    if not search_url:
-        return Response(
-            {"success": False, "error": "url parameter is required"},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-
-    try:
-        parsed = urlparse(search_url)
-        params = parse_qs(parsed.query, keep_blank_values=True)
-
-        api_params = {}
-        for key, values in params.items():
-            match = re.match(r'f\[([^\]]+)\]\[(\d+)\]', key)
-            if match:
-                filter_name = match.group(1)
-                if filter_name not in ['category', 'locations']:
-                    if filter_name not in api_params:
-                        api_params[filter_name] = []
-                    api_params[filter_name].extend(values)
-            else:
-                api_params[key] = values
-
-        for key in api_params:
-            if isinstance(api_params[key], list) and len(api_params[key]) == 1:
-                api_params[key] = api_params[key][0]
-
-        if 'Sort' not in api_params:
-            api_params['Sort'] = 'default'
-        api_params['page'] = page
-
-        if "search-results" in search_url:
-            api_path = parsed.path.replace("search-results", "c3api/search/results")
-        else:
-            api_path = parsed.path
-
-        query_string = urlencode(api_params, doseq=True)
-        api_url = urlunparse((
-            parsed.scheme or 'https',
-            parsed.netloc or 'www.cashconverters.co.uk',
-            api_path, '', query_string, ''
-        ))
-        logger.debug("CashConverters results API URL: %s (page=%s)", api_url, page)
+    if 'Sort' not in api_params:
+        api_params['Sort'] = 'default'
+    api_params['page'] = str(page)
 
-    except Exception as e:
-        return Response(
-            {"success": False, "error": f"Invalid URL format: {str(e)}"},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    if "search-results" in search_url:
+        api_path = parsed.path.replace("search-results", "c3api/search/results")
+    else:
+        api_path = parsed.path
 
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
-        ),
-        "Accept": "application/json",
-        "Accept-Language": "en-GB,en;q=0.9",
-        "Referer": "https://www.cashconverters.co.uk/",
-    }
+    query_string = urlencode(api_params, doseq=True)
+    return urlunparse((
+        parsed.scheme or 'https',
+        parsed.netloc or 'www.cashconverters.co.uk',
+        api_path, '', query_string, ''
+    ))
 
-    session = http_requests.Session()
-    session.headers.update(headers)
 
+def _fetch_cashconverters_results_page(api_url: str, timeout: float = 20) -> list[dict]:
+    """One results page as research rows; raises _UpstreamError on any upstream failure."""
     try:
-        response = session.get(api_url, timeout=20)
-        mode = "first page only" if fetch_only_first_page else "all pages"
-        logger.debug("Cash Converters results request sent to: %s (mode: %s)", response.url, mode)
+        response = cashconverters_client.get(api_url, timeout=timeout)
+        logger.debug("Cash Converters results request sent to: %s", response.url)
         response.raise_for_status()
     except http_requests.RequestException as e:
-        return Response({"success": False, "error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        raise _UpstreamError(str(e)) from e
 
     try:
         data = response.json()
     except ValueError as e:
-        return Response(
-            {"success": False, "error": f"Invalid JSON response: {str(e)}"},
-            status=status.HTTP_502_BAD_GATEWAY
-        )
+        raise _UpstreamError(f"Invalid JSON response: {str(e)}") from e
 
     if not data.get("WasSuccessful", False):
-        return Response(
-            {"success": False, "error": data.get("Message", "Cash Converters API returned unsuccessful response")},
-            status=status.HTTP_502_BAD_GATEWAY
+        raise _UpstreamError(
+            data.get("Message", "Cash Converters API returned unsuccessful response")
         )
 
     value = data.get("Value", {})
@@ -286,6 +267,115 @@ def get_cashconverters_results(request):
             "url": url if url.startswith("http") else f"https://www.cashconverters.co.uk{url}",
             "image": image
         })
+    return results
+
+
+def _stream_cashconverters_pages(search_url: str, first_page: int, page_count: int):
+    """
+    Fetch ``page_count`` pages concurrently and yield NDJSON lines as each
+    page completes. Rows already sent under the same ``Code`` are dropped.
+    A failed page yields an ``error`` line and the others still stream. The
+    final ``done`` line summarises the run.
+    """
+    concurrency = max(1, min(page_count, getattr(settings, "CASHCONVERTERS_PAGE_CONCURRENCY", 4)))
+    pages = list(range(first_page, first_page + page_count))
+    seen: set = set()
+    completed, failed, total = [], [], 0
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="cc-pages")
+    try:
+        futures = {
+            executor.submit(_fetch_cashconverters_results_page, _cashconverters_results_api_url(search_url, p)): p
+            for p in pages
+        }
+        for future in as_completed(futures):
+            page = futures[future]
+            try:
+                rows = future.result()
+            except _UpstreamError as e:
+                failed.append(page)
+                yield json.dumps({"type": "error", "page": page, "error": str(e)}) + "\n"
+                continue
+            fresh = []
+            for row in rows:
+                key = row["stable_id"] or (row["title"], row["url"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                fresh.append(row)
+            completed.append(page)
+            total += len(fresh)
+            yield json.dumps({
+                "type": "page", "page": page, "results": fresh, "total_items": len(fresh),
+            }) + "\n"
+    finally:
+        # Client gone or iteration finished: don't start pages nobody will read.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    yield json.dumps({
+        "type": "done",
+        "success": not failed,
+        "pages": sorted(completed),
+        "failed_pages": sorted(failed),
+        "total_items": total,
+    }) + "\n"
+
+
+@api_view(['GET'])
+def get_cashconverters_results(request):
+    """
+    Fetch Cash Converters results for a specific page, or with ``pages=N``
+    stream pages ``page``…``page+N-1`` as NDJSON while they are fetched
+    concurrently (see ``_stream_cashconverters_pages``). The research table
+    still requests one page at a time; the stream is for callers that read it.
+    """
+    search_url = request.GET.get("url", "").strip()
+    page = request.GET.get("page", "1")
+    fetch_only_first_page = request.GET.get("fetch_only_first_page", "false").lower() == "true"
+
+    if not search_url:
+        return Response(
+            {"success": False, "error": "url parameter is required"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        api_url = _cashconverters_results_api_url(search_url, page)
+        logger.debug("CashConverters results API URL: %s (page=%s)", api_url, page)
+    except Exception as e:
+        return Response(
+            {"success": False, "error": f"Invalid URL format: {str(e)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    pages_param = request.GET.get("pages")
+    if pages_param and not fetch_only_first_page:
+        try:
+            first_page = int(page)
+            page_count = int(pages_param)
+        except ValueError:
+            return Response(
+                {"success": False, "error": "page and pages must be integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_pages = getattr(settings, "CASHCONVERTERS_MAX_PAGES", 10)
+        if first_page < 1 or not 1 <= page_count <= max_pages:
+            return Response(
+                {"success": False, "error": f"pages must be between 1 and {max_pages}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        response = StreamingHttpResponse(
+            _stream_cashconverters_pages(search_url, first_page, page_count),
+            content_type="application/x-ndjson",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    try:
+        results = _fetch_cashconverters_results_page(api_url)
+    except _UpstreamError as e:
+        return Response({"success": False, "error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
 
     return JsonResponse({
         "success": True,
@@ -293,3 +383,153 @@ def get_cashconverters_results(request):
         "results": results,
         "total_items": len(results)
     })
+
+
+COMPARABLES_DEFAULT_TIMEOUTS = {"cex": 5, "cashconverters": 8, "ebay": 8}
+
+def _comparables_timeout(source: str) -> float:
+    return float(getattr(
+        settings, f"COMPARABLES_{source.upper()}_TIMEOUT_SECONDS", COMPARABLES_DEFAULT_TIMEOUTS[source],
+    ))
+
+
+def _cex_comparables(cex_sku: str) -> dict:
+    box = fetch_cex_box_detail(cex_sku, timeout=_comparables_timeout("cex"))
+    if box is None:
+        raise _UpstreamError(f"No CeX box detail for {cex_sku}")
+    image_urls = box.get("imageUrls") or {}
+    return {
+        "results": [{
+            "competitor": "CeX",
+            "stable_id": cex_sku,
+            "title": box.get("boxName") or cex_sku,
+            "price": float(box.get("sellPrice") or 0),
+            "cash_price": float(box.get("cashPrice") or 0),
+            "exchange_price": float(box.get("exchangePrice") or 0),
+            "out_of_stock": bool(box.get("outOfStock", 0)),
+            "description": "",
+            "condition": "",
+            "store": "",
+            "url": f"https://uk.webuy.com/product-detail?id={cex_sku}",
+            "image": image_urls.get("large") or image_urls.get("medium") or image_urls.get("small"),
+        }],
+    }
+
+
+def _cashconverters_comparables(search_url: str) -> dict:
+    results = _fetch_cashconverters_results_page(
+        _cashconverters_results_api_url(search_url, 1), timeout=_comparables_timeout("cashconverters"),
+    )
+    return {"results": results}
+
+
+def _ebay_comparables(params: dict) -> dict:
+    filters, cache_state = _fetch_ebay_filters(params, timeout=_comparables_timeout("ebay"))
+    return {"filters": filters, "cache": cache_state}
+
+
+def _timed(fn, *args):
+    started = time.monotonic()
+    try:
+        return fn(*args), None, (time.monotonic() - started) * 1000
+    except _UpstreamError as e:
+        return None, str(e), (time.monotonic() - started) * 1000
+    except Exception as e:  # noqa: BLE001 — one source must not sink the others
+        logger.exception("[Comparables] %s failed", getattr(fn, "__name__", fn))
+        return None, f"{type(e).__name__}: {e}", (time.monotonic() - started) * 1000
+
+
+@api_view(['GET'])
+def get_marketplace_comparables(request):
+    """
+    CeX box detail, Cash Converters first results page and eBay filters for
+    one item in a single call. Sources run concurrently, each bounded by its
+    COMPARABLES_<SOURCE>_TIMEOUT_SECONDS. A source that fails or times out is
+    reported in its ``sources`` entry while the others are still returned.
+    Sources without the input they need (``cex_sku``; ``q`` or a source URL)
+    are ``skipped``.
+    """
+    search_term = request.GET.get("q", "").strip()
+    category_path = request.GET.getlist("category_path")
+    cex_sku = request.GET.get("cex_sku", "").strip()
+    ebay_url = request.GET.get("ebay_url", "").strip()
+    cashconverters_url = request.GET.get("cashconverters_url", "").strip()
+
+    if not (search_term or cex_sku or ebay_url or cashconverters_url):
+        return Response(
+            {"success": False, "error": "Provide q, cex_sku, ebay_url or cashconverters_url"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    jobs = {}
+    if cex_sku:
+        jobs["cex"] = (_cex_comparables, cex_sku)
+    if cashconverters_url or search_term:
+        jobs["cashconverters"] = (
+            _cashconverters_comparables,
+            cashconverters_url or build_cashconverters_url(search_term, category_path or None),
+        )
+    if ebay_url or search_term:
+        try:
+            jobs["ebay"] = (_ebay_comparables, _ebay_refine_params(search_term, ebay_url, category_path))
+        except ValueError as e:
+            return Response(
+                {"success": False, "error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    started = time.monotonic()
+    # A pool per call, so one request's slow sources never queue another's.
+    # Upstream clients share the per-source budget as their timeout, so a source
+    # that misses it finishes shortly after and is discarded (a late eBay answer
+    # still lands in the facet cache for the next call).
+    executor = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="comparables")
+    futures = {
+        source: executor.submit(_timed, fn, arg)
+        for source, (fn, arg) in jobs.items()
+    }
+    executor.shutdown(wait=False)
+    # Sources run concurrently, so waiting on each up to its own absolute
+    # deadline never holds the response past the slowest budget.
+    for source, future in futures.items():
+        wait([future], timeout=max(0.0, started + _comparables_timeout(source) - time.monotonic()))
+
+    sources = {}
+    results = []
+    for source in COMPARABLES_DEFAULT_TIMEOUTS:
+        future = futures.get(source)
+        if future is None:
+            sources[source] = {"status": "skipped", "latency_ms": None}
+            continue
+        budget = _comparables_timeout(source)
+        if future.done():
+            data, error, latency_ms = future.result()
+        else:
+            data, error, latency_ms = None, None, None
+        if latency_ms is None or latency_ms > budget * 1000:
+            sources[source] = {"status": "timeout", "latency_ms": None, "error": f"No response within {budget:g}s"}
+            continue
+        latency_ms = round(latency_ms, 1)
+        if error is not None:
+            sources[source] = {"status": "error", "latency_ms": latency_ms, "error": error}
+            continue
+        sources[source] = {"status": "ok", "latency_ms": latency_ms, **{k: v for k, v in data.items() if k != "results"}}
+        if "results" in data:
+            sources[source]["total_items"] = len(data["results"])
+            results.extend(data["results"])
+
+    ok = [s for s, info in sources.items() if info["status"] == "ok"]
+    failed = [s for s, info in sources.items() if info["status"] in ("error", "timeout")]
+    logger.info(
+        "[Comparables] q=%r sku=%r ok=%s failed=%s in %.0f ms",
+        search_term, cex_sku, ok, failed, (time.monotonic() - started) * 1000,
+    )
+    return JsonResponse({
+        "success": bool(ok),
+        "partial": bool(ok) and bool(failed),
+        "query": search_term,
+        "results": results,
+        "total_items": len(results),
+        "sources": sources,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+    }, status=200 if ok else status.HTTP_502_BAD_GATEWAY)
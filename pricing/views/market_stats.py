@@ -10,6 +10,7 @@ from django.db import transaction
 from django.http import JsonResponse
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models import OuterRef, Subquery, Max, Prefetch
+from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 
 from rest_framework.decorators import api_view
@@ -36,6 +37,7 @@ from pricing.models_v2 import (
     RequestJewelleryReferenceSnapshot,
     CustomerRuleSettings,
     CustomerOfferRule,
+    VariantPriceMovement,
 )
 from pricing import research_storage
 from pricing.buying_decimal import parse_optional_money
@@ -49,6 +51,7 @@ from pricing.services.offer_engine import (
 )
 from pricing.utils.parsing import parse_decimal, coerce_bool
 from pricing.services.cex_client import fetch_cex_box_detail as _fetch_cex_box_detail
+from pricing.services.cex_prices import resolve_cex_reference_prices
 
 from pricing.serializers import (
     RequestSerializer,
@@ -67,9 +70,6 @@ from pricing.views._shared import (
     _is_jewellery_placeholder_variant,
     _resolve_cex_sku_to_variant,
     _decimal_or_none,
-    _create_stock_session_line_from_payload,
-    _create_repricing_session_item_from_payload,
-    _create_upload_session_item_from_payload,
     _sync_upload_session_items_from_session_snapshot,
     _sync_request_jewellery_reference_snapshot,
     _get_category_and_descendant_ids,
@@ -105,21 +105,18 @@ def variant_prices(request):
             status=status.HTTP_404_NOT_FOUND
         )
 
-    # --- Reference Data (prefer live CEX API, fallback to DB) ---
-    cex_box = _fetch_cex_box_detail(sku)
-    if cex_box is not None:
-        cex_sale_price = float(cex_box.get("sellPrice", 0) or variant.current_price_gbp)
-        cex_tradein_cash = float(cex_box.get("cashPrice", 0) or variant.tradein_cash)
-        cex_tradein_voucher = float(cex_box.get("exchangePrice", 0) or variant.tradein_voucher)
-        image_urls = cex_box.get("imageUrls") or {}
-        # CeX Box API uses `outOfStock` as an integer (0 or 1)
-        cex_out_of_stock = bool(cex_box.get("outOfStock", 0))
-    else:
-        cex_sale_price = float(variant.current_price_gbp)
-        cex_tradein_cash = float(variant.tradein_cash)
-        cex_tradein_voucher = float(variant.tradein_voucher)
-        image_urls = {}
-        cex_out_of_stock = bool(variant.cex_out_of_stock)
+    # --- Reference Data (stored price while fresh, else live CEX API written back to DB) ---
+    applicable_rule = variant.get_applicable_rule()
+    cex_prices = resolve_cex_reference_prices(
+        [variant],
+        rules={variant.variant_id: applicable_rule},
+        force_live=coerce_bool(request.GET.get('refresh'), False),
+    )[variant.variant_id]
+    cex_sale_price = cex_prices.sale_price
+    cex_tradein_cash = cex_prices.tradein_cash
+    cex_tradein_voucher = cex_prices.tradein_voucher
+    image_urls = cex_prices.image_urls
+    cex_out_of_stock = cex_prices.out_of_stock
 
     # Our Target Sale Price
     # Always compute our_sale_price relative to the *live* cex_sale_price so that
@@ -137,7 +134,6 @@ def variant_prices(request):
         our_sale_price = _round_sale_price(cex_sale_price * 0.85)
 
     # Resolve first/second/third offer pct from the applicable pricing rule
-    applicable_rule = variant.get_applicable_rule()
     first_offer_pct = (
         float(applicable_rule.first_offer_pct_of_cex)
         if applicable_rule and applicable_rule.first_offer_pct_of_cex is not None
@@ -184,6 +180,7 @@ def variant_prices(request):
         "first_offer_pct_of_cex": first_offer_pct,
         "second_offer_pct_of_cex": second_offer_pct,
         "third_offer_pct_of_cex": third_offer_pct,
+        **cex_prices.as_reference_fields(),
     }
     if image_urls:
         reference_data["cex_image_urls"] = {
@@ -310,3 +307,82 @@ def cex_product_prices(request):
     }
     logger.info("[CG Suite] cex_product_prices response: %s", response_data)
     return Response(response_data)
+
+
+@api_view(['GET'])
+def price_movers(request):
+    """
+    Largest CeX sell-price drops/rises recorded by the import_cex_data movers stage.
+
+    Query params:
+        run          — ISO timestamp of an import run (default: latest run)
+        category_id  — restrict to one product category
+        direction    — "drop", "rise" or "both" (default)
+        limit        — max rows per category and direction (default 20, max 200)
+    """
+    direction = (request.GET.get('direction') or 'both').strip().lower()
+    if direction not in ('drop', 'rise', 'both'):
+        return Response(
+            {"detail": "direction must be one of: drop, rise, both"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = min(200, max(1, int(request.GET.get('limit') or 20)))
+    except (TypeError, ValueError):
+        return Response({"detail": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+    run_raw = (request.GET.get('run') or '').strip()
+    if run_raw:
+        import_run_at = parse_datetime(run_raw)
+        if import_run_at is None:
+            return Response({"detail": "run must be an ISO timestamp"}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(import_run_at):
+            import_run_at = timezone.make_aware(import_run_at)
+    else:
+        import_run_at = VariantPriceMovement.objects.aggregate(latest=Max('import_run_at'))['latest']
+    if import_run_at is None:
+        return Response({"import_run_at": None, "categories": []})
+
+    qs = VariantPriceMovement.objects.filter(import_run_at=import_run_at).select_related(
+        'variant', 'category'
+    )
+    category_raw = (request.GET.get('category_id') or '').strip()
+    if category_raw:
+        try:
+            category_id = int(category_raw)
+        except ValueError:
+            return Response({"detail": "category_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        qs = qs.filter(category_id=category_id)
+    if direction == 'drop':
+        qs = qs.filter(delta_pct__lt=0)
+    elif direction == 'rise':
+        qs = qs.filter(delta_pct__gt=0)
+
+    by_category = {}
+    for m in qs.order_by('category__name', 'delta_pct'):
+        entry = by_category.setdefault(m.category_id, {
+            "category_id": m.category_id,
+            "category_name": m.category.name,
+            "drops": [],
+            "rises": [],
+        })
+        entry["drops" if m.delta_pct < 0 else "rises"].append({
+            "variant_id": m.variant_id,
+            "cex_sku": m.variant.cex_sku,
+            "title": m.variant.title,
+            "previous_price_gbp": float(m.previous_price_gbp),
+            "new_price_gbp": float(m.new_price_gbp),
+            "delta_gbp": float(m.delta_gbp),
+            "delta_pct": float(m.delta_pct),
+        })
+
+    categories = []
+    for entry in by_category.values():
+        entry["drops"] = entry["drops"][:limit]
+        entry["rises"] = list(reversed(entry["rises"]))[:limit]
+        categories.append(entry)
+
+    return Response({
+        "import_run_at": import_run_at.isoformat(),
+        "categories": categories,
+    })
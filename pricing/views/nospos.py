@@ -1,7 +1,6 @@
-import re
-
 from django.db import transaction
-from django.db.models import Prefetch
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
@@ -14,10 +13,21 @@ from pricing.models_v2 import (
     NosposField,
     NosposCategoryField,
 )
+from pricing.services.nospos_catalogue import get_catalogue_snapshot, latest_catalogue_etag
+from pricing.services.nospos_sync import (
+    CategoryFieldsPayload,
+    FieldUpsertResult,
+    sync_nospos_categories,
+    sync_nospos_category_fields,
+    upsert_nospos_fields,
+)
 from pricing.utils.decorators import require_nospos_sync_secret
 from pricing.utils.parsing import parse_decimal, coerce_bool
 
 
+MAX_CATEGORY_FIELDS_BATCH = 200
+
+
 def _serialize_nospos_category_mapping(m):
     return {
         'id': m.id,
@@ -77,13 +87,6 @@ def nospos_category_mapping_detail(request, mapping_id):
 
 # --- NosPos scraped category tree (extension -> DB) ---
 
-def _parent_path_from_full_name(full_name):
-    parts = [p.strip() for p in re.split(r"\s*>\s*", (full_name or "").strip()) if p.strip()]
-    if len(parts) < 2:
-        return None
-    return " > ".join(parts[:-1])
-
-
 def _parse_optional_decimal(value):
     try:
         return parse_decimal(value)
@@ -131,93 +134,71 @@ def _normalize_nospos_category_payload_rows(raw):
     return rows
 
 
+def _catalogue_etag(etag, root):
+    return f'"{etag}-{root}"' if root is not None else f'"{etag}"'
+
+
 @api_view(["GET"])
 def nospos_categories_list(request):
-    """List NosPos categories mirrored in the DB."""
+    """
+    List NosPos categories mirrored in the DB, with their linked fields.
+
+    Served from the precomputed catalogue snapshot: the response carries an
+    ETag (304 on a matching If-None-Match) and is gzip-encoded when the client
+    accepts it. ``?root=<nosposId>`` limits the list to that category's subtree.
+    """
     if request.query_params.get("count_only") in ("1", "true", "yes"):
         return Response({"count": NosposCategory.objects.count()})
 
-    field_link_qs = NosposCategoryField.objects.select_related("field").order_by("field__name")
-    qs = (
-        NosposCategory.objects.select_related("parent")
-        .prefetch_related(Prefetch("field_links", queryset=field_link_qs))
-        .order_by("level", "full_name", "nospos_id")
-    )
-    results = []
-    for c in qs:
-        linked_fields = []
-        for link in c.field_links.all():
-            linked_fields.append({
-                "nosposFieldId": link.field.nospos_field_id,
-                "name": link.field.name,
-                "active": link.active,
-                "editable": link.editable,
-                "sensitive": link.sensitive,
-                "required": link.required,
-            })
-        results.append({
-            "id": c.id,
-            "nosposId": c.nospos_id,
-            "level": c.level,
-            "fullName": c.full_name,
-            "status": c.status or "",
-            "parentNosposId": c.parent.nospos_id if c.parent_id else None,
-            "parentFullName": c.parent.full_name if c.parent_id else None,
-            "buybackRate": str(c.buyback_rate) if c.buyback_rate is not None else None,
-            "offerRate": str(c.offer_rate) if c.offer_rate is not None else None,
-            "updatedAt": c.updated_at.isoformat() if c.updated_at else None,
-            "linkedFields": linked_fields,
-        })
-    return Response({"count": len(results), "results": results})
+    root = None
+    raw_root = request.query_params.get("root")
+    if raw_root not in (None, ""):
+        try:
+            root = int(raw_root)
+        except (TypeError, ValueError):
+            return Response({"error": "root must be a NosPos category id"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if_none_match = set(parse_etags(request.headers.get("If-None-Match") or ""))
+    head = latest_catalogue_etag()
+    if head is not None and if_none_match:
+        etag = _catalogue_etag(head[1], root)
+        if etag in if_none_match or "*" in if_none_match:
+            response = HttpResponseNotModified()
+            response["ETag"] = etag
+            response["Cache-Control"] = "no-cache"
+            return response
+
+    snapshot = get_catalogue_snapshot()
+    if root is None:
+        body, body_gzip = snapshot.body, snapshot.body_gzip
+    else:
+        encoded = snapshot.subtree(root)
+        if encoded is None:
+            return Response({"error": f"No NosposCategory with nospos_id={root}"}, status=status.HTTP_404_NOT_FOUND)
+        body, body_gzip = encoded
+
+    use_gzip = "gzip" in (request.headers.get("Accept-Encoding") or "").lower()
+    response = HttpResponse(body_gzip if use_gzip else body, content_type="application/json")
+    if use_gzip:
+        response["Content-Encoding"] = "gzip"
+    response["ETag"] = _catalogue_etag(snapshot.etag, root)
+    response["Cache-Control"] = "no-cache"
+    response["Vary"] = "Accept-Encoding"
+    response["X-Nospos-Catalogue-Version"] = str(snapshot.version)
+    return response
 
 
 @csrf_exempt
 @api_view(["POST"])
 @require_nospos_sync_secret
 def nospos_categories_sync(request):
-    """Upsert rows scraped from NosPos /stock/category/index."""
+    """Upsert rows scraped from NosPos /stock/category/index (bulk, parents resolved in memory)."""
     rows = _normalize_nospos_category_payload_rows(request.data)
     if not rows:
         return Response({"error": "No valid category rows in body"}, status=status.HTTP_400_BAD_REQUEST)
 
-    rows.sort(key=lambda x: (x["level"], x["nospos_id"]))
-    created = 0
-    updated = 0
-
-    with transaction.atomic():
-        for item in rows:
-            parent = None
-            if item["level"] > 0:
-                parent_path = _parent_path_from_full_name(item["full_name"])
-                if parent_path:
-                    parent = NosposCategory.objects.filter(full_name=parent_path).first()
-
-            obj, was_created = NosposCategory.objects.update_or_create(
-                nospos_id=item["nospos_id"],
-                defaults={
-                    "parent": parent,
-                    "level": item["level"],
-                    "full_name": item["full_name"],
-                    "status": item["status"],
-                    "buyback_rate": item["buyback_rate"],
-                    "offer_rate": item["offer_rate"],
-                },
-            )
-            if was_created:
-                created += 1
-            else:
-                updated += 1
-
-        for obj in NosposCategory.objects.filter(level__gt=0, parent__isnull=True):
-            parent_path = _parent_path_from_full_name(obj.full_name)
-            if not parent_path:
-                continue
-            p = NosposCategory.objects.filter(full_name=parent_path).first()
-            if p and p.id != obj.id:
-                obj.parent = p
-                obj.save(update_fields=["parent"])
-
-    return Response({"ok": True, "created": created, "updated": updated, "total_received": len(rows)})
+    result = sync_nospos_categories(rows)
+    return Response({"ok": True, "total_received": len(rows), **result.as_dict()})
 
 
 def _normalize_nospos_field_payload_rows(data):
@@ -275,20 +256,16 @@ def nospos_fields_sync(request):
     if not rows:
         return Response({"error": "No valid field rows in body"}, status=status.HTTP_400_BAD_REQUEST)
 
-    created = 0
-    updated = 0
     with transaction.atomic():
-        for item in rows:
-            obj, was_created = NosposField.objects.update_or_create(
-                nospos_field_id=item["nospos_field_id"],
-                defaults={"name": item["name"]},
-            )
-            if was_created:
-                created += 1
-            else:
-                updated += 1
+        result = upsert_nospos_fields(rows)
 
-    return Response({"ok": True, "created": created, "updated": updated, "total_received": len(rows)})
+    return Response({
+        "ok": True,
+        "created": result.created,
+        "updated": result.updated,
+        "unchanged": result.unchanged,
+        "total_received": len(rows),
+    })
 
 
 def _normalize_nospos_category_field_sync_payload(data):
@@ -363,81 +340,70 @@ def nospos_category_fields_sync(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    category = NosposCategory.objects.filter(nospos_id=category_nospos_id).first()
-    if not category:
+    results, fields, timings = sync_nospos_category_fields(
+        [CategoryFieldsPayload(category_nospos_id, rows, buyback_dec, offer_dec)]
+    )
+    result = results[0]
+    if result.error:
+        return Response({"error": result.error}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        **result.as_dict(),
+        "fields_created": fields.created,
+        "fields_updated": fields.updated,
+        "fields_unchanged": fields.unchanged,
+        "timings_ms": timings,
+    })
+
+
+@csrf_exempt
+@api_view(["POST"])
+@require_nospos_sync_secret
+def nospos_category_fields_sync_batch(request):
+    """
+    Multi-category nospos_category_fields_sync for crawls: one request and one
+    transaction for many /stock/category/modify scrapes.
+
+    Body: { "categories": [ { categoryNosposId, fields, buybackRatePercent?, offerRatePercent? }, ... ] }
+    Returns per-entry results in request order; invalid entries or unknown
+    categories are reported with ok=false without failing the others.
+    """
+    entries = request.data.get("categories") if isinstance(request.data, dict) else request.data
+    if not isinstance(entries, list) or not entries:
+        return Response({"error": "categories must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(entries) > MAX_CATEGORY_FIELDS_BATCH:
         return Response(
-            {
-                "error": (
-                    f"No NosposCategory with nospos_id={category_nospos_id}. "
-                    "Run \u201cUpdate from NoSpos\u201d on the categories page first."
-                ),
-            },
+            {"error": f"At most {MAX_CATEGORY_FIELDS_BATCH} categories per request"},
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    active_fids = {item["nospos_field_id"] for item in rows if item["active"]}
-    field_created = 0
-    field_updated = 0
-    link_created = 0
-    link_updated = 0
-    deleted_count = 0
+    payloads = []
+    slots = []
+    for entry in entries:
+        category_nospos_id, rows, buyback_dec, offer_dec = _normalize_nospos_category_field_sync_payload(entry)
+        if category_nospos_id is None:
+            slots.append({"ok": False, "error": "Invalid or missing categoryNosposId"})
+        elif not rows and buyback_dec is None and offer_dec is None:
+            slots.append({
+                "ok": False,
+                "categoryNosposId": category_nospos_id,
+                "error": "No valid field rows and no buybackRatePercent/offerRatePercent",
+            })
+        else:
+            slots.append(len(payloads))
+            payloads.append(CategoryFieldsPayload(category_nospos_id, rows, buyback_dec, offer_dec))
 
-    with transaction.atomic():
-        rate_updates = []
-        if buyback_dec is not None:
-            category.buyback_rate = buyback_dec
-            rate_updates.append("buyback_rate")
-        if offer_dec is not None:
-            category.offer_rate = offer_dec
-            rate_updates.append("offer_rate")
-        if rate_updates:
-            category.save(update_fields=rate_updates)
-
-        if rows:
-            for item in rows:
-                _f, f_was_created = NosposField.objects.update_or_create(
-                    nospos_field_id=item["nospos_field_id"],
-                    defaults={"name": item["name"]},
-                )
-                if f_was_created:
-                    field_created += 1
-                else:
-                    field_updated += 1
-
-            for item in rows:
-                if not item["active"]:
-                    continue
-                field = NosposField.objects.get(nospos_field_id=item["nospos_field_id"])
-                _link, l_was_created = NosposCategoryField.objects.update_or_create(
-                    category=category,
-                    field=field,
-                    defaults={
-                        "active": True,
-                        "editable": item["editable"],
-                        "sensitive": item["sensitive"],
-                        "required": item["required"],
-                    },
-                )
-                if l_was_created:
-                    link_created += 1
-                else:
-                    link_updated += 1
-
-            deleted_count, _ = NosposCategoryField.objects.filter(category=category).exclude(
-                field__nospos_field_id__in=active_fids
-            ).delete()
-
-    category.refresh_from_db()
+    results, fields, timings = (
+        sync_nospos_category_fields(payloads) if payloads else ([], FieldUpsertResult(), {})
+    )
+    out = [results[slot].as_dict() if isinstance(slot, int) else slot for slot in slots]
     return Response({
         "ok": True,
-        "categoryNosposId": category_nospos_id,
-        "total_received": len(rows),
-        "links_for_active_fields": len(active_fids),
-        "fields_created": field_created,
-        "fields_updated": field_updated,
-        "field_links_created": link_created,
-        "field_links_updated": link_updated,
-        "field_links_removed": deleted_count,
-        "buybackRate": str(category.buyback_rate) if category.buyback_rate is not None else None,
-        "offerRate": str(category.offer_rate) if category.offer_rate is not None else None,
+        "total_categories": len(entries),
+        "synced": sum(1 for r in out if r["ok"]),
+        "failed": sum(1 for r in out if not r["ok"]),
+        "fields_created": fields.created,
+        "fields_updated": fields.updated,
+        "fields_unchanged": fields.unchanged,
+        "results": out,
+        "timings_ms": timings,
     })
@@ -67,9 +67,6 @@ from pricing.views._shared import (
     _is_jewellery_placeholder_variant,
     _resolve_cex_sku_to_variant,
     _decimal_or_none,
-    _create_stock_session_line_from_payload,
-    _create_repricing_session_item_from_payload,
-    _create_upload_session_item_from_payload,
     _sync_upload_session_items_from_session_snapshot,
     _sync_request_jewellery_reference_snapshot,
     _get_category_and_descendant_ids,
@@ -128,9 +125,20 @@ def _serialize_pricing_rule(rule):
             float(rule.ebay_offer_margin_4_pct)
             if rule.ebay_offer_margin_4_pct is not None else None
         ),
+        "cex_price_max_age_minutes": rule.cex_price_max_age_minutes,
     }
 
 
+def _parse_max_age_minutes(val):
+    """None/blank → None; otherwise a non-negative int (raises ValueError)."""
+    if val is None or val == '':
+        return None
+    minutes = int(val)
+    if minutes < 0:
+        raise ValueError
+    return minutes
+
+
 @api_view(['GET', 'POST'])
 def pricing_rules_view(request):
     """List all pricing rules or create a new one."""
@@ -193,12 +201,18 @@ def pricing_rules_view(request):
         else:
             ebay_margins[field] = None
 
+    try:
+        max_age_minutes = _parse_max_age_minutes(data.get('cex_price_max_age_minutes'))
+    except (TypeError, ValueError):
+        return Response({"error": "cex_price_max_age_minutes must be a non-negative integer"}, status=400)
+
     kwargs = {
         'sell_price_multiplier': multiplier,
         'first_offer_pct_of_cex': first_offer_pct,
         'second_offer_pct_of_cex': second_offer_pct,
         'third_offer_pct_of_cex': third_offer_pct,
         'is_global_default': is_global_default,
+        'cex_price_max_age_minutes': max_age_minutes,
         **ebay_margins,
     }
 
@@ -292,6 +306,12 @@ def pricing_rule_detail(request, rule_id):
                 except InvalidOperation:
                     return Response({"error": f"{field} must be a number"}, status=400)
 
+    if 'cex_price_max_age_minutes' in data:
+        try:
+            rule.cex_price_max_age_minutes = _parse_max_age_minutes(data['cex_price_max_age_minutes'])
+        except (TypeError, ValueError):
+            return Response({"error": "cex_price_max_age_minutes must be a non-negative integer"}, status=400)
+
     try:
         rule.save()
     except Exception as e:
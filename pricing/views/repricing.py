@@ -49,6 +49,9 @@ from pricing.services.offer_engine import (
 )
 from pricing.utils.parsing import parse_decimal, coerce_bool
 from pricing.services.cex_client import fetch_cex_box_detail as _fetch_cex_box_detail
+from pricing.services.session_patch import compact_session_data
+from pricing.services.cex_prices import PricingRuleResolver, resolve_cex_reference_prices
+from pricing.services.barcode_history import DEFAULT_LIMIT, MAX_LIMIT, lookup_barcode_history
 
 from pricing.serializers import (
     RequestSerializer,
@@ -67,13 +70,12 @@ from pricing.views._shared import (
     _is_jewellery_placeholder_variant,
     _resolve_cex_sku_to_variant,
     _decimal_or_none,
-    _create_stock_session_line_from_payload,
-    _create_repricing_session_item_from_payload,
-    _create_upload_session_item_from_payload,
+    _bulk_create_repricing_session_items_from_payload,
     _sync_upload_session_items_from_session_snapshot,
     _sync_request_jewellery_reference_snapshot,
     _get_category_and_descendant_ids,
     _upload_session_data_has_barcode,
+    _save_session_data_from_payload,
     _round_offer_price,
     _round_sale_price,
 )
@@ -133,13 +135,13 @@ def repricing_sessions_view(request):
             status=RepricingSessionStatus.COMPLETED,
         )
 
-        for idx, item_data in enumerate(items_data):
-            try:
-                _create_repricing_session_item_from_payload(session, item_data, idx)
-            except ValueError as exc:
-                transaction.set_rollback(True)
-                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            _bulk_create_repricing_session_items_from_payload(session, items_data)
+        except ValueError as exc:
+            transaction.set_rollback(True)
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
+    session = RepricingSession.objects.prefetch_related(_RESEARCH_SESSION_PREFETCH).get(pk=session.pk)
     serializer = RepricingSessionSerializer(session)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -161,43 +163,50 @@ def repricing_session_detail(request, repricing_session_id):
     cash_offers_payload = None
     voucher_offers_payload = None
 
-    if 'session_data' in request.data:
-        session.session_data = request.data['session_data']
-        update_fields.append('session_data')
-
-    if 'status' in request.data:
-        new_status = request.data['status']
-        if new_status in RepricingSessionStatus.values:
-            session.status = new_status
-            update_fields.append('status')
-            if new_status == RepricingSessionStatus.IN_PROGRESS:
-                session.items.all().delete()
-                session.barcode_count = 0
-                update_fields.append('barcode_count')
-
-    if 'cart_key' in request.data:
-        session.cart_key = (request.data['cart_key'] or '').strip()
-        update_fields.append('cart_key')
-
-    if 'item_count' in request.data:
-        session.item_count = int(request.data['item_count'] or 0)
-        update_fields.append('item_count')
-
-    if 'barcode_count' in request.data:
-        session.barcode_count = int(request.data['barcode_count'] or 0)
-        update_fields.append('barcode_count')
-
-    if isinstance(items_data, list) and len(items_data) > 0:
-        with transaction.atomic():
-            for idx, item_data in enumerate(items_data):
-                try:
-                    _create_repricing_session_item_from_payload(session, item_data, idx)
-                except ValueError as exc:
-                    return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
-
-    if update_fields:
-        session.save(update_fields=update_fields + ['updated_at'])
+    # session_data and the line rows are saved together: a 400/409 from either
+    # step leaves the session exactly as it was.
+    with transaction.atomic():
+        error_response = _save_session_data_from_payload(session, request.data)
+        if error_response is not None:
+            transaction.set_rollback(True)
+            return error_response
+
+        if 'status' in request.data:
+            new_status = request.data['status']
+            if new_status in RepricingSessionStatus.values:
+                session.status = new_status
+                update_fields.append('status')
+                if new_status == RepricingSessionStatus.IN_PROGRESS:
+                    session.items.all().delete()
+                    session.barcode_count = 0
+                    update_fields.append('barcode_count')
+                elif new_status == RepricingSessionStatus.COMPLETED:
+                    compact_session_data(session)
+
+        if 'cart_key' in request.data:
+            session.cart_key = (request.data['cart_key'] or '').strip()
+            update_fields.append('cart_key')
+
+        if 'item_count' in request.data:
+            session.item_count = int(request.data['item_count'] or 0)
+            update_fields.append('item_count')
+
+        if 'barcode_count' in request.data:
+            session.barcode_count = int(request.data['barcode_count'] or 0)
+            update_fields.append('barcode_count')
+
+        if isinstance(items_data, list) and len(items_data) > 0:
+            try:
+                _bulk_create_repricing_session_items_from_payload(session, items_data)
+            except ValueError as exc:
+                transaction.set_rollback(True)
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if update_fields:
+            session.save(update_fields=update_fields + ['updated_at'])
 
+    # Lines were written after the prefetch above; reload so the response includes them.
+    session = RepricingSession.objects.prefetch_related(_RESEARCH_SESSION_PREFETCH).get(pk=session.pk)
     serializer = RepricingSessionSerializer(session)
     return Response(serializer.data)
 
@@ -207,7 +216,9 @@ def quick_reprice_lookup(request):
     """
     POST: Look up variants by cex_sku to quickly populate the repricer.
     Accepts barcode pairs: cex_sku (numeric) + nospos_barcode.
-    Falls back to the live CeX API when a sku is not in our database.
+    Stored CeX prices are used while fresh; stale ones are re-fetched live and
+    written back in one batch. Falls back to the live CeX API when a sku is
+    not in our database.
 
     Body: { "pairs": [ { "cex_sku": "...", "nospos_barcode": "..." }, ... ] }
     Returns: { "found": [...], "not_found": [...] }
@@ -222,6 +233,17 @@ def quick_reprice_lookup(request):
     found = []
     not_found = []
 
+    skus = {str(pair.get('cex_sku') or '').strip() for pair in pairs} - {''}
+    variants_by_sku = {
+        v.cex_sku: v
+        for v in Variant.objects.select_related(
+            'product__category', 'product__manufacturer', 'condition_grade'
+        ).filter(cex_sku__in=skus)
+    }
+    rule_resolver = PricingRuleResolver()
+    rules = {v.variant_id: rule_resolver.for_variant(v) for v in variants_by_sku.values()}
+    cex_prices_by_variant = resolve_cex_reference_prices(list(variants_by_sku.values()), rules=rules)
+
     for pair in pairs:
         cex_sku = str(pair.get('cex_sku') or '').strip()
         nospos_barcode = str(pair.get('nospos_barcode') or '').strip()
@@ -229,28 +251,21 @@ def quick_reprice_lookup(request):
         if not cex_sku:
             continue
 
-        try:
-            variant = Variant.objects.select_related(
-                'product__category', 'condition_grade'
-            ).get(cex_sku=cex_sku)
-
-            cex_box = _fetch_cex_box_detail(cex_sku)
-            if cex_box:
-                cex_sale_price = float(cex_box.get('sellPrice') or variant.current_price_gbp)
-                cex_tradein_cash = float(cex_box.get('cashPrice') or variant.tradein_cash or 0)
-                cex_tradein_voucher = float(cex_box.get('exchangePrice') or variant.tradein_voucher or 0)
-                image_urls = cex_box.get('imageUrls') or {}
-                image = image_urls.get('large') or image_urls.get('medium') or image_urls.get('small')
-                title = cex_box.get('boxName') or variant.product.name
-            else:
-                cex_sale_price = float(variant.current_price_gbp)
-                cex_tradein_cash = float(variant.tradein_cash or 0)
-                cex_tradein_voucher = float(variant.tradein_voucher or 0)
-                image = None
-                title = variant.product.name
-
-            target_sell_price = variant.get_target_sell_price()
-            if target_sell_price is not None and float(variant.current_price_gbp) > 0:
+        variant = variants_by_sku.get(cex_sku)
+        if variant is not None:
+            cex_prices = cex_prices_by_variant[variant.variant_id]
+            cex_sale_price = cex_prices.sale_price
+            cex_tradein_cash = cex_prices.tradein_cash
+            cex_tradein_voucher = cex_prices.tradein_voucher
+            image_urls = cex_prices.image_urls
+            image = image_urls.get('large') or image_urls.get('medium') or image_urls.get('small')
+            title = cex_prices.box_name or variant.product.name
+
+            rule = rules.get(variant.variant_id)
+            if rule is not None and float(variant.current_price_gbp) > 0:
+                target_sell_price = (variant.current_price_gbp * rule.sell_price_multiplier).quantize(
+                    Decimal('0.01')
+                )
                 multiplier = float(target_sell_price) / float(variant.current_price_gbp)
                 our_sale_price = _round_sale_price(cex_sale_price * multiplier)
             else:
@@ -280,33 +295,59 @@ def quick_reprice_lookup(request):
                 'our_sale_price': our_sale_price,
                 'image': image,
                 'in_db': True,
+                **cex_prices.as_reference_fields(),
             })
+            continue
 
-        except Variant.DoesNotExist:
-            cex_box = _fetch_cex_box_detail(cex_sku)
-            if cex_box:
-                cex_sale_price = float(cex_box.get('sellPrice') or 0)
-                cex_tradein_cash = float(cex_box.get('cashPrice') or 0)
-                cex_tradein_voucher = float(cex_box.get('exchangePrice') or 0)
-                image_urls = cex_box.get('imageUrls') or {}
-                image = image_urls.get('large') or image_urls.get('medium') or image_urls.get('small')
-                our_sale_price = _round_sale_price(cex_sale_price * 0.85)
-                found.append({
-                    'cex_sku': cex_sku,
-                    'nospos_barcode': nospos_barcode,
-                    'variant_id': None,
-                    'title': cex_box.get('boxName') or cex_sku,
-                    'subtitle': cex_box.get('categoryName') or '',
-                    'condition': '',
-                    'category_name': cex_box.get('superCatName') or '',
-                    'cex_sale_price': cex_sale_price,
-                    'cex_tradein_cash': cex_tradein_cash,
-                    'cex_tradein_voucher': cex_tradein_voucher,
-                    'our_sale_price': our_sale_price,
-                    'image': image,
-                    'in_db': False,
-                })
-            else:
-                not_found.append(cex_sku)
+        cex_box = _fetch_cex_box_detail(cex_sku)
+        if cex_box:
+            cex_sale_price = float(cex_box.get('sellPrice') or 0)
+            cex_tradein_cash = float(cex_box.get('cashPrice') or 0)
+            cex_tradein_voucher = float(cex_box.get('exchangePrice') or 0)
+            image_urls = cex_box.get('imageUrls') or {}
+            image = image_urls.get('large') or image_urls.get('medium') or image_urls.get('small')
+            our_sale_price = _round_sale_price(cex_sale_price * 0.85)
+            found.append({
+                'cex_sku': cex_sku,
+                'nospos_barcode': nospos_barcode,
+                'variant_id': None,
+                'title': cex_box.get('boxName') or cex_sku,
+                'subtitle': cex_box.get('categoryName') or '',
+                'condition': '',
+                'category_name': cex_box.get('superCatName') or '',
+                'cex_sale_price': cex_sale_price,
+                'cex_tradein_cash': cex_tradein_cash,
+                'cex_tradein_voucher': cex_tradein_voucher,
+                'our_sale_price': our_sale_price,
+                'image': image,
+                'in_db': False,
+                'cex_price_source': 'live',
+            })
+        else:
+            not_found.append(cex_sku)
 
     return Response({'found': found, 'not_found': not_found})
+
+
+@api_view(['GET'])
+def barcode_history(request):
+    """
+    What we last priced / bought a scanned item at.
+
+    Matches repricing and upload lines on barcode or stock_barcode, and
+    buying lines whose variant cex_sku equals the code.
+
+    Query params:
+        barcode — the scanned code (required)
+        limit   — max lines per source, newest first (default 10, max 100)
+    Returns: { barcode, last_priced, last_bought, repricing, uploads, requests }
+    """
+    code = (request.GET.get('barcode') or '').strip()
+    if not code:
+        return Response({"detail": "barcode is required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(MAX_LIMIT, max(1, int(request.GET.get('limit') or DEFAULT_LIMIT)))
+    except (TypeError, ValueError):
+        return Response({"detail": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(lookup_barcode_history(code, limit=limit).as_dict())
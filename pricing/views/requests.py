@@ -61,7 +61,7 @@ def requests_view(request):
         qs = (
             Request.objects.all()
             .prefetch_related("items__variant", _RESEARCH_SESSION_PREFETCH, "status_history")
-            .select_related("customer")
+            .select_related("customer__stats")
         )
         return Response(RequestSerializer(qs, many=True).data)
 
@@ -116,7 +116,7 @@ def requests_view(request):
             Request.objects.prefetch_related(
                 "items__variant", _RESEARCH_SESSION_PREFETCH, "status_history",
             )
-            .select_related("customer")
+            .select_related("customer__stats")
             .get(pk=new_request.pk)
         )
         return Response(RequestSerializer(fresh).data, status=status.HTTP_201_CREATED)
@@ -133,7 +133,7 @@ def requests_overview_list(request):
     qs = (
         Request.objects.annotate(latest_status=latest_status)
         .prefetch_related("items__variant", _RESEARCH_SESSION_PREFETCH, "status_history")
-        .select_related("customer")
+        .select_related("customer__stats")
         .order_by("-created_at")
     )
     status_filter = request.query_params.get('status')
@@ -153,7 +153,7 @@ def request_detail(request, request_id):
         Request.objects.prefetch_related(
             "items__variant", _RESEARCH_SESSION_PREFETCH,
             "status_history", "jewellery_reference_history",
-        ).select_related("customer", "current_jewellery_reference_snapshot"),
+        ).select_related("customer__stats", "current_jewellery_reference_snapshot"),
         request_id=request_id,
     )
     return Response(RequestSerializer(existing).data)
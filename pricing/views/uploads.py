@@ -49,6 +49,7 @@ from pricing.services.offer_engine import (
 )
 from pricing.utils.parsing import parse_decimal, coerce_bool
 from pricing.services.cex_client import fetch_cex_box_detail as _fetch_cex_box_detail
+from pricing.services.session_patch import compact_session_data
 
 from pricing.serializers import (
     RequestSerializer,
@@ -67,13 +68,15 @@ from pricing.views._shared import (
     _is_jewellery_placeholder_variant,
     _resolve_cex_sku_to_variant,
     _decimal_or_none,
-    _create_stock_session_line_from_payload,
-    _create_repricing_session_item_from_payload,
-    _create_upload_session_item_from_payload,
+    _build_stock_session_line,
+    _bulk_insert_stock_session_lines,
+    _bulk_create_upload_session_items_from_payload,
+    _research_payloads,
     _sync_upload_session_items_from_session_snapshot,
     _sync_request_jewellery_reference_snapshot,
     _get_category_and_descendant_ids,
     _upload_session_data_has_barcode,
+    _save_session_data_from_payload,
     _round_offer_price,
     _round_sale_price,
 )
@@ -145,17 +148,98 @@ def upload_sessions_view(request):
             mode=session_mode,
         )
 
-        for idx, item_data in enumerate(items_data):
-            try:
-                _create_upload_session_item_from_payload(session, item_data, idx)
-            except ValueError as exc:
-                transaction.set_rollback(True)
-                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            _bulk_create_upload_session_items_from_payload(session, items_data)
+        except ValueError as exc:
+            transaction.set_rollback(True)
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
+    session = UploadSession.objects.prefetch_related(_UPLOAD_SESSION_PREFETCH).get(pk=session.pk)
     serializer = UploadSessionSerializer(session)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+def _merge_research_payloads(target, item_data):
+    """Later non-empty research dicts replace earlier ones, as sequential ingests would."""
+    for key in ('raw_data', 'cash_converters_data', 'cg_data'):
+        value = item_data.get(key)
+        if isinstance(value, dict) and value:
+            target[key] = value
+
+
+def _reconcile_upload_session_items(session, items_data):
+    """
+    Apply a PATCH items_data list to the session's lines in a fixed number of
+    queries: one lookup of the existing item_identifiers, one bulk_update of
+    changed retail prices, one research replace for existing lines and one
+    bulk insert of new lines. Every entry is validated before anything is
+    written; raises ValueError.
+    """
+    iids = {
+        str(item_data.get('item_identifier') or item_data.get('itemId') or '').strip()
+        for item_data in items_data
+    }
+    iids.discard('')
+    existing_by_iid = {}
+    if iids:
+        for line in UploadSessionItem.objects.filter(upload_session=session, item_identifier__in=iids):
+            existing_by_iid.setdefault(line.item_identifier, line)
+
+    changed_price_fields = set()
+    changed_lines = {}
+    existing_research = {}
+    new_lines = []
+    new_research = []
+    new_index_by_iid = {}
+
+    for idx, item_data in enumerate(items_data):
+        iid = str(item_data.get('item_identifier') or item_data.get('itemId') or '').strip()
+        if iid in existing_by_iid:
+            line = existing_by_iid[iid]
+            research = existing_research.setdefault(line.pk, {})
+        elif iid in new_index_by_iid:
+            # Repeated identifier: later entries update the line the first one created.
+            pos = new_index_by_iid[iid]
+            line, research = new_lines[pos], new_research[pos]
+        else:
+            line = _build_stock_session_line(
+                session, item_data, idx, parent_fk_field="upload_session", line_model=UploadSessionItem
+            )
+            research = {}
+            _merge_research_payloads(research, item_data)
+            if iid:
+                new_index_by_iid[iid] = len(new_lines)
+            new_lines.append(line)
+            new_research.append(research)
+            continue
+
+        old_rp = _decimal_or_none(item_data.get('old_retail_price'), 'old_retail_price')
+        new_rp = _decimal_or_none(item_data.get('new_retail_price'), 'new_retail_price')
+        if old_rp is not None:
+            line.old_retail_price = old_rp
+            changed_price_fields.add('old_retail_price')
+        if new_rp is not None:
+            line.new_retail_price = new_rp
+            changed_price_fields.add('new_retail_price')
+        if line.pk is not None and (old_rp is not None or new_rp is not None):
+            changed_lines[line.pk] = line
+        _merge_research_payloads(research, item_data)
+
+    if changed_lines:
+        UploadSessionItem.objects.bulk_update(
+            list(changed_lines.values()), sorted(changed_price_fields), batch_size=500
+        )
+    research_storage.bulk_ingest_stock_session_research(
+        [
+            (line, *_research_payloads(existing_research[line.pk]))
+            for line in existing_by_iid.values()
+            if existing_research.get(line.pk)
+        ],
+        replace_existing=True,
+    )
+    _bulk_insert_stock_session_lines(new_lines, new_research)
+
+
 @api_view(['GET', 'PATCH'])
 def upload_session_detail(request, upload_session_id):
     session = get_object_or_404(
@@ -170,74 +254,57 @@ def upload_session_detail(request, upload_session_id):
     items_data = request.data.get('items_data') or []
     update_fields = []
 
-    if 'session_data' in request.data:
-        session.session_data = request.data['session_data']
-        update_fields.append('session_data')
-
-    if 'status' in request.data:
-        new_status = request.data['status']
-        if new_status in RepricingSessionStatus.values:
-            session.status = new_status
-            update_fields.append('status')
-            if new_status == RepricingSessionStatus.IN_PROGRESS:
-                session.items.all().delete()
-                session.barcode_count = 0
-                update_fields.append('barcode_count')
-
-    if 'cart_key' in request.data:
-        session.cart_key = (request.data['cart_key'] or '').strip()
-        update_fields.append('cart_key')
-
-    if 'item_count' in request.data:
-        session.item_count = int(request.data['item_count'] or 0)
-        update_fields.append('item_count')
-
-    if 'barcode_count' in request.data:
-        session.barcode_count = int(request.data['barcode_count'] or 0)
-        update_fields.append('barcode_count')
-
-    if 'mode' in request.data:
-        new_mode = (request.data['mode'] or '').strip().upper()
-        if new_mode in {'NEW', 'AUDIT'}:
-            session.mode = new_mode
-            update_fields.append('mode')
-
-    if isinstance(items_data, list) and len(items_data) > 0:
-        with transaction.atomic():
-            for idx, item_data in enumerate(items_data):
-                try:
-                    iid = str(item_data.get('item_identifier') or item_data.get('itemId') or '').strip()
-                    if iid:
-                        existing_line = UploadSessionItem.objects.filter(
-                            upload_session=session, item_identifier=iid
-                        ).first()
-                        if existing_line:
-                            old_rp = _decimal_or_none(item_data.get('old_retail_price'), 'old_retail_price')
-                            new_rp = _decimal_or_none(item_data.get('new_retail_price'), 'new_retail_price')
-                            price_update_fields = []
-                            if old_rp is not None:
-                                existing_line.old_retail_price = old_rp
-                                price_update_fields.append('old_retail_price')
-                            if new_rp is not None:
-                                existing_line.new_retail_price = new_rp
-                                price_update_fields.append('new_retail_price')
-                            if price_update_fields:
-                                existing_line.save(update_fields=price_update_fields)
-                            research_storage.ingest_upload_line_post_create(
-                                existing_line,
-                                item_data.get('raw_data'),
-                                item_data.get('cash_converters_data'),
-                                item_data.get('cg_data'),
-                            )
-                            continue
-                    _create_upload_session_item_from_payload(session, item_data, idx)
-                except ValueError as exc:
-                    return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
-
-    _sync_upload_session_items_from_session_snapshot(session)
-
-    if update_fields:
-        session.save(update_fields=update_fields + ['updated_at'])
+    # session_data and the line rows are saved together: a 400/409 from either
+    # step leaves the session exactly as it was.
+    with transaction.atomic():
+        error_response = _save_session_data_from_payload(session, request.data)
+        if error_response is not None:
+            transaction.set_rollback(True)
+            return error_response
+
+        if 'status' in request.data:
+            new_status = request.data['status']
+            if new_status in RepricingSessionStatus.values:
+                session.status = new_status
+                update_fields.append('status')
+                if new_status == RepricingSessionStatus.IN_PROGRESS:
+                    session.items.all().delete()
+                    session.barcode_count = 0
+                    update_fields.append('barcode_count')
+                elif new_status == RepricingSessionStatus.COMPLETED:
+                    compact_session_data(session)
+
+        if 'cart_key' in request.data:
+            session.cart_key = (request.data['cart_key'] or '').strip()
+            update_fields.append('cart_key')
+
+        if 'item_count' in request.data:
+            session.item_count = int(request.data['item_count'] or 0)
+            update_fields.append('item_count')
+
+        if 'barcode_count' in request.data:
+            session.barcode_count = int(request.data['barcode_count'] or 0)
+            update_fields.append('barcode_count')
+
+        if 'mode' in request.data:
+            new_mode = (request.data['mode'] or '').strip().upper()
+            if new_mode in {'NEW', 'AUDIT'}:
+                session.mode = new_mode
+                update_fields.append('mode')
+
+        if isinstance(items_data, list) and len(items_data) > 0:
+            try:
+                _reconcile_upload_session_items(session, items_data)
+            except ValueError as exc:
+                transaction.set_rollback(True)
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        _sync_upload_session_items_from_session_snapshot(session)
+
+        if update_fields:
+            session.save(update_fields=update_fields + ['updated_at'])
 
+    # Lines were written after the prefetch above; reload so the response includes them.
+    session = UploadSession.objects.prefetch_related(_UPLOAD_SESSION_PREFETCH).get(pk=session.pk)
     serializer = UploadSessionSerializer(session)
     return Response(serializer.data)